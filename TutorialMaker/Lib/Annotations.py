@@ -1,13 +1,14 @@
-import os
 import slicer
 import qt
-import copy
 import math
 import json
+import numpy as np
 from slicer.i18n import tr as _
 from enum import Flag, auto
 from Lib.TutorialUtils import Util
-from Lib.TutorialUtils import Tutorial, TutorialScreenshot
+from Lib.TutorialUtils import Tutorial, TutorialScreenshot, JSONHandler
+from Lib.RunContext import RunContext
+from Lib.ResourceCache import ResourceOwner, resourceCache, resourceFolder
 
 class AnnotationType(Flag):
     Nil = auto() # Not for saving
@@ -20,6 +21,23 @@ class AnnotationType(Flag):
     Selecting = auto()
     Selected = auto()  # Not for saving
 
+class TextMeasurer:
+    """Memoized QFontMetrics.width for one font, shared by every annotation drawn with it"""
+    MAX_ENTRIES = 4096
+
+    def __init__(self, fontMetrics : qt.QFontMetrics):
+        self.fontMetrics = fontMetrics
+        self.widths = {}
+
+    def width(self, text : str) -> int:
+        width = self.widths.get(text)
+        if width is None:
+            if len(self.widths) >= self.MAX_ENTRIES:
+                self.widths.clear()
+            width = self.fontMetrics.width(text)
+            self.widths[text] = width
+        return width
+
 class Annotation:
     def __init__(self,
         TargetWidget : dict = None,
@@ -50,9 +68,10 @@ class Annotation:
         self.boundingBoxBottomRight = [0,0]
         self.__selectionSlideEffect = 0
 
-        # Need to change this later, make it loaded through resources
-        self.icon_click = qt.QImage(os.path.dirname(__file__) + '/../Resources/Icons/Painter/click_icon.png')
-        self.icon_click = self.icon_click.scaled(20,30)
+        self.icon_click = resourceCache.image(f"{resourceFolder}/Icons/Painter/click_icon.png", 20, 30, owner=self)
+        self.__fontSize = None
+        self.__textLayoutKey = None
+        self.__textLayout = None
 
     def setSelectionBoundingBox(self, topLeftX, topLeftY, bottomRightX, bottomRightY):
         padding = 5
@@ -104,6 +123,12 @@ class Annotation:
         self.offsetY = y
         pass
 
+    def stateKey(self):
+        """Everything that changes how the annotation is drawn, used to know when a cached render is stale"""
+        return (id(self), self.type, self.text, self.optX, self.optY, self.offsetX, self.offsetY,
+                tuple(self.annotationOffset), tuple(self.target["position"]), tuple(self.target["size"]),
+                self.color.rgba(), self.thickness, self.fontSize, self.PERSISTENT, self.drawBoundingBox)
+
     def penConfig(self, color, fontSize, thickness, brush = None, pen = None):
         self.color = color
         self.thickness = thickness
@@ -112,6 +137,50 @@ class Annotation:
         self.fontSize = fontSize
         pass
 
+    def getFont(self):
+        """Shared font and metrics for the current font size"""
+        if self.__fontSize != self.fontSize:
+            self.__fontOwner = ResourceOwner()
+            self.__font = resourceCache.font("Arial", self.fontSize, owner=self.__fontOwner)
+            self.__fontMetrics = resourceCache.fontMetrics("Arial", self.fontSize, owner=self.__fontOwner)
+            self.__textMeasurer = resourceCache.acquire(("textMeasurer", "Arial", self.fontSize),
+                                                        lambda: TextMeasurer(self.__fontMetrics),
+                                                        owner=self.__fontOwner)
+            self.__fontSize = self.fontSize
+        return self.__font, self.__fontMetrics
+
+    def getTextLayout(self, text : str, maxWidth : float = None):
+        """Lines to draw and the width of the widest one. Lines are wrapped at maxWidth when given.
+
+        The layout is kept until the text, font size or width change, so the lines are only
+        measured again while the text is being edited.
+        """
+        self.getFont()
+        key = (text, "Arial", self.fontSize, maxWidth)
+        if self.__textLayoutKey == key:
+            return self.__textLayout
+
+        measurer = self.__textMeasurer
+        textLines = text.splitlines()
+        if maxWidth is None:
+            displayLines = textLines
+        else:
+            displayLines = []
+            for tLines in textLines:
+                textTokens = tLines.split()
+                line = ""
+                for token in textTokens:
+                    if measurer.width(line + token) > maxWidth:
+                        displayLines.append(line)
+                        line = f"{token} "
+                        continue
+                    line += f"{token} "
+                displayLines.append(line)
+
+        self.__textLayout = (displayLines, max((measurer.width(line) for line in displayLines), default=0))
+        self.__textLayoutKey = key
+        return self.__textLayout
+
     def draw(self, painter : qt.QPainter = None, pen : qt.QPen = None, brush :qt.QBrush = None):
         targetPos = [self.target["position"][0] - self.annotationOffset[0] + self.offsetX,
                      self.target["position"][1] - self.annotationOffset[1] + self.offsetY]
@@ -236,22 +305,20 @@ class Annotation:
             xPadding = 10
             lineSpacing = 2
 
-            font = qt.QFont("Arial", self.fontSize)
+            font, fontMetrics = self.getFont()
             painter.setFont(font)
             pen.setColor(qt.Qt.black)
             painter.setPen(pen)
 
-            fontMetrics = qt.QFontMetrics(font)
             fHeight = fontMetrics.height()
 
             textToWrite = self.text
             if textToWrite == "":
                 textToWrite = _("Write your text here")
-            textLines = textToWrite.splitlines()
+            textLines, textWidth = self.getTextLayout(textToWrite)
 
             # Calculate text size
             textHeight = len(textLines) * fHeight # + (len(textLines) - 1) * lineSpacing
-            textWidth = max(fontMetrics.width(line) for line in textLines)
 
             # Calcule the position of the text box (center)
             topLeft = qt.QPoint(arrowTail[0] - textWidth / 2,arrowTail[1] - textHeight / 2)
@@ -302,12 +369,11 @@ class Annotation:
             painter.drawRect(rectToDraw)
 
             # Calculate the text break and position
-            font = qt.QFont("Arial", self.fontSize)
+            font, fontMetrics = self.getFont()
             painter.setFont(font)
             pen.setColor(qt.Qt.black)
             painter.setPen(pen)
 
-            fontMetrics = qt.QFontMetrics(font)
             fHeight = fontMetrics.height()
 
             textBoxBottomRight = [targetPos[0] + optX, targetPos[1] + optY]
@@ -330,18 +396,7 @@ class Annotation:
             if textToWrite == "":
                 textToWrite = _("Write something here")
 
-            displayLines = []
-            textLines = textToWrite.splitlines()
-            for tLines in textLines:
-                textTokens = tLines.split()
-                line = ""
-                for token in textTokens:
-                    if fontMetrics.width(line + token) > textBoxBottomRight[0] - textBoxTopLeft[0] - xPadding:
-                        displayLines.append(copy.deepcopy(line))
-                        line = f"{token} "
-                        continue
-                    line += f"{token} "
-                displayLines.append(line)
+            displayLines, _textWidth = self.getTextLayout(textToWrite, textBoxBottomRight[0] - textBoxTopLeft[0] - xPadding)
 
             for lineIndex, line in enumerate(displayLines):
                 painter.drawText(textStart[0], textStart[1] + lineSpacing + fHeight*lineIndex, line)
@@ -387,6 +442,66 @@ class Annotation:
             painter.drawRect(rectToDraw)
 
 
+class WidgetIndex:
+    """Uniform grid over the widget rectangles of a slide for hit-testing.
+
+    Every rectangle is registered in each cell it overlaps, a query only tests the
+    rectangles of the cell under the point. Matches are returned in metadata order,
+    which is the nesting order of the capture, parents before their children.
+    """
+    CELL_SIZE = 64
+
+    def __init__(self, metadata : list[dict]):
+        self.metadata = metadata
+        rects = np.array([[*widget["position"], *widget["size"]] for widget in metadata], dtype=np.float64).reshape(-1, 4)
+        self.left = rects[:, 0]
+        self.top = rects[:, 1]
+        self.right = rects[:, 0] + rects[:, 2]
+        self.bottom = rects[:, 1] + rects[:, 3]
+
+        if len(rects) == 0:
+            self.origin = (0.0, 0.0)
+            self.columns = self.rows = 0
+            self.cellStart = np.zeros(1, dtype=np.int64)
+            self.cellWidgets = np.zeros(0, dtype=np.int64)
+            return
+
+        self.origin = (self.left.min(), self.top.min())
+        firstColumns = ((self.left - self.origin[0]) // self.CELL_SIZE).astype(np.int64)
+        lastColumns = ((self.right - self.origin[0]) // self.CELL_SIZE).astype(np.int64)
+        firstRows = ((self.top - self.origin[1]) // self.CELL_SIZE).astype(np.int64)
+        lastRows = ((self.bottom - self.origin[1]) // self.CELL_SIZE).astype(np.int64)
+        self.columns = int(lastColumns.max()) + 1
+        self.rows = int(lastRows.max()) + 1
+
+        cells = []
+        widgets = []
+        for widgetIndex in range(len(rects)):
+            columnRange = np.arange(firstColumns[widgetIndex], max(firstColumns[widgetIndex], lastColumns[widgetIndex]) + 1)
+            rowRange = np.arange(firstRows[widgetIndex], max(firstRows[widgetIndex], lastRows[widgetIndex]) + 1)
+            widgetCells = np.add.outer(rowRange*self.columns, columnRange).ravel()
+            cells.append(widgetCells)
+            widgets.append(np.full(len(widgetCells), widgetIndex, dtype=np.int64))
+        cells = np.concatenate(cells)
+        widgets = np.concatenate(widgets)
+
+        # Group by cell, keeping the metadata order inside each cell
+        order = np.lexsort((widgets, cells))
+        self.cellWidgets = widgets[order]
+        self.cellStart = np.zeros(self.columns*self.rows + 1, dtype=np.int64)
+        np.cumsum(np.bincount(cells, minlength=self.columns*self.rows), out=self.cellStart[1:])
+
+    def query(self, posX : float, posY : float) -> list[dict]:
+        column = (posX - self.origin[0]) // self.CELL_SIZE
+        row = (posY - self.origin[1]) // self.CELL_SIZE
+        if not (0 <= column < self.columns and 0 <= row < self.rows):
+            return []
+        cell = int(row)*self.columns + int(column)
+        candidates = self.cellWidgets[self.cellStart[cell]:self.cellStart[cell + 1]]
+        inside = ((self.left[candidates] <= posX) & (posX <= self.right[candidates]) &
+                  (self.top[candidates] <= posY) & (posY <= self.bottom[candidates]))
+        return [self.metadata[widgetIndex] for widgetIndex in candidates[inside]]
+
 class AnnotatorSlide:
     def __init__(self, BackgroundImage : qt.QPixmap, Metadata : dict, Annotations : list[Annotation] = None, WindowOffset : list[int] = None):
 
@@ -406,6 +521,15 @@ class AnnotatorSlide:
         self.SlideBody = ""
         
         self.devicePixelRatio = 1.0
+
+        # Background with every persistent annotation that is not being edited drawn on it,
+        # one for the full resolution render and one for the display preview
+        self.__layers = {}
+        self.__previewBase = None
+        self.__previewBaseKey = None
+
+        self.__widgetIndex = None
+        self.__widgetIndexKey = None
         pass
 
     def AddAnnotation(self, annotation : Annotation):
@@ -414,17 +538,15 @@ class AnnotatorSlide:
         pass
 
     def FindWidgetsAtPos(self, posX, posY):
-        results = []
-
         posX += self.windowOffset[0]
         posY += self.windowOffset[1]
 
-        for widget in self.metadata:
-            rectX, rectY = widget["position"]
-            rectWidth, rectHeight = widget["size"]
-            if rectX <= posX <= rectX + rectWidth and rectY <= posY <= rectY + rectHeight:
-                results.append(widget)
-        return results
+        # Built on the first query and again if the metadata list is replaced or grows
+        indexKey = (id(self.metadata), len(self.metadata))
+        if self.__widgetIndexKey != indexKey:
+            self.__widgetIndex = WidgetIndex(list(self.metadata))
+            self.__widgetIndexKey = indexKey
+        return self.__widgetIndex.query(posX, posY)
 
     def FindAnnotationsAtPos(self, posX, posY):
         results = []
@@ -435,7 +557,10 @@ class AnnotatorSlide:
             if rectX <= posX <= rectX + rectWidth and rectY <= posY <= rectY + rectHeight:
                 results.append(annotation)
 
-        results.sort(reverse=True, key= lambda x: x.getSelectionBoundingBoxSize()[0]*x.getSelectionBoundingBoxSize()[1])
+        def area(annotation):
+            width, height = annotation.getSelectionBoundingBoxSize()
+            return width*height
+        results.sort(reverse=True, key=area)
         return results
 
 
@@ -471,24 +596,72 @@ class AnnotatorSlide:
         return self.outputImage.scaled(resizeX, resizeY,qt.Qt.IgnoreAspectRatio, qt.Qt.SmoothTransformation)
 
     def ReDraw(self):
-        del self.outputImage
-        self.outputImage = self.image.copy()
-        self.Draw()
+        """Redraws outputImage at the full screenshot resolution"""
+        self.outputImage = self.__composeLayers(("full", id(self.image)), self.image, 1.0, 1.0)
+
+    def GetPreview(self, width : int, height : int):
+        """Renders the slide at display size for the annotator.
+
+        The background is smooth scaled to the display size once and annotations are
+        drawn straight at that size through a scaled painter, the same mapping used by
+        MapImageToScreen. The full resolution render is left to ReDraw()/Draw() on export.
+        """
+        width, height = int(width), int(height)
+        baseKey = ("preview", id(self.image), width, height)
+        if self.__previewBaseKey != baseKey:
+            self.__previewBase = self.image.scaled(width, height, qt.Qt.IgnoreAspectRatio, qt.Qt.SmoothTransformation)
+            self.__previewBaseKey = baseKey
+        scaleX = width / self.image.width()
+        scaleY = height / self.image.height()
+        return self.__composeLayers(baseKey, self.__previewBase, scaleX, scaleY)
+
+    def __composeLayers(self, baseKey, base, scaleX, scaleY):
+        """Persistent annotations that are not selected are drawn once into a cached layer
+        that is only rebuilt when one of them changes. The annotations being edited are
+        drawn over a shallow copy of that layer, which Qt detaches on the first paint, so
+        a refresh costs one image copy plus the edited annotations no matter how many
+        annotations the slide has. Draw() still renders every annotation in order for export.
+        """
+        persistentAnnotations = []
+        liveAnnotations = []
+        for annotation in self.annotations:
+            if annotation.PERSISTENT and not annotation.drawBoundingBox:
+                persistentAnnotations.append(annotation)
+            else:
+                liveAnnotations.append(annotation)
+
+        layerKey = (baseKey, tuple(annotation.stateKey() for annotation in persistentAnnotations))
+        layer = self.__layers.get(baseKey[0])
+        if layer is None or layer[0] != layerKey:
+            layer = (layerKey, base.copy())
+            self.__paint(layer[1], persistentAnnotations, scaleX, scaleY)
+            self.__layers[baseKey[0]] = layer
+
+        composed = type(layer[1])(layer[1])
+        if liveAnnotations:
+            self.__paint(composed, liveAnnotations, scaleX, scaleY)
+        return composed
 
     def Draw(self):
-        painter = qt.QPainter(self.outputImage)
+        self.__paint(self.outputImage, self.annotations)
+
+    def __paint(self, target, annotations, scaleX=1.0, scaleY=1.0):
+        painter = qt.QPainter(target)
         painter.setRenderHint(qt.QPainter.Antialiasing, True)
+        if scaleX != 1.0 or scaleY != 1.0:
+            painter.scale(scaleX, scaleY)
         pen = qt.QPen()
         brush = qt.QBrush()
-        for annotation in self.annotations:
+        for annotation in annotations:
             annotation.draw(painter, pen, brush)
         painter.end()
 
 class AnnotatedTutorial:
     
     @staticmethod
-    def GetLocalizedDict(lang, tutorialName = ""):
-        dictPath = f"{os.path.dirname(__file__)}/../Outputs" + "/Annotations/text_dict_default.json"
+    def GetLocalizedDict(lang, tutorialName = "", context = None):
+        context = context or RunContext.latest()
+        dictPath = f"{context.annotationsPath}/text_dict_default.json"
         textDict = {}
         with open(dictPath, encoding='utf-8') as file:
                 textDict = json.load(file)
@@ -496,7 +669,8 @@ class AnnotatedTutorial:
 
     @staticmethod
     def LoadAnnotatedTutorial(path):
-        outputFolder = f"{os.path.dirname(__file__)}/../Outputs"
+        # The screenshots are in the Raw folder of the run the annotations belong to
+        context = RunContext.fromAnnotations(path)
 
         settings = slicer.app.userSettings()
         currentLanguage = settings.value("language")
@@ -504,7 +678,7 @@ class AnnotatedTutorial:
         imagePaths : list[str] = [] #TODO: Improve this part
         slides = []
 
-        textDict = AnnotatedTutorial.GetLocalizedDict(currentLanguage)
+        textDict = AnnotatedTutorial.GetLocalizedDict(currentLanguage, context=context)
         with open(path, encoding='utf-8') as file:
             rawData = json.load(file)
         TutorialInfo = {
@@ -513,11 +687,13 @@ class AnnotatedTutorial:
             "date": rawData["date"],
             "desc": rawData["desc"],
         }
+        # Finds the screenshots through Tutorial.json, they can be in the object store
+        rawTutorial = JSONHandler(context.rawPath)
         rawDataOffsetCounter = 0
         for slideData in rawData["slides"]:
             slideStep, slideImg = slideData['SlideCode'].split("/")
             slideStep = str(int(slideStep) - rawDataOffsetCounter)
-            rawStepPath = f"{outputFolder}/raw/{slideStep}/{slideImg}"
+            screenshotPath, metadataPath = rawTutorial.screenshotFiles(slideStep, slideImg)
             slideMetadata = []
             slideImage : qt.QImage = None
 
@@ -525,28 +701,24 @@ class AnnotatedTutorial:
             devicePixelRatio = 1.0  # Default for backward compatibility
             if slideData["SlideLayout"] == "Screenshot":
                 try:
-                    tsParser.metadata = rawStepPath + ".json"
+                    tsParser.metadata = metadataPath
                     slideMetadata = tsParser.getWidgets()
                     devicePixelRatio = tsParser.getDevicePixelRatio()
 
-                    slideImage = qt.QImage(rawStepPath + ".png")
+                    slideImage = TutorialScreenshot.readImage(screenshotPath)
                 except FileNotFoundError:
-                    stepPath = f"{outputFolder}/raw/{slideStep}"
                     slideMetadata = []
-                    test_contents = os.listdir(stepPath)
-                    for content in test_contents:
-                        if(".json" not in content):
-                            continue
-                        tsParser.metadata = f"{stepPath}/{content}"
+                    for stepMetadataPath in rawTutorial.stepMetadataFiles(slideStep):
+                        tsParser.metadata = stepMetadataPath
                         slideMetadata.extend(tsParser.getWidgets())
                         # Get DPR from the first metadata file found
                         if devicePixelRatio == 1.0:
                             devicePixelRatio = tsParser.getDevicePixelRatio()
 
-                    slideImage = qt.QImage(f"{outputFolder}/Annotations/{slideData['ImagePath']}")
+                    slideImage = qt.QImage(f"{context.annotationsPath}/{slideData['ImagePath']}")
             else:
                 rawDataOffsetCounter += 1
-                slideImage = qt.QImage(f"{outputFolder}/Annotations/{slideData['ImagePath']}")
+                slideImage = qt.QImage(f"{context.annotationsPath}/{slideData['ImagePath']}")
 
             annotations = []
             for annotationData in slideData["Annotations"]:
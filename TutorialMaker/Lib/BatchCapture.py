@@ -0,0 +1,242 @@
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+import traceback
+import qt
+import slicer
+from slicer.i18n import tr as _
+from Lib.RunContext import RunContext
+
+MODULE_PATH = os.path.normpath(os.path.dirname(__file__) + "/..")
+
+# Exit codes of the command line
+EXIT_CAPTURE_FAILED = 1   # some tutorials failed, the others were captured
+EXIT_SETUP_FAILED = 2     # nothing was captured: bad arguments, no main window, wrong pixel ratio
+
+def parseWindowSize(text) -> tuple[int, int]:
+    width, _separator, height = text.lower().partition("x")
+    try:
+        return int(width), int(height)
+    except ValueError:
+        raise argparse.ArgumentTypeError(_("window size has to be WIDTHxHEIGHT, got {text}").format(text=text)) from None
+
+def prepareWindow(windowSize=None, devicePixelRatio=None, fontSize=None):
+    """Puts the main window in a known state so captures of different machines and runs match.
+    Raises instead of capturing something else than what was asked"""
+    mainWindow = slicer.util.mainWindow()
+    if mainWindow is None:
+        raise RuntimeError(_("Capturing needs the main window. Run Slicer without --no-main-window, "
+                             "QT_QPA_PLATFORM=offscreen keeps it off the screen"))
+    # Qt fixes the ratio when the application starts, it can only be checked here
+    if devicePixelRatio is not None and abs(mainWindow.devicePixelRatioF() - devicePixelRatio) > 0.001:
+        raise RuntimeError(_("Slicer runs with a device pixel ratio of {actual}, start it with QT_SCALE_FACTOR={expected}").format(
+            actual=mainWindow.devicePixelRatioF(), expected=devicePixelRatio))
+    if fontSize is not None:
+        appFont = slicer.app.font()
+        appFont.setPointSize(fontSize)
+        slicer.app.setFont(appFont)
+    if windowSize is not None:
+        # A maximized or full screen window keeps the size of the screen
+        mainWindow.setWindowState(qt.Qt.WindowNoState)
+        mainWindow.showNormal()
+        mainWindow.resize(*windowSize)
+    slicer.app.processEvents()
+
+def measureRun(directory) -> tuple[int, int]:
+    """(screenshot steps, bytes of the screenshots) of a captured tutorial directory. Screenshots
+    shared through the object store count for every step that uses them"""
+    try:
+        with open(os.path.join(directory, "Tutorial.json"), encoding="utf-8") as fd:
+            steps = json.load(fd)["steps"]
+        imageBytes = 0
+        for step in steps:
+            for window in step:
+                imageBytes += os.path.getsize(os.path.join(directory, window["window"]))
+        return len(steps), imageBytes
+    except (OSError, ValueError, KeyError):
+        pass
+    # Failed before Tutorial.json was written, only the screenshots in the folder
+    imageBytes = 0
+    for root, _dirs, files in os.walk(directory):
+        for name in files:
+            if name.endswith(".png"):
+                imageBytes += os.path.getsize(os.path.join(root, name))
+    return 0, imageBytes
+
+class BatchCapture():
+    """Captures several tutorials one after the other, each one into its own RunContext.
+
+    Every tutorial starts from a cleared scene. A tutorial that fails is recorded and the batch
+    goes on with the next one. With an outputRoot every tutorial is captured to outputRoot/<tutorial>,
+    otherwise to a new run of Outputs/runs. When the last one is done the summary is written to
+    summaryPath, by default summary.json in outputRoot or Outputs/runs, and passed to callback.
+    With tileDeltas the screenshots are stored as the tiles that changed since the previous step.
+    """
+    def __init__(self, tutorials, outputRoot, callback=None, minimumStepWait=None, maximumStepWait=None, summaryPath=None,
+                 tileDeltas=False):
+        self.tutorials = list(tutorials)
+        self.outputRoot = outputRoot
+        self.summaryPath = summaryPath or os.path.join(self.summaryFolder(), "summary.json")
+        self.callback = callback
+        self.minimumStepWait = minimumStepWait
+        self.maximumStepWait = maximumStepWait
+        self.tileDeltas = tileDeltas
+
+        self.results = []
+        self.summary = None
+        self.__pending = []
+        self.__current = None
+        self.__scheduler = None
+        self.__context = None
+        self.__startTime = 0
+        self.__tutorialStart = 0
+
+    @staticmethod
+    def tutorialPath(tutorial):
+        """Tutorials are given by path or by the name of a file in Testing"""
+        if tutorial.endswith(".py"):
+            return os.path.abspath(tutorial)
+        return os.path.join(MODULE_PATH, "Testing", f"{tutorial}.py")
+
+    def summaryFolder(self):
+        return self.outputRoot or os.path.join(MODULE_PATH, "Outputs", "runs")
+
+    def contextFor(self, name):
+        if self.outputRoot is None:
+            context = RunContext.create(name)
+        else:
+            context = RunContext(os.path.join(self.outputRoot, name), name).ensureFolders()
+        context.tileDeltas = self.tileDeltas
+        return context
+
+    def start(self):
+        from Lib.TutorialUtils import Util
+        Util.verifyOutputFolders()
+        os.makedirs(os.path.dirname(self.summaryPath), exist_ok=True)
+        self.results = []
+        self.__pending = list(self.tutorials)
+        self.__startTime = time.perf_counter()
+        qt.QTimer.singleShot(0, self.__runNext)
+
+    def __runNext(self):
+        from Lib.TutorialUtils import SelfTestTutorialLayer
+        if not self.__pending:
+            self.__finish()
+            return
+
+        self.__current = self.__pending.pop(0)
+        logging.info(_("Capturing {tutorial}").format(tutorial=self.__current))
+        slicer.mrmlScene.Clear()
+        self.__tutorialStart = time.perf_counter()
+        self.__context = None
+        try:
+            self.__context = self.contextFor(os.path.splitext(os.path.basename(self.__current))[0])
+            self.__scheduler = SelfTestTutorialLayer.RunTutorialFile(self.tutorialPath(self.__current), self.__tutorialFinished,
+                                                                     self.minimumStepWait, self.maximumStepWait, interactive=False,
+                                                                     context=self.__context)
+        except Exception as e:
+            self.__scheduler = None
+            self.__record(e)
+            qt.QTimer.singleShot(0, self.__runNext)
+
+    def __tutorialFinished(self):
+        self.__record(self.__scheduler.error if self.__scheduler is not None else None)
+        # Out of the scheduler callback before the next tutorial starts
+        qt.QTimer.singleShot(0, self.__runNext)
+
+    def __record(self, error):
+        name = os.path.splitext(os.path.basename(self.__current))[0]
+        output = None
+        steps, imageBytes = 0, 0
+        if self.__context is not None:
+            output = self.__context.root
+            steps, imageBytes = measureRun(self.__context.rawPath)
+        result = {
+            "tutorial": name,
+            "output": output,
+            "duration": time.perf_counter() - self.__tutorialStart,
+            "steps": steps,
+            "imageBytes": imageBytes,
+            "error": None if error is None else str(error),
+        }
+        if error is not None:
+            logging.error(_("Failed to capture {tutorial}: {error}").format(tutorial=name, error=error))
+        self.results.append(result)
+
+    def objectStats(self):
+        """Deduplication of the screenshots of this batch in the object store"""
+        from Lib.ObjectStore import ObjectStore, referencedObjects
+        tutorialFiles = [os.path.join(result["output"], "Raw", "Tutorial.json") for result in self.results if result["output"]]
+        return ObjectStore().referenceStats(referencedObjects(tutorialFiles))
+
+    def __finish(self):
+        self.summary = {
+            "outputRoot": self.summaryFolder(),
+            "duration": time.perf_counter() - self.__startTime,
+            "tutorials": self.results,
+            "failures": sum(1 for result in self.results if result["error"] is not None),
+            "objects": self.objectStats(),
+        }
+        temporaryPath = f"{self.summaryPath}.{os.getpid()}.tmp"
+        with open(temporaryPath, "w", encoding="utf-8") as fd:
+            json.dump(self.summary, fd, indent=4)
+        os.replace(temporaryPath, self.summaryPath)
+        for result in self.results:
+            status = _("failed") if result["error"] is not None else _("captured")
+            print(f"{result['tutorial']}: {status}, {result['steps']} steps, {result['imageBytes']} bytes, {result['duration']:.1f}s")
+        if self.callback is not None:
+            self.callback(self.summary)
+
+def main(argv=None):
+    """Slicer --python-script TutorialMaker/Lib/BatchCapture.py [tutorials...] [--output folder]
+
+    Without tutorials every file of Testing is captured, without an output folder each tutorial
+    gets a new run of Outputs/runs. Nothing asks for confirmation, so it also runs unattended with
+    QT_QPA_PLATFORM=offscreen. Slicer exits with EXIT_CAPTURE_FAILED if any tutorial failed.
+    """
+    parser = argparse.ArgumentParser(prog="BatchCapture", description=_("Capture several tutorials, each into its own folder"))
+    parser.add_argument("tutorials", nargs="*", help=_("tutorial names from the Testing folder or paths to tutorial files"))
+    parser.add_argument("--output", default=None, help=_("folder for the captured tutorials, defaults to a new run of Outputs/runs for each"))
+    parser.add_argument("--minimum-step-wait", type=int, default=None, help=_("ms to wait at least after each step"))
+    parser.add_argument("--maximum-step-wait", type=int, default=None, help=_("ms to wait at most after each step"))
+    parser.add_argument("--language", default="en", help=_("language to capture in, from the translations of the Languages folder"))
+    parser.add_argument("--summary", default=None, help=_("file to write the summary to"))
+    parser.add_argument("--window-size", type=parseWindowSize, default=None, help=_("main window size, WIDTHxHEIGHT"))
+    parser.add_argument("--device-pixel-ratio", type=float, default=None, help=_("expected device pixel ratio, set it with QT_SCALE_FACTOR"))
+    parser.add_argument("--font-size", type=int, default=None, help=_("application font size in points"))
+    parser.add_argument("--tile-deltas", action="store_true", help=_("store the screenshots as the tiles that changed since the previous step"))
+    args = parser.parse_args(argv)
+
+    tutorials = args.tutorials
+    if not tutorials:
+        tutorials = sorted(os.path.splitext(name)[0] for name in os.listdir(os.path.join(MODULE_PATH, "Testing")) if name.endswith(".py"))
+    outputRoot = os.path.abspath(args.output) if args.output else None
+
+    def finished(summary):
+        slicer.util.exit(EXIT_CAPTURE_FAILED if summary["failures"] else 0)
+
+    from Lib.TutorialUtils import Util
+    prepareWindow(args.window_size, args.device_pixel_ratio, args.font_size)
+    Util.installTranslators(args.language)
+    summaryPath = os.path.abspath(args.summary) if args.summary else None
+    batch = BatchCapture(tutorials, outputRoot, finished, args.minimum_step_wait, args.maximum_step_wait, summaryPath, args.tile_deltas)
+    batch.start()
+    return batch
+
+if __name__ == "__main__":
+    # Run as a script the module folder is not on the path yet, go through Lib.BatchCapture
+    # so the batch and the module share the same classes
+    sys.path.insert(0, MODULE_PATH)
+    import Lib.BatchCapture
+    # Slicer keeps running after the script, every way out has to exit it
+    try:
+        _batch = Lib.BatchCapture.main(sys.argv[1:])
+    except SystemExit as e:
+        # --help and argument errors
+        slicer.util.exit(e.code if isinstance(e.code, int) else EXIT_SETUP_FAILED)
+    except Exception:
+        traceback.print_exc()
+        slicer.util.exit(EXIT_SETUP_FAILED)
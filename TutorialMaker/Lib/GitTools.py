@@ -1,7 +1,177 @@
+import io
+import os
+import json
+import time
+import hashlib
+import threading
+import zipfile
 import requests
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import quote
 from dataclasses import dataclass
 from slicer.i18n import tr as _
 
+# Can be pointed somewhere else, e.g. a GitHub Enterprise instance or a local server for testing
+GITHUB_API_URL = "https://api.github.com"
+GITHUB_RAW_URL = "https://raw.githubusercontent.com"
+GITHUB_ARCHIVE_URL = "https://github.com"
+
+MAX_DOWNLOAD_WORKERS = 8
+ARCHIVE_CHUNK_SIZE = 64*1024
+
+_session = None
+_sessionLock = threading.Lock()
+
+def getSession() -> requests.Session:
+    """Session shared by every request so connections are kept alive and reused"""
+    global _session
+    with _sessionLock:
+        if _session is None:
+            _session = requests.Session()
+            adapter = requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=MAX_DOWNLOAD_WORKERS)
+            _session.mount("https://", adapter)
+            _session.mount("http://", adapter)
+        return _session
+
+# Responses are kept here and revalidated with their ETag/Last-Modified headers
+CACHE_DIR = os.path.normpath(os.path.dirname(__file__) + "/../Outputs/Cache")
+
+_cache = None
+
+def getCache() -> "HttpCache":
+    global _cache
+    with _sessionLock:
+        if _cache is None or _cache.directory != CACHE_DIR:
+            _cache = HttpCache(CACHE_DIR)
+        return _cache
+
+class CachedResponse:
+    """The parts of a requests.Response the listing and download code uses.
+    changed is False when the body came from the cache, fresh or revalidated with a 304.
+    """
+    def __init__(self, url:str, status_code:int, content:bytes, encoding:str=None, changed:bool=True):
+        self.url = url
+        self.status_code = status_code
+        self.content = content
+        self.encoding = encoding
+        self.changed = changed
+
+    @property
+    def text(self) -> str:
+        return self.content.decode(self.encoding or "utf-8", errors="replace")
+
+    def json(self):
+        return json.loads(self.content)
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.HTTPError(f"{self.status_code} Error for url: {self.url}")
+
+class HttpCache:
+    """Persistent cache of GET responses, one body and one metadata file per URL.
+
+    A cached response younger than maxAge seconds is returned without any request,
+    an older one is revalidated with If-None-Match/If-Modified-Since and a 304 answer
+    only refreshes its age. Only 200 responses are stored.
+    """
+    def __init__(self, directory:str):
+        self.directory = directory
+        self.hits = 0
+        self.revalidated = 0
+        self.misses = 0
+
+    def __paths(self, url:str):
+        key = hashlib.sha256(url.encode("utf-8")).hexdigest()
+        return os.path.join(self.directory, key + ".body"), os.path.join(self.directory, key + ".json")
+
+    def __write(self, path:str, data:bytes):
+        temporaryPath = f"{path}.{threading.get_ident()}.tmp"
+        with open(temporaryPath, "wb") as fd:
+            fd.write(data)
+        os.replace(temporaryPath, path)
+
+    def fetch(self, url:str, maxAge:float=0) -> CachedResponse:
+        bodyPath, metadataPath = self.__paths(url)
+        metadata = None
+        try:
+            with open(metadataPath, encoding="utf-8") as fd:
+                metadata = json.load(fd)
+            with open(bodyPath, "rb") as fd:
+                content = fd.read()
+        except (OSError, ValueError):
+            metadata = None
+
+        if metadata is not None and time.time() - metadata["fetched"] < maxAge:
+            self.hits += 1
+            return CachedResponse(url, 200, content, metadata["encoding"], changed=False)
+
+        headers = {}
+        if metadata is not None:
+            if metadata.get("etag"):
+                headers["If-None-Match"] = metadata["etag"]
+            if metadata.get("lastModified"):
+                headers["If-Modified-Since"] = metadata["lastModified"]
+        response = getSession().get(url, headers=headers)
+
+        if response.status_code == 304 and metadata is not None:
+            self.revalidated += 1
+            metadata["fetched"] = time.time()
+            self.__write(metadataPath, json.dumps(metadata).encode("utf-8"))
+            return CachedResponse(url, 200, content, metadata["encoding"], changed=False)
+
+        self.misses += 1
+        if response.status_code == 200:
+            os.makedirs(self.directory, exist_ok=True)
+            self.__write(bodyPath, response.content)
+            self.__write(metadataPath, json.dumps({
+                "url": url,
+                "etag": response.headers.get("ETag"),
+                "lastModified": response.headers.get("Last-Modified"),
+                "encoding": response.encoding,
+                "fetched": time.time(),
+            }).encode("utf-8"))
+        return CachedResponse(url, response.status_code, response.content, response.encoding)
+
+_archiveStateLock = threading.Lock()
+
+def _loadArchiveState() -> dict:
+    try:
+        with open(os.path.join(CACHE_DIR, "archives.json"), encoding="utf-8") as fd:
+            return json.load(fd)
+    except (OSError, ValueError):
+        return {}
+
+def _saveArchiveState(key:str, state:dict):
+    with _archiveStateLock:
+        states = _loadArchiveState()
+        states[key] = state
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        path = os.path.join(CACHE_DIR, "archives.json")
+        with open(path + ".tmp", "w", encoding="utf-8") as fd:
+            json.dump(states, fd)
+        os.replace(path + ".tmp", path)
+
+def _writeIfChanged(path:str, data:bytes) -> bool:
+    try:
+        if os.path.getsize(path) == len(data):
+            with open(path, "rb") as fd:
+                if fd.read() == data:
+                    return False
+    except OSError:
+        pass
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path + ".tmp", "wb") as fd:
+        fd.write(data)
+    os.replace(path + ".tmp", path)
+    return True
+
+@dataclass
+class ArchiveSync:
+    files: list             # tutorial scripts in the destination folder
+    assets: list            # the other files of the tutorial folders
+    transferredBytes: int
+    changed: bool
+
 @dataclass
 class GitFile:
     gitType: str
@@ -17,11 +187,16 @@ class GitFile:
         file = self.__file__(path)
         return list(file.files.keys())
 
+    def getFile(self, path:str) -> "GitFile":
+        return self.__file__(path)
+
     def getRaw(self, path:str) -> str:
         file = self.__file__(path)
         if file.gitType != "file":
             raise OSError(_(f"Expected file type, got {file.gitType} type"))
-        return requests.get(file.url).text
+        response = getCache().fetch(file.url)
+        response.raise_for_status()
+        return response.text
 
     def __file__(self, path:str):
         if path == "":
@@ -36,9 +211,58 @@ class GitFile:
 
 class GitTools:
 
-    def ParseRepo(repo:str, path="") -> GitFile:
-        endpoint = f"https://api.github.com/repos/{repo}/contents/{path}"
-        response = requests.get(endpoint)
+    def ParseRepo(repo:str, path="", ref="HEAD", maxAge=0) -> GitFile:
+        """Lists the repository at ref with a single recursive git trees request and returns
+        the GitFile of path, only the entries below path are kept.
+        Falls back to listing directory by directory if GitHub truncates the tree.
+        Listings cached less than maxAge seconds ago are used without asking GitHub.
+        """
+        endpoint = f"{GITHUB_API_URL}/repos/{repo}/git/trees/{quote(ref, safe='')}?recursive=1"
+        response = getCache().fetch(endpoint, maxAge)
+        if response.status_code != 200 and response.status_code != 403 and response.status_code != 404:
+            raise Exception(f"{endpoint} : {response.text}")
+        contents = response.json()
+        if not isinstance(contents, dict) or not isinstance(contents.get("tree"), list):
+            if isinstance(contents, dict) and 'message' in contents:
+                raise Exception(_("Message from {endpoint}: {message}").format(endpoint=endpoint, message=contents['message']))
+            raise Exception(_("Malformed Response from {endpoint}").format(endpoint=endpoint))
+        if contents.get("truncated", False):
+            return GitTools.ParseRepoContents(repo, path, maxAge)
+
+        return GitTools.BuildTree(repo, ref, contents["tree"], path)
+
+    def BuildTree(repo:str, ref:str, entries:list[dict], path="") -> GitFile:
+        prefix = path.strip("/")
+        root = GitFile("dir", prefix)
+        for entry in entries:
+            entryPath = entry["path"]
+            if prefix != "":
+                if not entryPath.startswith(prefix + "/"):
+                    continue
+                relativePath = entryPath[len(prefix) + 1:]
+            else:
+                relativePath = entryPath
+
+            parent = root
+            segments = relativePath.split("/")
+            for depth, segment in enumerate(segments[:-1]):
+                if segment not in parent.files:
+                    parent.files[segment] = GitFile("dir", "/".join(filter(None, [prefix, *segments[:depth + 1]])))
+                parent = parent.files[segment]
+
+            name = segments[-1]
+            if entry["type"] == "tree":
+                if name not in parent.files:
+                    parent.files[name] = GitFile("dir", entryPath)
+            elif entry["type"] == "blob":
+                _file = GitFile("file", entryPath)
+                _file.url = f"{GITHUB_RAW_URL}/{repo}/{quote(ref)}/{quote(entryPath)}"
+                parent.files[name] = _file
+        return root
+
+    def ParseRepoContents(repo:str, path="", maxAge=0) -> GitFile:
+        endpoint = f"{GITHUB_API_URL}/repos/{repo}/contents/{path}"
+        response = getCache().fetch(endpoint, maxAge)
         if response.status_code != 200 and response.status_code != 403:
             raise Exception(f"{endpoint} : {response.text}")
         contents = response.json()
@@ -51,15 +275,15 @@ class GitTools:
         for data in contents:
             _file = GitFile(data["type"], data["path"])
             if _file.gitType == "dir":
-                _file.setFiles(GitTools.__parseRecursive__(repo, data["path"]))
+                _file.setFiles(GitTools.__parseRecursive__(repo, data["path"], maxAge))
             elif _file.gitType == "file":
                 _file.url = data["download_url"]
             root.files[data["name"]] = _file
         return root
 
-    def __parseRecursive__(repo:str, path=""):
-        endpoint = f"https://api.github.com/repos/{repo}/contents/{path}"
-        response = requests.get(endpoint)
+    def __parseRecursive__(repo:str, path="", maxAge=0):
+        endpoint = f"{GITHUB_API_URL}/repos/{repo}/contents/{path}"
+        response = getCache().fetch(endpoint, maxAge)
         if response.status_code != 200 and response.status_code != 403:
             raise Exception(f"{endpoint} : {response.text}")
         contents = response.json()
@@ -72,12 +296,91 @@ class GitTools:
         for data in contents:
             _file = GitFile(data["type"], data["path"])
             if _file.gitType == "dir":
-                _file.setFiles(GitTools.__parseRecursive__(repo, data["path"]))
+                _file.setFiles(GitTools.__parseRecursive__(repo, data["path"], maxAge))
             elif _file.gitType == "file":
                 _file.url = data["download_url"]
             files[data["name"]] = _file
         return files
 
+    def DownloadFiles(downloads:list[tuple[str, str]], maxWorkers=MAX_DOWNLOAD_WORKERS, maxAge=0,
+                      progress=None, cancelled:threading.Event=None) -> list[tuple[str, Exception]]:
+        """Downloads (url, destination) pairs as text files on a thread pool sharing one session.
+        Files that did not change since the last download are not rewritten.
+        progress(url, destination, transferredBytes) is called from the pool threads after every
+        successful download. Once cancelled is set the downloads that did not start are skipped.
+        Returns (url, error) for every download that failed, the others are written anyway.
+        """
+        def download(url, destination):
+            if cancelled is not None and cancelled.is_set():
+                return
+            response = getCache().fetch(url, maxAge)
+            response.raise_for_status()
+            if response.changed or not os.path.exists(destination):
+                with open(destination, "w", encoding='utf-8') as fd:
+                    fd.write(response.text)
+            if progress is not None:
+                progress(url, destination, len(response.content) if response.changed else 0)
+
+        errors = []
+        with ThreadPoolExecutor(max_workers=maxWorkers) as executor:
+            futures = [(url, executor.submit(download, url, destination)) for url, destination in downloads]
+            for url, future in futures:
+                error = future.exception()
+                if error is not None:
+                    errors.append((url, error))
+        return errors
+
+    def SyncRepoArchive(repo:str, destination:str, ref="HEAD", maxAge=0, cancelled:threading.Event=None) -> ArchiveSync:
+        """Downloads the archive of repo at ref in one request and extracts the tutorials from memory.
+
+        Tutorials/<name>/<script>.py is written to destination, every other file of the tutorial
+        folder to destination/<name>/. Files with the same content are not rewritten.
+        The ETag of the archive is recorded, an unchanged repository is answered with a 304 and
+        nothing is extracted, within maxAge seconds of the last sync it is not asked at all.
+        """
+        url = f"{GITHUB_ARCHIVE_URL}/{repo}/archive/{quote(ref)}.zip"
+        stateKey = f"{url} {os.path.abspath(destination)}"
+        state = _loadArchiveState().get(stateKey)
+        if state is not None and not all(os.path.exists(path) for path in state["files"] + state["assets"]):
+            state = None
+        if state is not None and time.time() - state["fetched"] < maxAge:
+            return ArchiveSync(state["files"], state["assets"], 0, False)
+
+        headers = {"If-None-Match": state["etag"]} if state is not None and state["etag"] else {}
+        archiveData = io.BytesIO()
+        with getSession().get(url, headers=headers, stream=True) as response:
+            if response.status_code == 304 and state is not None:
+                state["fetched"] = time.time()
+                _saveArchiveState(stateKey, state)
+                return ArchiveSync(state["files"], state["assets"], 0, False)
+            response.raise_for_status()
+            etag = response.headers.get("ETag")
+            for chunk in response.iter_content(ARCHIVE_CHUNK_SIZE):
+                if cancelled is not None and cancelled.is_set():
+                    return ArchiveSync([], [], archiveData.tell(), False)
+                archiveData.write(chunk)
+
+        transferredBytes = archiveData.tell()
+        files = []
+        assets = []
+        changed = False
+        with zipfile.ZipFile(archiveData) as archive:
+            for info in archive.infolist():
+                # Entries are inside a "<repository>-<commit>/" folder
+                parts = info.filename.split("/")[1:]
+                if info.is_dir() or len(parts) < 3 or parts[0] != "Tutorials" or any(part in ("", ".", "..") for part in parts):
+                    continue
+                if len(parts) == 3 and parts[2].endswith(".py"):
+                    path = os.path.join(destination, parts[2])
+                    files.append(path)
+                else:
+                    path = os.path.join(destination, *parts[1:])
+                    assets.append(path)
+                changed = _writeIfChanged(path, archive.read(info)) or changed
+
+        _saveArchiveState(stateKey, {"etag": etag, "fetched": time.time(), "files": files, "assets": assets})
+        return ArchiveSync(files, assets, transferredBytes, changed)
+
     def downloadRepoZip(fullrepo:str, saveToPath:str, branch:str):
         import SampleData
         fullurl = f"{fullrepo}/archive/refs/heads/{branch}"
@@ -0,0 +1,256 @@
+import os
+import sys
+import json
+import time
+import hashlib
+import argparse
+import threading
+import collections
+
+OUTPUTS_DIR = os.path.normpath(os.path.dirname(__file__) + "/../Outputs")
+OBJECTS_DIR = os.path.join(OUTPUTS_DIR, "objects")
+
+# Keys of a window in Tutorial.json that name objects of the store
+HASH_KEYS = ["windowHash", "metadataHash"]
+# Screenshots stored as the tiles that changed since the previous one, see Lib.TileDelta
+DELTA_SUFFIX = ".tiles"
+DELTA_MAGIC = b"TUTORIALMAKER TILES 1\n"
+# Captures outside Outputs that use the store, one folder per line, so gc() finds their Tutorial.json
+ROOTS_FILE = "roots.txt"
+
+class ObjectStore():
+    """Files stored once under the hash of their content: root/<first two digits>/<hash><suffix>.
+
+    Screenshots are named after the hash of their pixels, so an identical window is neither
+    encoded nor written again, whatever step, run or language it comes from. Objects are written
+    atomically and never modified, concurrent captures, also from other processes, can share
+    the store. Tutorial.json files reference their objects by name, gc() removes the others.
+    Tile deltas reference the object they are based on, it is kept as long as they are.
+    Captures written outside Outputs are recorded with registerRoot() for gc() to see them.
+    """
+    def __init__(self, root=None):
+        self.root = os.path.abspath(root or OBJECTS_DIR)
+        self.lock = threading.Lock()
+        self.writing = set()
+        # Since this store was created, objects written and references to objects already stored
+        self.added = 0
+        self.addedBytes = 0
+        self.reused = 0
+
+    @staticmethod
+    def name(digest, suffix):
+        return digest + suffix
+
+    def path(self, name):
+        return os.path.join(self.root, name[:2], name)
+
+    def reserve(self, name):
+        """True if the caller has to write the object, False if it is stored or being written already"""
+        with self.lock:
+            if name in self.writing:
+                self.reused += 1
+                return False
+            try:
+                # Reused objects count as new for gc(), the capture writes its Tutorial.json at the end
+                os.utime(self.path(name))
+                self.reused += 1
+                return False
+            except FileNotFoundError:
+                pass
+            self.writing.add(name)
+            return True
+
+    def release(self, name):
+        """Gives up a reservation without writing the object"""
+        with self.lock:
+            self.writing.discard(name)
+
+    def write(self, name, data:bytes):
+        """Writes a reserved object"""
+        path = self.path(name)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            temporaryPath = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(temporaryPath, "wb") as fd:
+                fd.write(data)
+            os.replace(temporaryPath, path)
+        finally:
+            self.release(name)
+        with self.lock:
+            self.added += 1
+            self.addedBytes += len(data)
+
+    def put(self, data:bytes, suffix=""):
+        """Stores data if it is not there yet, returns its name"""
+        name = self.name(hashlib.sha256(data).hexdigest(), suffix)
+        if self.reserve(name):
+            self.write(name, data)
+        return name
+
+    def registerRoot(self, root):
+        """Records a folder with captures using this store, unless gc() looks there anyway"""
+        root = os.path.abspath(root)
+        try:
+            inOutputs = os.path.commonpath([root, OUTPUTS_DIR]) == OUTPUTS_DIR
+        except ValueError:
+            # Another drive
+            inOutputs = False
+        if inOutputs or root in self.registeredRoots():
+            return
+        os.makedirs(self.root, exist_ok=True)
+        # Lines appended at once, other processes may register at the same time
+        with open(os.path.join(self.root, ROOTS_FILE), "a", encoding="utf-8") as fd:
+            fd.write(root + "\n")
+
+    def registeredRoots(self):
+        try:
+            with open(os.path.join(self.root, ROOTS_FILE), encoding="utf-8") as fd:
+                return list(dict.fromkeys(line.strip() for line in fd if line.strip()))
+        except OSError:
+            return []
+
+    def stats(self):
+        references = self.added + self.reused
+        return {"added": self.added, "addedBytes": self.addedBytes, "reused": self.reused,
+                "dedupRatio": references / self.added if self.added else 1.0}
+
+    def objects(self):
+        """Name of every stored object"""
+        if not os.path.isdir(self.root):
+            return
+        for folder in os.listdir(self.root):
+            folderPath = os.path.join(self.root, folder)
+            if len(folder) != 2 or not os.path.isdir(folderPath):
+                continue
+            for name in os.listdir(folderPath):
+                if not name.endswith(".tmp"):
+                    yield name
+
+    def links(self, name):
+        """Objects needed to read name, the base of a tile delta"""
+        if not name.endswith(DELTA_SUFFIX):
+            return []
+        try:
+            with open(self.path(name), "rb") as fd:
+                if fd.readline() != DELTA_MAGIC:
+                    return []
+                return [json.loads(fd.readline())["base"]]
+        except (OSError, ValueError, KeyError):
+            return []
+
+    def withLinks(self, references) -> collections.Counter:
+        """references and, without uses of their own, every object they need"""
+        references = collections.Counter(references)
+        pending = list(references)
+        while pending:
+            for link in self.links(pending.pop()):
+                if link not in references:
+                    references[link] = 0
+                    pending.append(link)
+        return references
+
+    def referenceStats(self, references):
+        """Size of the referenced objects against the size they would take as separate files.
+        references counts the uses of every object, see referencedObjects()"""
+        references = self.withLinks(references)
+        objectBytes = 0
+        referencedBytes = 0
+        for name, count in references.items():
+            try:
+                size = os.path.getsize(self.path(name))
+            except OSError:
+                continue
+            objectBytes += size
+            referencedBytes += size * count
+        return {"references": sum(references.values()), "objects": len(references), "bytes": objectBytes,
+                "referencedBytes": referencedBytes, "dedupRatio": referencedBytes / objectBytes if objectBytes else 1.0}
+
+    def diskStats(self, references):
+        """referenceStats() and everything that is stored, referenced or not"""
+        stats = self.referenceStats(references)
+        stats["storedObjects"] = 0
+        stats["storedBytes"] = 0
+        for name in self.objects():
+            stats["storedObjects"] += 1
+            stats["storedBytes"] += os.path.getsize(self.path(name))
+        return stats
+
+    def gc(self, referenced, minimumAge=0):
+        """Removes the objects that are not in referenced, returns (objects, bytes) removed.
+        Objects younger than minimumAge seconds are kept, with what they link to: a capture still
+        running writes its Tutorial.json only after the last screenshot, and reserve() refreshes
+        the objects it reuses."""
+        now = time.time()
+        sizes = {}
+        keep = collections.Counter(referenced)
+        for name in self.objects():
+            try:
+                fileStat = os.stat(self.path(name))
+            except OSError:
+                continue
+            sizes[name] = fileStat.st_size
+            if now - fileStat.st_mtime < minimumAge:
+                keep[name] += 0
+        referenced = self.withLinks(keep)
+        removed = 0
+        removedBytes = 0
+        for name, size in sizes.items():
+            if name in referenced:
+                continue
+            try:
+                os.remove(self.path(name))
+            except OSError:
+                continue
+            removed += 1
+            removedBytes += size
+        return removed, removedBytes
+
+def findTutorialFiles(roots):
+    """Every Tutorial.json under roots, once even if roots are nested"""
+    found = set()
+    for root in roots:
+        for folder, folders, files in os.walk(root):
+            # Thousands of objects and cached files, no tutorial among them
+            folders[:] = [name for name in folders if name not in ("objects", "Cache")]
+            path = os.path.realpath(os.path.join(folder, "Tutorial.json"))
+            if "Tutorial.json" in files and path not in found:
+                found.add(path)
+                yield path
+
+def referencedObjects(tutorialFiles) -> collections.Counter:
+    """How many times the Tutorial.json files use each object"""
+    references = collections.Counter()
+    for path in tutorialFiles:
+        try:
+            with open(path, encoding="utf-8") as fd:
+                steps = json.load(fd).get("steps", [])
+        except (OSError, ValueError):
+            continue
+        for step in steps:
+            for window in step:
+                for key in HASH_KEYS:
+                    if key in window:
+                        references[window[key]] += 1
+    return references
+
+def main(argv=None):
+    """python TutorialMaker/Lib/ObjectStore.py stats|gc [--root folder...]"""
+    parser = argparse.ArgumentParser(prog="ObjectStore", description="Statistics and garbage collection of the screenshot store")
+    parser.add_argument("command", choices=["stats", "gc"])
+    parser.add_argument("--store", default=OBJECTS_DIR, help="object store folder")
+    parser.add_argument("--root", nargs="*", default=[], help="more folders with captured tutorials than Outputs and the ones the captures registered, their objects are kept")
+    parser.add_argument("--minimum-age", type=float, default=3600, help="seconds, newer objects are kept by gc")
+    args = parser.parse_args(argv)
+
+    store = ObjectStore(args.store)
+    references = referencedObjects(findTutorialFiles([OUTPUTS_DIR, *args.root, *store.registeredRoots()]))
+    if args.command == "gc":
+        removed, removedBytes = store.gc(references, args.minimum_age)
+        print(f"Removed {removed} objects, {removedBytes} bytes")
+    stats = store.diskStats(references)
+    print(f"{stats['storedObjects']} objects stored in {stats['storedBytes']} bytes, {stats['references']} references "
+          f"to {stats['objects']} of them, {stats['referencedBytes']} bytes as separate files, dedup ratio {stats['dedupRatio']:.2f}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
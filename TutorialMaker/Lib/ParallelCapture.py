@@ -0,0 +1,176 @@
+import os
+import sys
+import json
+import time
+import argparse
+import subprocess
+import concurrent.futures
+
+# No slicer or qt here, the orchestrator runs from any Python and starts Slicer itself
+
+MODULE_PATH = os.path.normpath(os.path.dirname(__file__) + "/..")
+BATCH_SCRIPT = os.path.join(MODULE_PATH, "Lib", "BatchCapture.py")
+LANGUAGES = ["en", "fr", "es", "pt_BR"]
+
+class CaptureJob():
+    """One Slicer worker: some tutorials in one language"""
+    def __init__(self, language, tutorials, outputRoot, name):
+        self.language = language
+        self.tutorials = list(tutorials)
+        self.name = name
+        self.outputPath = os.path.join(outputRoot, language)
+        self.summaryPath = os.path.join(outputRoot, "jobs", f"{name}.json")
+        self.logPath = os.path.join(outputRoot, "jobs", f"{name}.log")
+        self.returnCode = None
+        self.duration = 0
+        self.error = None
+
+class ParallelCapture():
+    """Captures tutorials in several languages at once, one headless Slicer process per job.
+
+    A job is a language, or a tutorial in a language with perTutorial. Every worker runs
+    Lib/BatchCapture.py and captures to outputRoot/<language>/<tutorial>, with its summary in
+    outputRoot/jobs. At most `workers` Slicer processes run at the same time. Once they are all
+    done run() merges the summaries into outputRoot/<language>/manifest.json and
+    outputRoot/manifest.json and returns the latter.
+    `slicer` is the Slicer executable, or a list with the executable and its first arguments.
+    windowSize and devicePixelRatio fix the geometry of every worker, the ratio through
+    QT_SCALE_FACTOR since Qt only reads it at startup.
+    """
+    def __init__(self, slicer, tutorials, outputRoot, languages=None, workers=None, perTutorial=False,
+                 offscreen=True, timeout=None, extraArguments=None, windowSize=None, devicePixelRatio=None):
+        self.slicer = [slicer] if isinstance(slicer, str) else list(slicer)
+        self.tutorials = list(tutorials)
+        self.outputRoot = os.path.abspath(outputRoot)
+        self.languages = list(languages or LANGUAGES)
+        self.workers = workers or os.cpu_count() or 1
+        self.perTutorial = perTutorial
+        self.offscreen = offscreen
+        self.timeout = timeout
+        self.extraArguments = list(extraArguments or [])
+        self.windowSize = windowSize
+        self.devicePixelRatio = devicePixelRatio
+        self.jobs = []
+
+    def createJobs(self):
+        jobs = []
+        for language in self.languages:
+            if self.perTutorial:
+                for tutorial in self.tutorials:
+                    name = f"{language}-{os.path.splitext(os.path.basename(tutorial))[0]}"
+                    jobs.append(CaptureJob(language, [tutorial], self.outputRoot, name))
+            else:
+                jobs.append(CaptureJob(language, self.tutorials, self.outputRoot, language))
+        return jobs
+
+    def command(self, job):
+        arguments = ["--output", job.outputPath, "--language", job.language, "--summary", job.summaryPath]
+        if self.windowSize is not None:
+            arguments += ["--window-size", "{}x{}".format(*self.windowSize)]
+        if self.devicePixelRatio is not None:
+            arguments += ["--device-pixel-ratio", str(self.devicePixelRatio)]
+        return self.slicer + ["--no-splash", "--python-script", BATCH_SCRIPT, *job.tutorials, *arguments, *self.extraArguments]
+
+    def environment(self):
+        environment = dict(os.environ)
+        if self.offscreen:
+            environment["QT_QPA_PLATFORM"] = "offscreen"
+        if self.devicePixelRatio is not None:
+            environment["QT_SCALE_FACTOR"] = str(self.devicePixelRatio)
+        return environment
+
+    def runJob(self, job):
+        os.makedirs(os.path.dirname(job.logPath), exist_ok=True)
+        startTime = time.perf_counter()
+        with open(job.logPath, "w", encoding="utf-8") as log:
+            try:
+                job.returnCode = subprocess.run(self.command(job), stdout=log, stderr=subprocess.STDOUT,
+                                                env=self.environment(), timeout=self.timeout).returncode
+            except subprocess.TimeoutExpired:
+                job.error = f"Timed out after {self.timeout}s"
+            except OSError as e:
+                job.error = f"Could not start Slicer: {e}"
+        job.duration = time.perf_counter() - startTime
+        return job
+
+    def run(self):
+        startTime = time.perf_counter()
+        self.jobs = self.createJobs()
+        with concurrent.futures.ThreadPoolExecutor(max_workers=self.workers) as pool:
+            for job in pool.map(self.runJob, self.jobs):
+                status = "failed" if job.error or job.returnCode else "done"
+                print(f"{job.name}: {status} in {job.duration:.1f}s", flush=True)
+        return self.mergeManifests(time.perf_counter() - startTime)
+
+    @staticmethod
+    def readSummary(job):
+        """Results of a job, every tutorial fails when the worker died before writing its summary"""
+        try:
+            with open(job.summaryPath, encoding="utf-8") as fd:
+                return json.load(fd)["tutorials"]
+        except (OSError, ValueError, KeyError):
+            error = job.error or f"Slicer exited with code {job.returnCode} without a summary, see {job.logPath}"
+            return [{"tutorial": os.path.splitext(os.path.basename(tutorial))[0], "output": None, "duration": 0,
+                     "steps": 0, "imageBytes": 0, "error": error} for tutorial in job.tutorials]
+
+    def mergeManifests(self, duration):
+        manifest = {"outputRoot": self.outputRoot, "duration": duration, "languages": {}, "jobs": [], "failures": 0}
+        for language in self.languages:
+            results = []
+            for job in self.jobs:
+                if job.language == language:
+                    results.extend(self.readSummary(job))
+            languageManifest = {
+                "language": language,
+                "tutorials": results,
+                "failures": sum(1 for result in results if result["error"] is not None),
+                "imageBytes": sum(result["imageBytes"] for result in results),
+            }
+            path = os.path.join(self.outputRoot, language, "manifest.json")
+            self.writeJSON(path, languageManifest)
+            manifest["languages"][language] = path
+            manifest["failures"] += languageManifest["failures"]
+        for job in self.jobs:
+            manifest["jobs"].append({"name": job.name, "language": job.language, "duration": job.duration,
+                                     "returnCode": job.returnCode, "error": job.error, "log": job.logPath})
+        self.writeJSON(os.path.join(self.outputRoot, "manifest.json"), manifest)
+        return manifest
+
+    @staticmethod
+    def writeJSON(path, data):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path + ".tmp", "w", encoding="utf-8") as fd:
+            json.dump(data, fd, indent=4)
+        os.replace(path + ".tmp", path)
+
+def main(argv=None):
+    """python TutorialMaker/Lib/ParallelCapture.py --slicer <Slicer executable> [tutorials...]"""
+    parser = argparse.ArgumentParser(prog="ParallelCapture", description="Capture tutorials in several languages with one Slicer process per job")
+    parser.add_argument("tutorials", nargs="*", help="tutorial names from the Testing folder or paths to tutorial files, all of Testing by default")
+    parser.add_argument("--slicer", required=True, help="Slicer executable")
+    parser.add_argument("--languages", nargs="+", default=LANGUAGES)
+    parser.add_argument("--output", default=None, help="folder for the captures and manifests, defaults to Outputs/runs/parallel-<date>")
+    parser.add_argument("--workers", type=int, default=None, help="Slicer processes at the same time, one per core by default")
+    parser.add_argument("--per-tutorial", action="store_true", help="one process per tutorial and language instead of per language")
+    parser.add_argument("--timeout", type=float, default=None, help="seconds before a worker is stopped")
+    parser.add_argument("--no-offscreen", action="store_true", help="show the Slicer windows instead of rendering offscreen")
+    parser.add_argument("--window-size", default="1920x1080", help="main window size of every worker, WIDTHxHEIGHT")
+    parser.add_argument("--device-pixel-ratio", type=float, default=None, help="device pixel ratio of every worker")
+    parser.add_argument("--tile-deltas", action="store_true", help="store the screenshots as the tiles that changed since the previous step")
+    args = parser.parse_args(argv)
+
+    tutorials = args.tutorials
+    if not tutorials:
+        tutorials = sorted(os.path.splitext(name)[0] for name in os.listdir(os.path.join(MODULE_PATH, "Testing")) if name.endswith(".py"))
+    outputRoot = args.output or os.path.join(MODULE_PATH, "Outputs", "runs", "parallel-" + time.strftime("%Y%m%d-%H%M%S"))
+
+    width, _separator, height = args.window_size.lower().partition("x")
+    capture = ParallelCapture(args.slicer, tutorials, outputRoot, args.languages, args.workers, args.per_tutorial,
+                              not args.no_offscreen, args.timeout, ["--tile-deltas"] if args.tile_deltas else None,
+                              windowSize=(int(width), int(height)), devicePixelRatio=args.device_pixel_ratio)
+    manifest = capture.run()
+    print(f"{manifest['failures']} failures in {manifest['duration']:.1f}s, manifest: {os.path.join(capture.outputRoot, 'manifest.json')}")
+    return 1 if manifest["failures"] else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,77 @@
+import os
+import weakref
+import qt
+
+resourceFolder = os.path.normpath(os.path.dirname(__file__) + '/../Resources')
+
+def loadImage(path, width=0, height=0, aspectRatioMode=qt.Qt.IgnoreAspectRatio, transformMode=qt.Qt.FastTransformation):
+    image = qt.QImage(path)
+    if width > 0 and height > 0:
+        image = image.scaled(width, height, aspectRatioMode, transformMode)
+    elif width > 0:
+        image = image.scaledToWidth(width, transformMode)
+    return image
+
+class ResourceOwner():
+    """Owner token for references that are swapped during the lifetime of an object,
+    replacing the token releases everything acquired with the previous one"""
+    pass
+
+class ResourceCache():
+    """Process wide cache of the images, icons, fonts and font metrics used to draw annotations.
+
+    Entries are keyed on everything needed to create them and reference counted, the
+    first acquire() creates the resource and the last release() drops it. Passing an
+    owner ties the reference to that object, it is released when the owner is garbage
+    collected. Without an owner the reference is kept for the lifetime of the process.
+    Returned resources are shared, callers must not modify them.
+    """
+    def __init__(self):
+        self.entries = {}
+        self.loads = 0
+
+    def acquire(self, key, create, owner=None):
+        entry = self.entries.get(key)
+        if entry is None:
+            entry = [create(), 0]
+            self.entries[key] = entry
+            self.loads += 1
+        entry[1] += 1
+        if owner is not None:
+            weakref.finalize(owner, self.release, key)
+        return entry[0]
+
+    def release(self, key):
+        entry = self.entries.get(key)
+        if entry is None:
+            return
+        entry[1] -= 1
+        if entry[1] <= 0:
+            del self.entries[key]
+
+    def refCount(self, key):
+        entry = self.entries.get(key)
+        return 0 if entry is None else entry[1]
+
+    def image(self, path, width=0, height=0, aspectRatioMode=qt.Qt.IgnoreAspectRatio, transformMode=qt.Qt.FastTransformation, owner=None):
+        """QImage loaded from path, scaled to width x height when given. A height of 0 keeps the aspect ratio"""
+        key = ("image", os.path.normpath(path), width, height, aspectRatioMode, transformMode)
+        return self.acquire(key, lambda: loadImage(path, width, height, aspectRatioMode, transformMode), owner)
+
+    def pixmap(self, path, width=0, height=0, aspectRatioMode=qt.Qt.IgnoreAspectRatio, transformMode=qt.Qt.FastTransformation, owner=None):
+        key = ("pixmap", os.path.normpath(path), width, height, aspectRatioMode, transformMode)
+        return self.acquire(key, lambda: qt.QPixmap.fromImage(loadImage(path, width, height, aspectRatioMode, transformMode)), owner)
+
+    def icon(self, path, owner=None):
+        key = ("icon", os.path.normpath(path))
+        return self.acquire(key, lambda: qt.QIcon(path), owner)
+
+    def font(self, family, pointSize, owner=None):
+        key = ("font", family, pointSize)
+        return self.acquire(key, lambda: qt.QFont(family, pointSize), owner)
+
+    def fontMetrics(self, family, pointSize, owner=None):
+        key = ("fontMetrics", family, pointSize)
+        return self.acquire(key, lambda: qt.QFontMetrics(qt.QFont(family, pointSize)), owner)
+
+resourceCache = ResourceCache()
@@ -0,0 +1,99 @@
+import os
+import json
+import time
+import itertools
+from Lib.ObjectStore import OBJECTS_DIR
+
+OUTPUTS_DIR = os.path.normpath(os.path.dirname(__file__) + "/../Outputs")
+RUNS_DIR = os.path.join(OUTPUTS_DIR, "runs")
+LATEST = "latest.json"
+
+class RunContext():
+    """Output folders of one capture, everything it writes goes under root:
+
+        root/Raw            Tutorial.json, and the screenshots when they are not in the object store
+        root/Annotations    annotations.json, text_dict_default.json and the annotated slides
+        root/Translation    painted screenshots
+
+    Captures get their own root in Outputs/runs/<tutorial>/<run-id>, so several of them can run
+    side by side, also from separate Slicer processes. A finished capture is recorded in the
+    latest.json pointers, what opens "the last tutorial" follows RunContext.latest(). Without any
+    run it is Outputs itself, the layout used before runs existed.
+    The screenshots themselves are in objectsPath, the Lib.ObjectStore every run shares. With
+    tileDeltas a screenshot is stored as the tiles that changed since the previous step, see
+    Lib.TileDelta, instead of a whole PNG.
+    """
+    def __init__(self, root, tutorial="", objectsPath=None, tileDeltas=False):
+        self.root = os.path.abspath(root)
+        self.tutorial = tutorial
+        self.objectsPath = objectsPath or OBJECTS_DIR
+        self.tileDeltas = tileDeltas
+
+    @property
+    def rawPath(self):
+        return os.path.join(self.root, "Raw")
+
+    @property
+    def annotationsPath(self):
+        return os.path.join(self.root, "Annotations")
+
+    @property
+    def translationPath(self):
+        return os.path.join(self.root, "Translation")
+
+    def ensureFolders(self):
+        for path in [self.rawPath, self.annotationsPath, self.translationPath]:
+            os.makedirs(path, exist_ok=True)
+        return self
+
+    @staticmethod
+    def create(tutorial, runsRoot=None):
+        """New empty run of tutorial, named after the time it started and the process"""
+        runsRoot = runsRoot or RUNS_DIR
+        runId = time.strftime("%Y%m%d-%H%M%S") + f"-{os.getpid()}"
+        for attempt in itertools.count():
+            root = os.path.join(runsRoot, tutorial, runId if attempt == 0 else f"{runId}-{attempt}")
+            try:
+                os.makedirs(root)
+            except FileExistsError:
+                continue
+            return RunContext(root, tutorial).ensureFolders()
+
+    @staticmethod
+    def fromRaw(path):
+        """Context of a Tutorial.json, or any other file of the Raw folder"""
+        return RunContext(os.path.dirname(os.path.dirname(os.path.abspath(path))))
+
+    @staticmethod
+    def fromAnnotations(path):
+        """Context of an annotations.json, or any other file of the Annotations folder"""
+        return RunContext(os.path.dirname(os.path.dirname(os.path.abspath(path))))
+
+    def markLatest(self, runsRoot=None):
+        """Points latest.json of the runs folder, and of the tutorial, at this run"""
+        runsRoot = runsRoot or RUNS_DIR
+        pointer = {"root": self.root, "tutorial": self.tutorial, "time": time.time()}
+        folders = [runsRoot]
+        if self.tutorial:
+            folders.append(os.path.join(runsRoot, self.tutorial))
+        for folder in folders:
+            os.makedirs(folder, exist_ok=True)
+            path = os.path.join(folder, LATEST)
+            temporaryPath = f"{path}.{os.getpid()}.tmp"
+            with open(temporaryPath, "w", encoding="utf-8") as fd:
+                json.dump(pointer, fd, indent=2)
+            os.replace(temporaryPath, path)
+
+    @staticmethod
+    def latest(tutorial=None, runsRoot=None):
+        """Last finished run, of tutorial if given. Outputs when there is none"""
+        runsRoot = runsRoot or RUNS_DIR
+        folder = os.path.join(runsRoot, tutorial) if tutorial else runsRoot
+        try:
+            with open(os.path.join(folder, LATEST), encoding="utf-8") as fd:
+                pointer = json.load(fd)
+            if os.path.isdir(pointer["root"]):
+                return RunContext(pointer["root"], pointer.get("tutorial", ""))
+        except (OSError, ValueError, KeyError):
+            pass
+        return RunContext(os.path.join(runsRoot, os.pardir), tutorial or "")
@@ -0,0 +1,183 @@
+import os
+import struct
+import hashlib
+import threading
+import zlib
+import concurrent.futures
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import qt
+import slicer
+import vtk
+from vtk.util import numpy_support
+from slicer.i18n import tr as _
+from Lib.TileDelta import encodeDelta
+
+def qImageToArray(image):
+    """Copy a QImage into a (height, width, channels) uint8 array, RGB or RGBA"""
+    imageData = vtk.vtkImageData()
+    slicer.qMRMLUtils().qImageToVtkImageData(image, imageData)
+    width, height, _depth = imageData.GetDimensions()
+    channels = imageData.GetNumberOfScalarComponents()
+    pixels = numpy_support.vtk_to_numpy(imageData.GetPointData().GetScalars())
+    # VTK stores the rows bottom to top
+    return np.ascontiguousarray(pixels.reshape(height, width, channels)[::-1])
+
+def loadImageArray(path):
+    """Pixels of an image file decoded by Qt, as qImageToArray returns them"""
+    image = qt.QImage(path)
+    if image.isNull():
+        if not os.path.exists(path):
+            raise FileNotFoundError(path)
+        raise ValueError(f"{path} is not an image Qt can read")
+    return qImageToArray(image)
+
+def arrayToQImage(pixels):
+    """QImage of a (height, width, channels) uint8 array, the inverse of qImageToArray"""
+    height, width, channels = pixels.shape
+    imageData = vtk.vtkImageData()
+    imageData.SetDimensions(width, height, 1)
+    scalars = numpy_support.numpy_to_vtk(np.ascontiguousarray(pixels[::-1]).reshape(-1, channels), deep=True)
+    imageData.GetPointData().SetScalars(scalars)
+    image = qt.QImage()
+    slicer.qMRMLUtils().vtkImageDataToQImage(imageData, image)
+    return image
+
+def encodePNG(pixels, compressLevel=6):
+    """Encode a (height, width, 3 or 4) uint8 array as PNG bytes.
+
+    Only uses numpy and zlib, both release the GIL on large buffers so this can run
+    on a worker thread without stalling the GUI thread.
+    """
+    height, width, channels = pixels.shape
+    colorType = {3: 2, 4: 6}[channels]
+
+    # "Up" filter on every row, screenshots are mostly flat regions repeated vertically
+    rows = pixels.reshape(height, width*channels)
+    filtered = np.empty((height, width*channels + 1), dtype=np.uint8)
+    filtered[:, 0] = 2
+    filtered[0, 1:] = rows[0]
+    np.subtract(rows[1:], rows[:-1], out=filtered[1:, 1:])
+
+    def chunk(tag, data):
+        return struct.pack(">I", len(data)) + tag + data + struct.pack(">I", zlib.crc32(tag + data) & 0xFFFFFFFF)
+
+    header = struct.pack(">IIBBBBB", width, height, 8, colorType, 0, 0, 0)
+    return b"".join([
+        b"\x89PNG\r\n\x1a\n",
+        chunk(b"IHDR", header),
+        chunk(b"IDAT", zlib.compress(filtered.tobytes(), compressLevel)),
+        chunk(b"IEND", b""),
+    ])
+
+def pixelDigest(pixels):
+    """Hash of the pixels of an image, two images with the same digest are the same screenshot"""
+    digest = hashlib.sha256(str(pixels.shape).encode("ascii"))
+    digest.update(pixels.data)
+    return digest.hexdigest()
+
+class ScreenshotWriter():
+    """Encodes and writes screenshots on a small pool of worker threads.
+
+    submit() only copies the pixels on the calling thread, at most maxPending images
+    are waiting to be written at once and submit() blocks when that limit is reached.
+    flush() waits until every submitted image is on disk.
+    submitObject() writes to a Lib.ObjectStore instead, images already stored are not encoded again.
+    submitFrame() too, but only writes the tiles that changed since the previous screenshot of the window.
+    """
+    def __init__(self, maxWorkers=2, maxPending=4):
+        self.executor = ThreadPoolExecutor(max_workers=maxWorkers, thread_name_prefix="ScreenshotWriter")
+        self.pendingSlots = threading.BoundedSemaphore(maxPending)
+        self.pending = []
+        self.lock = threading.Lock()
+
+    def submit(self, image, filename):
+        return self.__submit(self.__write, self.__pixels(image), filename)
+
+    def submitObject(self, image, store):
+        """Returns the name of the object right away, it is on disk after flush()"""
+        pixels = self.__pixels(image)
+        name = store.name(pixelDigest(pixels), ".png")
+        if store.reserve(name):
+            try:
+                self.__submit(self.__writeObject, pixels, store, name)
+            except Exception:
+                store.release(name)
+                raise
+        return name
+
+    def submitFrame(self, image, store, sequence):
+        """Like submitObject(), the image is the next frame of sequence, a Lib.TileDelta.FrameSequence"""
+        pixels = self.__pixels(image)
+        name, base, changed = sequence.add(pixels, pixelDigest(pixels))
+        if store.reserve(name):
+            try:
+                if changed is None:
+                    self.__submit(self.__writeObject, pixels, store, name)
+                else:
+                    self.__submit(self.__writeDelta, pixels, store, name, base, changed)
+            except Exception:
+                store.release(name)
+                raise
+        return name
+
+    def __pixels(self, image):
+        if isinstance(image, qt.QPixmap):
+            image = image.toImage()
+        return qImageToArray(image)
+
+    def __submit(self, write, *args):
+        self.pendingSlots.acquire()
+        try:
+            future = self.executor.submit(write, *args)
+        except Exception:
+            self.pendingSlots.release()
+            raise
+        with self.lock:
+            self.pending.append(future)
+        future.add_done_callback(self.__done)
+        return future
+
+    def __write(self, pixels, filename):
+        data = encodePNG(pixels)
+        temporaryName = filename + ".tmp"
+        with open(temporaryName, "wb") as file:
+            file.write(data)
+        os.replace(temporaryName, filename)
+
+    def __writeObject(self, pixels, store, name):
+        store.write(name, encodePNG(pixels))
+
+    def __writeDelta(self, pixels, store, name, base, changed):
+        store.write(name, encodeDelta(base, pixels, changed))
+
+    def __done(self, future):
+        self.pendingSlots.release()
+        # Failed writes stay pending until flush() reports them
+        if future.exception() is None:
+            with self.lock:
+                if future in self.pending:
+                    self.pending.remove(future)
+
+    def flush(self):
+        # Done callbacks may still be running when wait() returns, the results are read from the futures
+        with self.lock:
+            pending = list(self.pending)
+        concurrent.futures.wait(pending)
+        errors = [future.exception() for future in pending if future.exception() is not None]
+        flushed = set(pending)
+        with self.lock:
+            self.pending = [future for future in self.pending if future not in flushed]
+        if errors:
+            raise OSError(_("Failed to write {count} screenshots: {error}").format(count=len(errors), error=errors[0]))
+
+    def close(self):
+        """Waits for the writes still running and stops the worker threads, without reporting errors"""
+        self.executor.shutdown(wait=True)
+
+    def shutdown(self):
+        try:
+            self.flush()
+        finally:
+            self.close()
@@ -0,0 +1,190 @@
+import os
+import json
+import zlib
+import struct
+import threading
+import collections
+
+import numpy as np
+from Lib.ObjectStore import DELTA_SUFFIX, DELTA_MAGIC
+
+TILE_SIZE = 64
+# Frames after a keyframe before the next one, bounds the deltas applied to rebuild a frame
+KEYFRAME_INTERVAL = 10
+# A frame with more tiles changed than this is stored as a keyframe, its delta would not be smaller
+MAX_CHANGED_FRACTION = 0.5
+
+def tileView(pixels, tileSize=TILE_SIZE):
+    """(rows, tileSize, columns, tileSize, channels) view of an image padded to whole tiles"""
+    height, width, channels = pixels.shape
+    rows = -(-height // tileSize)
+    columns = -(-width // tileSize)
+    if (rows*tileSize, columns*tileSize) != (height, width):
+        padded = np.zeros((rows*tileSize, columns*tileSize, channels), dtype=pixels.dtype)
+        padded[:height, :width] = pixels
+        pixels = padded
+    return pixels.reshape(rows, tileSize, columns, tileSize, channels)
+
+def changedTiles(previous, current, tileSize=TILE_SIZE):
+    """(rows, columns) mask of the tiles of current that differ from previous, same shape images"""
+    different = np.any(previous != current, axis=2)
+    return tileView(different[:, :, np.newaxis], tileSize).any(axis=(1, 3, 4))
+
+def encodeDelta(base, pixels, changed, tileSize=TILE_SIZE):
+    """Bytes of a delta object: the tiles of pixels in the changed mask, on top of the object base.
+
+    A header line for the store, that follows base without numpy, then a JSON line with the frame
+    shape and the changed tiles, then their pixels deflated with the "up" filter of PNG.
+    """
+    rows, columns = np.nonzero(changed)
+    tiles = tileView(pixels, tileSize)[rows, :, columns]
+    filtered = np.empty_like(tiles)
+    filtered[:, 0] = tiles[:, 0]
+    np.subtract(tiles[:, 1:], tiles[:, :-1], out=filtered[:, 1:])
+    header = {"base": base, "shape": list(pixels.shape), "tileSize": tileSize,
+              "tiles": (rows*changed.shape[1] + columns).tolist()}
+    return b"".join([DELTA_MAGIC, json.dumps(header).encode("ascii"), b"\n", zlib.compress(filtered.tobytes(), 6)])
+
+def readDelta(path):
+    """(header, tile pixels) of a delta object"""
+    with open(path, "rb") as fd:
+        if fd.readline() != DELTA_MAGIC:
+            raise ValueError(f"{path} is not a tile delta")
+        header = json.loads(fd.readline())
+        data = zlib.decompress(fd.read())
+    tileSize = header["tileSize"]
+    channels = header["shape"][2]
+    tiles = np.frombuffer(data, dtype=np.uint8).reshape(len(header["tiles"]), tileSize, tileSize, channels)
+    return header, np.cumsum(tiles, axis=1, dtype=np.uint8)
+
+def applyDelta(basePixels, header, tiles):
+    """The frame of a delta, rebuilt from a copy of the frame it is based on"""
+    height, width, channels = header["shape"]
+    tileSize = header["tileSize"]
+    if basePixels.shape != (height, width, channels):
+        raise ValueError(f"Delta of a {width}x{height} frame on a {basePixels.shape[1]}x{basePixels.shape[0]} base")
+    view = tileView(basePixels, tileSize)
+    # tileView() copies when the frame is not made of whole tiles, then the padding is cropped again
+    frame = view.copy()
+    columns = frame.shape[2]
+    indices = np.asarray(header["tiles"], dtype=np.int64)
+    frame[indices // columns, :, indices % columns] = tiles
+    return np.ascontiguousarray(frame.reshape(view.shape[0]*tileSize, columns*tileSize, channels)[:height, :width])
+
+def decodePNG(path):
+    """Pixels of a PNG written by ScreenshotWriter.encodePNG, 8 bit RGB or RGBA with the "up"
+    filter on every row. Raises ValueError for other PNG files. Fallback for when Qt is not there"""
+    with open(path, "rb") as fd:
+        data = fd.read()
+    if data[:8] != b"\x89PNG\r\n\x1a\n":
+        raise ValueError(f"{path} is not a PNG file")
+    position = 8
+    header = None
+    compressed = []
+    while position < len(data):
+        length, tag = struct.unpack(">I4s", data[position:position + 8])
+        chunk = data[position + 8:position + 8 + length]
+        if tag == b"IHDR":
+            header = struct.unpack(">IIBBBBB", chunk)
+        elif tag == b"IDAT":
+            compressed.append(chunk)
+        elif tag == b"IEND":
+            break
+        position += length + 12
+    width, height, bitDepth, colorType, _compression, _filter, interlace = header
+    channels = {2: 3, 6: 4}.get(colorType)
+    if bitDepth != 8 or channels is None or interlace != 0:
+        raise ValueError(f"{path} is not an 8 bit RGB or RGBA PNG")
+    rows = np.frombuffer(zlib.decompress(b"".join(compressed)), dtype=np.uint8).reshape(height, width*channels + 1)
+    filters = rows[:, 0]
+    if (filters == 2).all():
+        pixels = np.cumsum(rows[:, 1:], axis=0, dtype=np.uint8)
+    elif (filters == 0).all():
+        pixels = rows[:, 1:].copy()
+    else:
+        raise ValueError(f"{path} uses PNG filters ScreenshotWriter does not write")
+    return pixels.reshape(height, width, channels)
+
+class FrameSequence():
+    """Consecutive screenshots of one window, stored as a keyframe and then as the tiles that
+    changed since the previous frame. A new keyframe starts every keyframeInterval frames, when
+    the size changes or when most of the window changed.
+    """
+    def __init__(self, keyframeInterval=KEYFRAME_INTERVAL, maxChangedFraction=MAX_CHANGED_FRACTION, tileSize=TILE_SIZE):
+        self.keyframeInterval = keyframeInterval
+        self.maxChangedFraction = maxChangedFraction
+        self.tileSize = tileSize
+        self.previousName = None
+        self.previousPixels = None
+        self.previousDigest = None
+        self.sinceKeyframe = 0
+
+    def add(self, pixels, digest):
+        """(name, base, changed) of the next frame. changed is None for a keyframe, a PNG object,
+        otherwise the mask of the tiles to store in a delta object on top of base"""
+        if digest == self.previousDigest:
+            return self.previousName, None, None
+        changed = None
+        if self.previousPixels is not None and self.previousPixels.shape == pixels.shape and self.sinceKeyframe < self.keyframeInterval:
+            changed = changedTiles(self.previousPixels, pixels, self.tileSize)
+            if changed.mean() > self.maxChangedFraction:
+                changed = None
+        base = self.previousName
+        if changed is None:
+            name = digest + ".png"
+            base = None
+            self.sinceKeyframe = 1
+        else:
+            name = digest + DELTA_SUFFIX
+            self.sinceKeyframe += 1
+        self.previousName = name
+        self.previousPixels = pixels
+        self.previousDigest = digest
+        return name, base, changed
+
+class FrameCache():
+    """Least recently used cache of the pixels of rebuilt frames, keyed on the object path.
+
+    Objects never change, so unlike MetadataCache nothing is revalidated. Screenshots are mostly
+    read in step order, the previous frame is then in the cache and only one delta is applied.
+    loadKeyframe reads the PNG objects, inside Slicer it is ScreenshotWriter.loadImageArray, Qt
+    decodes faster than decodePNG() which is only there for tools running without Qt.
+    The pixels are shared, callers must not modify them.
+    """
+    def __init__(self, maxBytes=128*1024*1024, loadKeyframe=decodePNG):
+        self.maxBytes = maxBytes
+        self.loadKeyframe = loadKeyframe
+        self.entries = collections.OrderedDict()
+        self.totalBytes = 0
+        self.lock = threading.Lock()
+
+    def load(self, path):
+        with self.lock:
+            pixels = self.entries.get(path)
+            if pixels is not None:
+                self.entries.move_to_end(path)
+                return pixels
+
+        if path.endswith(DELTA_SUFFIX):
+            header, tiles = readDelta(path)
+            # Objects of a store are all in root/<first two digits>/
+            base = header["base"]
+            basePath = os.path.join(os.path.dirname(os.path.dirname(path)), base[:2], base)
+            pixels = applyDelta(self.load(basePath), header, tiles)
+        else:
+            pixels = self.loadKeyframe(path)
+        pixels.flags.writeable = False
+
+        with self.lock:
+            if path not in self.entries:
+                self.entries[path] = pixels
+                self.totalBytes += pixels.nbytes
+            while self.totalBytes > self.maxBytes and len(self.entries) > 1:
+                _path, removed = self.entries.popitem(last=False)
+                self.totalBytes -= removed.nbytes
+        return pixels
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.totalBytes = 0
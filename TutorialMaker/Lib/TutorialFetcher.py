@@ -0,0 +1,133 @@
+import os
+import queue
+import threading
+import qt
+import Lib.GitTools as GitTools
+from slicer.i18n import tr as _
+
+class TutorialFetcher(qt.QObject):
+    """Downloads the tutorials of GitHub repositories into a folder without blocking the GUI.
+
+    The network work runs on a worker thread that only pushes events to a queue, a timer
+    on the GUI thread drains it and emits the signals, so every slot runs on the GUI thread.
+    run() does the same work on the calling thread for scripts and tests.
+    With useArchive every repository is synced from its archive in one request instead of
+    listing it and downloading file by file.
+    """
+    repoListed = qt.Signal(str, int)        # repository, number of tutorial files found
+    fileFetched = qt.Signal(str)            # destination of a tutorial file that is ready
+    progress = qt.Signal(int, int, int)     # files done, files found so far, bytes transferred
+    finished = qt.Signal(bool)              # True if cancelled before the end
+
+    POLL_INTERVAL = 50
+
+    def __init__(self, repos, destination, maxAge=0, useArchive=False, parent=None):
+        super().__init__(parent)
+        self.repos = list(repos)
+        self.destination = destination
+        self.maxAge = maxAge
+        self.useArchive = useArchive
+        self.errors = []
+        self.fetchedFiles = []
+        self.filesFound = 0
+        self.filesDone = 0
+        self.bytesTransferred = 0
+        self.running = False
+        self.__cancelled = threading.Event()
+        self.__events = queue.Queue()
+        self.__thread = None
+        self.__timer = qt.QTimer()
+        self.__timer.setInterval(self.POLL_INTERVAL)
+        self.__timer.timeout.connect(self.processEvents)
+
+    def start(self):
+        if self.running:
+            return
+        self.running = True
+        self.__thread = threading.Thread(target=self.__fetch, name="TutorialFetcher", daemon=True)
+        self.__thread.start()
+        self.__timer.start()
+
+    def run(self):
+        """Fetches everything on the calling thread, the signals are emitted before returning"""
+        self.running = True
+        self.__fetch()
+        self.processEvents()
+
+    def cancel(self):
+        """Stops after the downloads already in flight, finished(True) is still emitted"""
+        self.__cancelled.set()
+
+    def isCancelled(self):
+        return self.__cancelled.is_set()
+
+    def wait(self, timeout=None):
+        if self.__thread is not None:
+            self.__thread.join(timeout)
+        self.processEvents()
+
+    def __fetch(self):
+        os.makedirs(self.destination, exist_ok=True)
+        downloads = []
+        for repo in self.repos:
+            if self.__cancelled.is_set():
+                break
+            try:
+                if self.useArchive:
+                    self.__syncArchive(repo)
+                else:
+                    downloads.extend(self.__listRepo(repo))
+            except Exception as e:
+                self.__events.put(("error", _("Failed to fetch tutorials from {repo}: {error}").format(repo=repo, error=str(e))))
+
+        def downloaded(url, destination, transferredBytes):
+            self.__events.put(("file", destination, transferredBytes))
+
+        for url, error in GitTools.GitTools.DownloadFiles(downloads, maxAge=self.maxAge, progress=downloaded, cancelled=self.__cancelled):
+            self.__events.put(("error", _("Failed to fetch {url}: {error}").format(url=url, error=str(error))))
+        self.__events.put(("finished", self.__cancelled.is_set()))
+
+    def __listRepo(self, repo):
+        files = GitTools.GitTools.ParseRepo(repo, "Tutorials", maxAge=self.maxAge)
+        downloads = []
+        for TutorialRoot in files.dir():
+            for TutorialFile in files.dir(TutorialRoot):
+                if TutorialFile.endswith(".py"):
+                    downloads.append((files.getFile(f"{TutorialRoot}/{TutorialFile}").url, os.path.join(self.destination, TutorialFile)))
+        self.__events.put(("repo", repo, len(downloads)))
+        return downloads
+
+    def __syncArchive(self, repo):
+        sync = GitTools.GitTools.SyncRepoArchive(repo, self.destination, maxAge=self.maxAge, cancelled=self.__cancelled)
+        self.__events.put(("repo", repo, len(sync.files)))
+        self.__events.put(("bytes", sync.transferredBytes))
+        for path in sync.files:
+            self.__events.put(("file", path, 0))
+
+    def processEvents(self):
+        """Emits the signals for everything the worker reported so far, called by the timer"""
+        while True:
+            try:
+                event = self.__events.get_nowait()
+            except queue.Empty:
+                return
+            kind = event[0]
+            if kind == "repo":
+                self.filesFound += event[2]
+                self.repoListed.emit(event[1], event[2])
+                self.progress.emit(self.filesDone, self.filesFound, self.bytesTransferred)
+            elif kind == "file":
+                self.filesDone += 1
+                self.fetchedFiles.append(event[1])
+                self.bytesTransferred += event[2]
+                self.fileFetched.emit(event[1])
+                self.progress.emit(self.filesDone, self.filesFound, self.bytesTransferred)
+            elif kind == "bytes":
+                self.bytesTransferred += event[1]
+                self.progress.emit(self.filesDone, self.filesFound, self.bytesTransferred)
+            elif kind == "error":
+                self.errors.append(event[1])
+            elif kind == "finished":
+                self.__timer.stop()
+                self.running = False
+                self.finished.emit(event[1])
@@ -3,13 +3,18 @@ import qt
 import json
 import os
 import copy
+import logging
 from Lib.Annotations import Annotation, AnnotationType, AnnotatorSlide, AnnotatedTutorial
-from Lib.TutorialUtils import Tutorial, TutorialScreenshot
+from Lib.TutorialUtils import Tutorial, TutorialScreenshot, metadataCache
+from Lib.RunContext import RunContext
+from Lib.ResourceCache import resourceCache, resourceFolder
 
 import slicer
 from slicer.i18n import tr as _
 
 class DraggableLabel(qt.QLabel):
+    moved = qt.Signal()
+
     def __init__(self, text="",parent=None):
         super().__init__(text, parent)
 
@@ -48,6 +53,7 @@ class DraggableLabel(qt.QLabel):
                     sPos = event.screenPos().toPoint()
                     pos = self.parent().mapFromGlobal(sPos)
                     self.SetCenter(pos.x(), pos.y())
+                    self.moved.emit()
 
 class tmLabel(qt.QLabel):
     clicked = qt.Signal()
@@ -212,11 +218,16 @@ class TutorialGUI(qt.QMainWindow):
 
         self.steps = []
 
-        self.updateTimer = qt.QTimer()
-        self.updateTimer.setTimerType(qt.Qt.PreciseTimer)
-        self.updateTimer.setInterval(34) #34ms Interval = 30 ups
-        self.updateTimer.timeout.connect(self.refreshViews)
-        self.updateTimer.start()
+        # Changes request a repaint, all the requests made within a frame are merged into one
+        self.refreshTimer = qt.QTimer()
+        self.refreshTimer.setSingleShot(True)
+        self.refreshTimer.setInterval(16)
+        self.refreshTimer.timeout.connect(self.refreshViews)
+
+        # Animates the dashed selection box, only runs while an annotation is selected
+        self.selectionAnimationTimer = qt.QTimer()
+        self.selectionAnimationTimer.setInterval(34)
+        self.selectionAnimationTimer.timeout.connect(self.requestRefresh)
 
         self.selectedIndexes = [0,0]
         self.selectedAnnotator = None
@@ -235,8 +246,8 @@ class TutorialGUI(qt.QMainWindow):
 
         self.defaultHelperOffset = [60,60]
 
-        # TODO: Get a better way to get the module position
-        self.outputFolder = f"{os.path.dirname(__file__)}/../Outputs/Annotations"
+        # Annotations are saved next to the capture they were made on, see useContext
+        self.useContext(RunContext.latest())
 
         # Need to do a overhaul of the preview function so this isn't necessary
         self.lastAppPos = qt.QPoint()
@@ -250,6 +261,7 @@ class TutorialGUI(qt.QMainWindow):
         self.OffsetHelperWidget.setStyleSheet("background-color: #03fc0b;border-style: outset; border-width: 2px; border-color: #fc034e;")
         self.OffsetHelperWidget.SetCenter(250,250)
         self.OffsetHelperWidget.installEventFilter(self.OffsetHelperWidget)
+        self.OffsetHelperWidget.moved.connect(self.onHelperMoved)
         self.OffsetHelperWidget.SetActive(False)
 
         # Optional positional helper
@@ -259,6 +271,7 @@ class TutorialGUI(qt.QMainWindow):
         self.OptHelperWidget.setStyleSheet("background-color: #fc034e;border-style: outset; border-width: 2px; border-color: #03fc0b;")
         self.OptHelperWidget.SetCenter(250,250)
         self.OptHelperWidget.installEventFilter(self.OptHelperWidget)
+        self.OptHelperWidget.moved.connect(self.onHelperMoved)
         self.OptHelperWidget.SetActive(False)
 
         # Tutorial Information
@@ -322,11 +335,10 @@ class TutorialGUI(qt.QMainWindow):
         self.slideBodyWidget.placeholderText = _("Write a description for the slide")
 
         # Load Used Resources
-        resourceFolder = os.path.dirname(__file__) + '/../Resources'
-        self.image_ChevronUp = qt.QImage(f'{resourceFolder}/Icons/ScreenshotAnnotator/chevron_up.png').scaled(20,20, qt.Qt.KeepAspectRatio, qt.Qt.SmoothTransformation)
-        self.image_ChevronDown = qt.QImage(f'{resourceFolder}/Icons/ScreenshotAnnotator/chevron_down.png').scaled(20,20, qt.Qt.KeepAspectRatio, qt.Qt.SmoothTransformation)
-        self.image_ArrowUp = qt.QImage(f'{resourceFolder}/Icons/ScreenshotAnnotator/arrow_up.png').scaled(20,20, qt.Qt.KeepAspectRatio, qt.Qt.SmoothTransformation)
-        self.image_ArrowDown = qt.QImage(f'{resourceFolder}/Icons/ScreenshotAnnotator/arrow_down.png').scaled(20,20, qt.Qt.KeepAspectRatio, qt.Qt.SmoothTransformation)
+        self.image_ChevronUp = resourceCache.image(f"{resourceFolder}/Icons/ScreenshotAnnotator/chevron_up.png", 20, 20, qt.Qt.KeepAspectRatio, qt.Qt.SmoothTransformation, owner=self)
+        self.image_ChevronDown = resourceCache.image(f"{resourceFolder}/Icons/ScreenshotAnnotator/chevron_down.png", 20, 20, qt.Qt.KeepAspectRatio, qt.Qt.SmoothTransformation, owner=self)
+        self.image_ArrowUp = resourceCache.image(f"{resourceFolder}/Icons/ScreenshotAnnotator/arrow_up.png", 20, 20, qt.Qt.KeepAspectRatio, qt.Qt.SmoothTransformation, owner=self)
+        self.image_ArrowDown = resourceCache.image(f"{resourceFolder}/Icons/ScreenshotAnnotator/arrow_down.png", 20, 20, qt.Qt.KeepAspectRatio, qt.Qt.SmoothTransformation, owner=self)
 
         self.icon_chevron = qt.QIcon()
         self.icon_chevron.addPixmap(qt.QPixmap.fromImage(self.image_ChevronDown), qt.QIcon.Normal, qt.QIcon.Off)
@@ -335,20 +347,23 @@ class TutorialGUI(qt.QMainWindow):
         self.icon_arrowDown = qt.QIcon(qt.QPixmap.fromImage(self.image_ArrowDown))
         pass
 
+    def useContext(self, context):
+        self.context = context
+        self.outputFolder = context.annotationsPath
+
     def openAnnotationsAsJSON(self):
-        from Lib.TutorialUtils import get_module_basepath as getModulePath
         parent = slicer.util.mainWindow()
-        basePath = getModulePath("TutorialMaker")
         jsonPath = qt.QFileDialog.getOpenFileName(
             parent,
             _("Select a JSON file"),
-            basePath + "/Outputs/Annotations/",              
+            self.outputFolder + "/",
             _("JSON Files (*.json)") 
         )
         self.raise_()
         self.activateWindow()
         if not os.path.exists(jsonPath):
             return
+        self.useContext(RunContext.fromAnnotations(jsonPath))
         
         [tInfo, tSlides, tPaths] = AnnotatedTutorial.LoadAnnotatedTutorial(jsonPath)
         for step in self.steps:
@@ -377,6 +392,7 @@ class TutorialGUI(qt.QMainWindow):
         outputFileOld = []
 
         outputFileAnnotations["slides"] = []
+        os.makedirs(self.outputFolder, exist_ok=True)
 
         for stepIndex, step in enumerate(self.steps):
             for slideIndex, slide in enumerate(step.Slides):
@@ -437,6 +453,7 @@ class TutorialGUI(qt.QMainWindow):
         self.selectedAnnotation = None
         if self.selectedAnnotationType == AnnotationType.Selected:
             self.selectedAnnotationType = AnnotationType.Selecting
+        self.requestRefresh()
         pass
 
     def delete_screen(self):
@@ -465,9 +482,10 @@ class TutorialGUI(qt.QMainWindow):
 
             for screenshot in screenshots[1:]:
                 try:
+                    windowWidgets = screenshot.getWidgets()
                     annotatorSlide = AnnotatorSlide(screenshot.getImage(),
-                                                    screenshot.getWidgets(),
-                                                    WindowOffset=screenshot.getWidgets()[0]["position"])
+                                                    windowWidgets,
+                                                    WindowOffset=windowWidgets[0]["position"])
                     stepWidget.AddStepWindows(annotatorSlide)  # noqa: F821
                 except Exception:
                     print(f"ERROR: Annotator Failed to add window in step:{stepIndex}, loadImagesAndMetadata")
@@ -487,6 +505,7 @@ class TutorialGUI(qt.QMainWindow):
         if acknowledgments_pm is not None:
             self.addBlankPage(False, stepIndex + 2, type_="Acknowledgment", pixmap = acknowledgments_pm)
 
+        logging.debug(f"Screenshot metadata cache: {metadataCache.stats()}")
         pass
 
     def swapStepPosition(self, index, swapTo):
@@ -515,8 +534,8 @@ class TutorialGUI(qt.QMainWindow):
         selectedStep = self.steps[stepId]
         selectedScreenshot = selectedStep.Slides[screenshotId]
 
-        self.selectedSlide.setPixmap(selectedScreenshot.GetResized(*self.selectedSlideSize, keepAspectRatio=True))
         self.selectedAnnotator = selectedScreenshot
+        self.refreshViews()
 
         # Load text from slideAnnotator
         self.slideTitleWidget.setText(self.selectedAnnotator.SlideTitle)
@@ -531,6 +550,7 @@ class TutorialGUI(qt.QMainWindow):
             self.selectedAnnotation = None
             if self.selectedAnnotationType == AnnotationType.Selected:
                 self.selectedAnnotationType = AnnotationType.Selecting
+            self.requestRefresh()
 
     def onActionTriggered():
         pass
@@ -624,6 +644,7 @@ class TutorialGUI(qt.QMainWindow):
     def updateSelectedAnnotationSettings(self):
         if self.selectedAnnotation is not None:
             self.selectedAnnotation.penConfig(self.penSettings["color"], self.penSettings["fontSize"],self.penSettings["penThickness"], brush=True)
+            self.requestRefresh()
 
     def updateAnnotationThicknessValue(self):
         self.penSettings["penThickness"] = self.spin_box.value
@@ -689,6 +710,7 @@ class TutorialGUI(qt.QMainWindow):
         self.selectedAnnotation = selectedAnnotation
         self.selectedAnnotationType = AnnotationType.Selected
         self.selectedAnnotation.drawBoundingBox = True
+        self.requestRefresh()
         pass
 
     def annotationHandler(self, appPos):
@@ -700,27 +722,34 @@ class TutorialGUI(qt.QMainWindow):
         self.selectedAnnotation = selectedAnnotation
         self.selectedAnnotationType = AnnotationType.Selected
         self.selectedAnnotation.drawBoundingBox = True
+        self.requestRefresh()
+
+    def applyHelpers(self):
+        optValuesInImage = self.selectedAnnotator.MapScreenToImage(qt.QPointF(*self.OptHelperWidget.GetCenter()), self.selectedSlide)
+        self.selectedAnnotation.setValuesOpt(*optValuesInImage)
 
-    def previewAnnotation(self, appPos):
-        self.lastAppPos = appPos
-        posInImage = self.selectedAnnotator.MapScreenToImage(appPos, self.selectedSlide)
-        widgets = self.selectedAnnotator.FindWidgetsAtPos(*posInImage)
 
-        def ApplyHelper():
-            optValuesInImage = self.selectedAnnotator.MapScreenToImage(qt.QPointF(*self.OptHelperWidget.GetCenter()), self.selectedSlide)
-            self.selectedAnnotation.setValuesOpt(*optValuesInImage)
+        _helperPos = self.selectedAnnotator.MapScreenToImage(qt.QPointF(*self.OffsetHelperWidget.GetCenter()), self.selectedSlide)
+        offsetFromTargetWidget = [_helperPos[0] - self.selectedAnnotation.target["position"][0],
+                                  _helperPos[1] - self.selectedAnnotation.target["position"][1]]
 
+        self.selectedAnnotation.setValuesOffset(*offsetFromTargetWidget)
+        self.requestRefresh()
 
-            _helperPos = self.selectedAnnotator.MapScreenToImage(qt.QPointF(*self.OffsetHelperWidget.GetCenter()), self.selectedSlide)
-            offsetFromTargetWidget = [_helperPos[0] - self.selectedAnnotation.target["position"][0],
-                                      _helperPos[1] - self.selectedAnnotation.target["position"][1]]
+    def onHelperMoved(self):
+        if self.selectedAnnotator is None or self.selectedAnnotation is None:
+            return
+        self.applyHelpers()
 
-            self.selectedAnnotation.setValuesOffset(*offsetFromTargetWidget)
+    def previewAnnotation(self, appPos):
+        self.lastAppPos = appPos
+        posInImage = self.selectedAnnotator.MapScreenToImage(appPos, self.selectedSlide)
+        widgets = self.selectedAnnotator.FindWidgetsAtPos(*posInImage)
 
         if self.selectedAnnotationType == AnnotationType.Selected:
             self.OptHelperWidget.SetActive(self.selectedAnnotation.wantsOptHelper())
             self.OffsetHelperWidget.SetActive(self.selectedAnnotation.wantsOffsetHelper())
-            ApplyHelper()
+            self.applyHelpers()
             return
 
         if len(widgets) < 1:
@@ -760,14 +789,23 @@ class TutorialGUI(qt.QMainWindow):
         _reversePostion = self.selectedAnnotator.MapImageToScreen(qt.QPointF(*selectedWidget["position"]), self.selectedSlide)
         self.OffsetHelperWidget.SetCenter(*_reversePostion)
 
-        ApplyHelper()
+        self.applyHelpers()
         pass
 
+    def requestRefresh(self):
+        if not self.refreshTimer.isActive():
+            self.refreshTimer.start()
+
     def refreshViews(self):
+        self.refreshTimer.stop()
+        if self.selectedAnnotation is not None and self.selectedAnnotation.drawBoundingBox:
+            if not self.selectionAnimationTimer.isActive():
+                self.selectionAnimationTimer.start()
+        else:
+            self.selectionAnimationTimer.stop()
         if self.selectedAnnotator is None:
             return
-        self.selectedAnnotator.ReDraw()
-        self.selectedSlide.setPixmap(self.selectedAnnotator.GetResized(*self.selectedSlideSize, keepAspectRatio=True))
+        self.selectedSlide.setPixmap(self.selectedAnnotator.GetPreview(*self.selectedSlideSize))
         pass
 
     def mouse_move_event(self, event):
@@ -829,6 +867,8 @@ class TutorialGUI(qt.QMainWindow):
                 else:
                     self.selectedAnnotation.text += event.text()
 
+                self.requestRefresh()
+
             return True
 
         elif self.selectedAnnotator is not None and self.selectedAnnotation is not None:
@@ -858,6 +898,7 @@ class TutorialGUI(qt.QMainWindow):
 
     def open_json_file(self, filepath):
         directory_path = os.path.dirname(filepath)
+        self.useContext(RunContext.fromRaw(filepath))
         # Read the data from the file
         with open(filepath, encoding='utf-8') as file:
             rawTutorialData = json.load(file)
@@ -878,9 +919,10 @@ class TutorialGUI(qt.QMainWindow):
         for step in rawTutorialData["steps"]:
             screenshotList = []
             for window in step:
+                # Screenshots in the object store are outside of the Raw folder
                 wScreenshot = TutorialScreenshot(
-                    directory_path + "/" + window["window"],
-                    directory_path + "/" + window["metadata"]
+                    os.path.normpath(os.path.join(directory_path, window["window"])),
+                    os.path.normpath(os.path.join(directory_path, window["metadata"]))
                 )
                 screenshotList.append(wScreenshot)
             tutorial.steps.append(screenshotList)
@@ -943,12 +985,12 @@ class TutorialGUI(qt.QMainWindow):
     def create_toolbar_menu(self):
         toolbar = qt.QToolBar("File", self)
 
-        actionOpen = qt.QAction(qt.QIcon(self.dir_path+'/../Resources/Icons/ScreenshotAnnotator/open.png'), _("Open"), self)
-        actionSave = qt.QAction(qt.QIcon(self.dir_path+'/../Resources/Icons/ScreenshotAnnotator/save.png'), _("Save"), self)
-        actionBack = qt.QAction(qt.QIcon(self.dir_path+'/../Resources/Icons/ScreenshotAnnotator/back.png'), _("Undo"), self)
-        actionDelete = qt.QAction(qt.QIcon(self.dir_path+'/../Resources/Icons/ScreenshotAnnotator/remove.png'), _("Delete"), self)
-        actionAdd = qt.QAction(qt.QIcon(self.dir_path+'/../Resources/Icons/ScreenshotAnnotator/add.png'), _("Add"), self)
-        actionCopy = qt.QAction(qt.QIcon(self.dir_path+'/../Resources/Icons/ScreenshotAnnotator/copy.png'), _("Copy"), self)
+        actionOpen = qt.QAction(resourceCache.icon(f"{resourceFolder}/Icons/ScreenshotAnnotator/open.png", owner=self), _("Open"), self)
+        actionSave = qt.QAction(resourceCache.icon(f"{resourceFolder}/Icons/ScreenshotAnnotator/save.png", owner=self), _("Save"), self)
+        actionBack = qt.QAction(resourceCache.icon(f"{resourceFolder}/Icons/ScreenshotAnnotator/back.png", owner=self), _("Undo"), self)
+        actionDelete = qt.QAction(resourceCache.icon(f"{resourceFolder}/Icons/ScreenshotAnnotator/remove.png", owner=self), _("Delete"), self)
+        actionAdd = qt.QAction(resourceCache.icon(f"{resourceFolder}/Icons/ScreenshotAnnotator/add.png", owner=self), _("Add"), self)
+        actionCopy = qt.QAction(resourceCache.icon(f"{resourceFolder}/Icons/ScreenshotAnnotator/copy.png", owner=self), _("Copy"), self)
 
         toolbar.addAction(actionOpen)
         toolbar.addAction(actionSave)
@@ -970,78 +1012,78 @@ class TutorialGUI(qt.QMainWindow):
     def create_toolbar_actions(self):
         toolbar = qt.QToolBar("Actions", self)
         #TODO: Make icon for the selection action
-        self.select = qt.QAction(qt.QIcon(self.dir_path+'/../Resources/Icons/ScreenshotAnnotator/select.png'), _("Select"), self)
+        self.select = qt.QAction(resourceCache.icon(f"{resourceFolder}/Icons/ScreenshotAnnotator/select.png", owner=self), _("Select"), self)
         self.select.setCheckable(True)
         toolbar.addAction(self.select)
 
-        self.square = qt.QAction(qt.QIcon(self.dir_path+'/../Resources/Icons/ScreenshotAnnotator/act1.png'), _("Square"), self)
+        self.square = qt.QAction(resourceCache.icon(f"{resourceFolder}/Icons/ScreenshotAnnotator/act1.png", owner=self), _("Square"), self)
         self.square.setCheckable(True)
         toolbar.addAction(self.square)
 
-        self.circle = qt.QAction(qt.QIcon(self.dir_path+'/../Resources/Icons/ScreenshotAnnotator/act2.png'), _("Circle"), self)
+        self.circle = qt.QAction(resourceCache.icon(f"{resourceFolder}/Icons/ScreenshotAnnotator/act2.png", owner=self), _("Circle"), self)
         self.circle.setCheckable(True)
 
-        self.clck = qt.QAction(qt.QIcon(self.dir_path+'/../Resources/Icons/ScreenshotAnnotator/pointer.png'), _("Click"), self)
+        self.clck = qt.QAction(resourceCache.icon(f"{resourceFolder}/Icons/ScreenshotAnnotator/pointer.png", owner=self), _("Click"), self)
         self.clck.setCheckable(True)
         toolbar.addAction(self.clck)
 
         #New Icon for textless arrows, if we add text back we change it back
-        self.arrow = qt.QAction(qt.QIcon(self.dir_path+'/../Resources/Icons/ScreenshotAnnotator/arrow_disabled.png'), _("Arrow"), self)
+        self.arrow = qt.QAction(resourceCache.icon(f"{resourceFolder}/Icons/ScreenshotAnnotator/arrow_disabled.png", owner=self), _("Arrow"), self)
         self.arrow.setCheckable(True)
         toolbar.addAction(self.arrow)
 
-        self.arrowText = qt.QAction(qt.QIcon(self.dir_path+'/../Resources/Icons/ScreenshotAnnotator/act3.png'), _("Arrow text"), self)
+        self.arrowText = qt.QAction(resourceCache.icon(f"{resourceFolder}/Icons/ScreenshotAnnotator/act3.png", owner=self), _("Arrow text"), self)
         self.arrowText.setCheckable(True)
         toolbar.addAction(self.arrowText)
 
-        self.textBox = qt.QAction(qt.QIcon(self.dir_path+'/../Resources/Icons/ScreenshotAnnotator/textBox_disabled.png'), _("Text Box"), self)
+        self.textBox = qt.QAction(resourceCache.icon(f"{resourceFolder}/Icons/ScreenshotAnnotator/textBox_disabled.png", owner=self), _("Text Box"), self)
         self.textBox.setCheckable(True)
         toolbar.addAction(self.textBox)
 
-        self.icon_image = qt.QAction(qt.QIcon(self.dir_path+'/../Resources/Icons/ScreenshotAnnotator/act4.png'), _("Icon"), self)
+        self.icon_image = qt.QAction(resourceCache.icon(f"{resourceFolder}/Icons/ScreenshotAnnotator/act4.png", owner=self), _("Icon"), self)
         self.icon_image.setCheckable(True)
 
-        self.in_text = qt.QAction(qt.QIcon(self.dir_path+'/../Resources/Icons/ScreenshotAnnotator/act5.png'), _("Text"), self)
+        self.in_text = qt.QAction(resourceCache.icon(f"{resourceFolder}/Icons/ScreenshotAnnotator/act5.png", owner=self), _("Text"), self)
         self.in_text.setCheckable(True)
 
         self.icons = {
             #TODO:Create an icon for the select tool
             self.select: {
-                'active': qt.QIcon(self.dir_path+'/../Resources/Icons/ScreenshotAnnotator/actselect.png'),
-                'inactive': qt.QIcon(self.dir_path+'/../Resources/Icons/ScreenshotAnnotator/select.png')
+                'active': resourceCache.icon(f"{resourceFolder}/Icons/ScreenshotAnnotator/actselect.png", owner=self),
+                'inactive': resourceCache.icon(f"{resourceFolder}/Icons/ScreenshotAnnotator/select.png", owner=self)
             },
 
             self.square: {
-                'active': qt.QIcon(self.dir_path+'/../Resources/Icons/ScreenshotAnnotator/act1_p.png'),
-                'inactive': qt.QIcon(self.dir_path+'/../Resources/Icons/ScreenshotAnnotator/act1.png')
+                'active': resourceCache.icon(f"{resourceFolder}/Icons/ScreenshotAnnotator/act1_p.png", owner=self),
+                'inactive': resourceCache.icon(f"{resourceFolder}/Icons/ScreenshotAnnotator/act1.png", owner=self)
             },
             self.circle: {
-                'active': qt.QIcon(self.dir_path+'/../Resources/Icons/ScreenshotAnnotator/act2_p.png'),
-                'inactive': qt.QIcon(self.dir_path+'/../Resources/Icons/ScreenshotAnnotator/act2.png')
+                'active': resourceCache.icon(f"{resourceFolder}/Icons/ScreenshotAnnotator/act2_p.png", owner=self),
+                'inactive': resourceCache.icon(f"{resourceFolder}/Icons/ScreenshotAnnotator/act2.png", owner=self)
             },
             self.clck: {
-                'active': qt.QIcon(self.dir_path+'/../Resources/Icons/ScreenshotAnnotator/pointer_p.png'),
-                'inactive': qt.QIcon(self.dir_path+'/../Resources/Icons/ScreenshotAnnotator/pointer.png')
+                'active': resourceCache.icon(f"{resourceFolder}/Icons/ScreenshotAnnotator/pointer_p.png", owner=self),
+                'inactive': resourceCache.icon(f"{resourceFolder}/Icons/ScreenshotAnnotator/pointer.png", owner=self)
             },
             self.arrow: {
-                'active': qt.QIcon(self.dir_path+'/../Resources/Icons/ScreenshotAnnotator/arrow_enabled.png'),
-                'inactive': qt.QIcon(self.dir_path+'/../Resources/Icons/ScreenshotAnnotator/arrow_disabled.png')
+                'active': resourceCache.icon(f"{resourceFolder}/Icons/ScreenshotAnnotator/arrow_enabled.png", owner=self),
+                'inactive': resourceCache.icon(f"{resourceFolder}/Icons/ScreenshotAnnotator/arrow_disabled.png", owner=self)
             },
             self.arrowText:{
-                'active': qt.QIcon(self.dir_path+'/../Resources/Icons/ScreenshotAnnotator/act3_p.png'),
-                'inactive': qt.QIcon(self.dir_path+'/../Resources/Icons/ScreenshotAnnotator/act3.png')
+                'active': resourceCache.icon(f"{resourceFolder}/Icons/ScreenshotAnnotator/act3_p.png", owner=self),
+                'inactive': resourceCache.icon(f"{resourceFolder}/Icons/ScreenshotAnnotator/act3.png", owner=self)
             },
             self.textBox: {
-                'active': qt.QIcon(self.dir_path+'/../Resources/Icons/ScreenshotAnnotator/textBox_enabled.png'),
-                'inactive': qt.QIcon(self.dir_path+'/../Resources/Icons/ScreenshotAnnotator/textBox_disabled.png')
+                'active': resourceCache.icon(f"{resourceFolder}/Icons/ScreenshotAnnotator/textBox_enabled.png", owner=self),
+                'inactive': resourceCache.icon(f"{resourceFolder}/Icons/ScreenshotAnnotator/textBox_disabled.png", owner=self)
             },
             self.icon_image: {
-                'active': qt.QIcon(self.dir_path+'/../Resources/Icons/ScreenshotAnnotator/act4_p.png'),
-                'inactive': qt.QIcon(self.dir_path+'/../Resources/Icons/ScreenshotAnnotator/act4.png')
+                'active': resourceCache.icon(f"{resourceFolder}/Icons/ScreenshotAnnotator/act4_p.png", owner=self),
+                'inactive': resourceCache.icon(f"{resourceFolder}/Icons/ScreenshotAnnotator/act4.png", owner=self)
             },
             self.in_text: {
-                'active': qt.QIcon(self.dir_path+'/../Resources/Icons/ScreenshotAnnotator/act5_p.png'),
-                'inactive': qt.QIcon(self.dir_path+'/../Resources/Icons/ScreenshotAnnotator/act5.png')
+                'active': resourceCache.icon(f"{resourceFolder}/Icons/ScreenshotAnnotator/act5_p.png", owner=self),
+                'inactive': resourceCache.icon(f"{resourceFolder}/Icons/ScreenshotAnnotator/act5.png", owner=self)
             }
         }
 
@@ -1058,7 +1100,7 @@ class TutorialGUI(qt.QMainWindow):
         label_c = qt.QLabel("Color")
         toolbar.addWidget(label_c)
 
-        self.action7 = qt.QAction(qt.QIcon(self.dir_path+'/../Resources/Icons/ScreenshotAnnotator/color.png'), _("color"), self)
+        self.action7 = qt.QAction(resourceCache.icon(f"{resourceFolder}/Icons/ScreenshotAnnotator/color.png", owner=self), _("color"), self)
         toolbar.addAction(self.action7)
         self.action7.triggered.connect(self.changeColor)
 
@@ -1074,7 +1116,7 @@ class TutorialGUI(qt.QMainWindow):
 
         label_t = qt.QLabel("Text: ")
         toolbar.addWidget(label_t)
-        self.fill_annot = qt.QAction(qt.QIcon(self.dir_path+'/../Resources/Icons/ScreenshotAnnotator/fill_u.png'), _("Fill"), self)
+        self.fill_annot = qt.QAction(resourceCache.icon(f"{resourceFolder}/Icons/ScreenshotAnnotator/fill_u.png", owner=self), _("Fill"), self)
         self.fill_annot.setCheckable(True)
         self.fill = False
         #toolbar.addAction(self.fill_annot)
@@ -1097,7 +1139,7 @@ class TutorialGUI(qt.QMainWindow):
         toolbar.addAction(self.widget_action)
         self.text_in.setPlaceholderText("Add text to accompany an arrow here.")
 
-        self.load_icon = qt.QAction(qt.QIcon(self.dir_path+'/../Resources/Icons/ScreenshotAnnotator/image.png'), _("Load icon"), self)
+        self.load_icon = qt.QAction(resourceCache.icon(f"{resourceFolder}/Icons/ScreenshotAnnotator/image.png", owner=self), _("Load icon"), self)
         self.load_icon.setCheckable(True)
         self.new_image = qt.QPixmap(20, 20)
         self.dir_icon = None
@@ -1153,6 +1195,8 @@ class TutorialGUI(qt.QMainWindow):
                     print(f"ERROR")
         has_widgets = False
     
+        chevronUpIcon = resourceCache.icon(f"{resourceFolder}/Icons/ScreenshotAnnotator/chevron_up.png", owner=self)
+        chevronDownIcon = resourceCache.icon(f"{resourceFolder}/Icons/ScreenshotAnnotator/chevron_down.png", owner=self)
         for stepIndex, screenshots in grouped_steps.items():
             if not screenshots:
                 continue 
@@ -1172,7 +1216,7 @@ class TutorialGUI(qt.QMainWindow):
             main_button.clicked.connect(lambda _, img=main_screenshot, btn=main_button: self.select_single_image(img, btn))
             if len(screenshots[1:])>0:
                 toggle_button = qt.QPushButton()
-                toggle_button.setIcon(qt.QIcon(self.dir_path+'/../Resources/Icons/ScreenshotAnnotator/chevron_down.png'))  
+                toggle_button.setIcon(chevronDownIcon)
                 toggle_button.setIconSize(qt.QSize(32, 32))
                 toggle_button.setCheckable(True)
 
@@ -1199,9 +1243,9 @@ class TutorialGUI(qt.QMainWindow):
                 def toggle_secondary_images(checked, container=secondary_container, button=toggle_button):
                     container.setVisible(checked)
                     if checked:
-                        button.setIcon(qt.QIcon(self.dir_path+'/../Resources/Icons/ScreenshotAnnotator/chevron_up.png'))
+                        button.setIcon(chevronUpIcon)
                     else:
-                        button.setIcon(qt.QIcon(self.dir_path+'/../Resources/Icons/ScreenshotAnnotator/chevron_down.png')) 
+                        button.setIcon(chevronDownIcon)
 
                 toggle_button.toggled.connect(toggle_secondary_images)
 
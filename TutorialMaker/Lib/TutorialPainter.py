@@ -5,9 +5,11 @@ import math
 import json
 from slicer.i18n import tr as _
 from Lib.Annotations import Annotation, AnnotationType, AnnotatorSlide, AnnotatedTutorial
-from Lib.TutorialUtils import Tutorial, TutorialScreenshot
+from Lib.TutorialUtils import Tutorial, TutorialScreenshot, JSONHandler
 import Lib.TutorialUtils as TutorialUtils
 import Lib.TutorialExporter as Exporter
+from Lib.RunContext import RunContext
+from Lib.ResourceCache import resourceCache, resourceFolder
 
 
 class ImageDrawer:
@@ -462,8 +464,7 @@ class ImageDrawer:
         if self.view is None:
             print(_("Error: Load an image first."))
             return
-        path = Lib.TutorialUtils.get_module_basepath("TutorialMaker") + '/Resources/Icons/Painter/click_icon.png'
-        icon_pixmap = qt.QPixmap(path).scaledToWidth(30)
+        icon_pixmap = resourceCache.pixmap(f"{resourceFolder}/Icons/Painter/click_icon.png", 30, owner=self)
         icon_item = qt.QGraphicsPixmapItem(icon_pixmap)
         icon_item.setPos(x, y)
         self.scene.addItem(icon_item)
@@ -605,7 +606,8 @@ class ImageDrawer:
         # Initialize ImageDrawer and JSONHandler instances
         import Lib.TutorialUtils as TutorialUtils
         image_drawer = ImageDrawer()
-        jsonHandler = TutorialUtils.JSONHandler()
+        context = RunContext.fromAnnotations(path)
+        jsonHandler = TutorialUtils.JSONHandler(context.rawPath)
         tutorial = jsonHandler.parseTutorial(True)
         OutputAnnotator = TutorialUtils.JSONHandler.parseJSON(path)
 
@@ -624,7 +626,7 @@ class ImageDrawer:
                 image_drawer.load_image(screenshot)
                 image_drawer.painter(OutputAnnotator[annotateSteps], screenshotData, 'es')
 
-                image_drawer.save_to_png(TutorialUtils.get_module_basepath("TutorialMaker") + '/Outputs/Translation/output_image_' + str(i) + '.png')
+                image_drawer.save_to_png(context.translationPath + '/output_image_' + str(i) + '.png')
 
                 imgSS = imgSS + 1
             pass
@@ -709,18 +711,25 @@ class ImageDrawer:
         return justified_line
 
 class TutorialPainter:
-    def __init__(self):
+    def __init__(self, context=None):
         settings = slicer.app.userSettings()
         self.slides : list[AnnotatorSlide] = []
         self.imagePaths : list[str] = [] #TODO: Improve this part
         self.TutorialInfo = {}
         self.currentLanguage = settings.value("language")
 
-        # TODO: Get a better way to get the module location
-        self.outputFolder = f"{os.path.dirname(__file__)}/../Outputs"
+        # Run the annotated tutorial belongs to, taken from the annotations file when not given
+        self.context = context
+        self.outputFolder = context.root if context is not None else None
         pass
 
+    def useContextOf(self, path):
+        if self.context is None:
+            self.context = RunContext.fromAnnotations(path)
+            self.outputFolder = self.context.root
+
     def LoadAnnotatedTutorial(self, path):
+        self.useContextOf(path)
         self.slides = []
         textDict = self.GetLocalizedDict(self.currentLanguage)
         with open(path, encoding='utf-8') as file:
@@ -731,35 +740,33 @@ class TutorialPainter:
             "date": rawData["date"],
             "desc": rawData["desc"],
         }
+        # Finds the screenshots through Tutorial.json, they can be in the object store
+        rawTutorial = JSONHandler(self.context.rawPath)
         rawDataOffsetCounter = 0
         for slideData in rawData["slides"]:
             slideStep, slideImg = slideData['SlideCode'].split("/")
             slideStep = str(int(slideStep) - rawDataOffsetCounter)
-            rawStepPath = f"{self.outputFolder}/raw/{slideStep}/{slideImg}"
+            screenshotPath, metadataPath = rawTutorial.screenshotFiles(slideStep, slideImg)
             slideMetadata = []
             slideImage : qt.QImage = None
 
             tsParser = TutorialScreenshot()
             if slideData["SlideLayout"] == "Screenshot":
                 try:
-                    tsParser.metadata = rawStepPath + ".json"
+                    tsParser.metadata = metadataPath
                     slideMetadata = tsParser.getWidgets()
 
-                    slideImage = qt.QImage(rawStepPath + ".png")
+                    slideImage = TutorialScreenshot.readImage(screenshotPath)
                 except FileNotFoundError:
-                    stepPath = f"{self.outputFolder}/raw/{slideStep}"
                     slideMetadata = []
-                    test_contents = os.listdir(stepPath)
-                    for content in test_contents:
-                        if(".json" not in content):
-                            continue
-                        tsParser.metadata = f"{stepPath}/{content}"
+                    for stepMetadataPath in rawTutorial.stepMetadataFiles(slideStep):
+                        tsParser.metadata = stepMetadataPath
                         slideMetadata.extend(tsParser.getWidgets())
 
-                    slideImage = qt.QImage(f"{self.outputFolder}/Annotations/{slideData['ImagePath']}")
+                    slideImage = qt.QImage(f"{self.context.annotationsPath}/{slideData['ImagePath']}")
             else:
                 rawDataOffsetCounter += 1
-                slideImage = qt.QImage(f"{self.outputFolder}/Annotations/{slideData['ImagePath']}")
+                slideImage = qt.QImage(f"{self.context.annotationsPath}/{slideData['ImagePath']}")
             
             annotations = []
             for annotationData in slideData["Annotations"]:
@@ -803,11 +810,11 @@ class TutorialPainter:
         pass
 
     def GenerateHTMLfromAnnotatedTutorial(self, path):
+        self.useContextOf(path)
         [self.TutorialInfo, self.slides, self.imagePaths] = AnnotatedTutorial.LoadAnnotatedTutorial(path)
         localizedScreenshotsPath = f"{self.outputFolder}/{self.TutorialInfo['title']}_{self.currentLanguage}"
         clean_title = self.TutorialInfo["title"].strip().replace(" ", "_").replace("\t", "_").replace("\n", "_").replace("\r", "_")
-        clean_folder = f"{os.path.dirname(os.path.dirname(__file__))}/Outputs"
-        localizedScreenshotsPath = f"{clean_folder}/{clean_title}_{self.currentLanguage}"
+        localizedScreenshotsPath = f"{self.outputFolder}/{clean_title}_{self.currentLanguage}"
         self.SaveLocalizedScreenshots(localizedScreenshotsPath)
 
         # If we are going to have a exporter lib then it should handle this itself
@@ -855,7 +862,7 @@ class TutorialPainter:
         pass
 
     def GetLocalizedDict(self, lang, tutorialName = ""):
-        dictPath = self.outputFolder + "/Annotations/text_dict_default.json"
+        dictPath = (self.context or RunContext.latest()).annotationsPath + "/text_dict_default.json"
         textDict = {}
         with open(dictPath, encoding='utf-8') as file:
                 textDict = json.load(file)
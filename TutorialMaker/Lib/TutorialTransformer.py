@@ -0,0 +1,272 @@
+import io
+import os
+import re
+import ast
+import hashlib
+import marshal
+import tokenize
+import threading
+import importlib.util
+from slicer.i18n import tr as _
+
+# Comment directives recognised in tutorial sources, "# TUTORIALMAKER <directive> [value]"
+DIRECTIVE_ID = "TUTORIALMAKER"
+BEGIN = "BEGIN"
+END = "END"
+INFO = "INFO"
+SCREENSHOT = "SCREENSHOT"
+INFO_FIELDS = ["TITLE", "AUTHOR", "DATE", "DESC", "DEPENDENCIES"]
+
+# Part of the cache key, bump it whenever the generated code changes
+TRANSFORMER_VERSION = 2
+CACHE_DIR = os.path.normpath(os.path.dirname(__file__) + "/../Outputs/Cache/Tutorials")
+
+FUNCTION_TYPES = (ast.FunctionDef, ast.AsyncFunctionDef)
+
+def findDirectives(source:str) -> list[tuple[int, int, str, str]]:
+    """(line, column, directive, value) of every TUTORIALMAKER comment, in source order"""
+    directives = []
+    for token in tokenize.generate_tokens(io.StringIO(source).readline):
+        if token.type != tokenize.COMMENT:
+            continue
+        words = token.string[1:].split(None, 2)
+        if len(words) >= 2 and words[0] == DIRECTIVE_ID:
+            directives.append((token.start[0], token.start[1], words[1], words[2].strip() if len(words) > 2 else ""))
+    return directives
+
+def functionExtents(tree) -> list[tuple[int, int, int, ast.AST]]:
+    """(first line, last line, body column, node) of every function in source order.
+    The last line runs up to the next statement after the function, so the comments
+    that follow its last statement are included."""
+    extents = []
+
+    def visit(body, limit):
+        for position, statement in enumerate(body):
+            statementLimit = body[position + 1].lineno - 1 if position + 1 < len(body) else limit
+            if isinstance(statement, FUNCTION_TYPES):
+                extents.append((statement.lineno, statementLimit, statement.body[0].col_offset, statement))
+            for _name, value in ast.iter_fields(statement):
+                if not isinstance(value, list) or not value:
+                    continue
+                if isinstance(value[0], ast.stmt):
+                    visit(value, statementLimit)
+                elif hasattr(value[0], "body"):
+                    # except handlers and match cases
+                    for clause in value:
+                        visit(clause.body, statementLimit)
+
+    visit(tree.body, float("inf"))
+    extents.sort(key=lambda extent: extent[0])
+    return extents
+
+def assignDirectives(directives, extents) -> dict:
+    """Maps every function to its directives, a directive belongs to the innermost function
+    that contains its line and whose body is not indented deeper than the comment"""
+    assigned = {}
+    stack = []
+    nextExtent = 0
+    for directive in directives:
+        line, column = directive[0], directive[1]
+        # Extents are nested or disjoint, the stack only holds the ones around line
+        while nextExtent < len(extents) and extents[nextExtent][0] <= line:
+            while stack and stack[-1][1] < extents[nextExtent][0]:
+                stack.pop()
+            stack.append(extents[nextExtent])
+            nextExtent += 1
+        while stack and stack[-1][1] < line:
+            stack.pop()
+        for extent in reversed(stack):
+            if extent[2] <= column:
+                assigned.setdefault(extent[3], []).append(directive)
+                break
+    return assigned
+
+class TutorialTransformer(ast.NodeTransformer):
+    """Turns the code between "# TUTORIALMAKER BEGIN" and "# TUTORIALMAKER END" of a test method
+    into a generator, TUTORIAL_STEPS(), that yields at each "# TUTORIALMAKER SCREENSHOT".
+
+    The method then returns {"TUTORIAL_GETINFO", "TUTORIAL_STEPS", "TUTORIAL_STEP_COUNT"}. Every
+    next() runs one step, the variables of the tutorial stay in the frame of the generator from
+    one step to the next. The statements keep their original line numbers so tracebacks point
+    into the tutorial file. Code between the last SCREENSHOT and END is never run.
+    """
+    def __init__(self, assigned, filename="<tutorial>"):
+        self.assigned = assigned
+        self.filename = filename
+
+    def error(self, message, line):
+        return SyntaxError(message, (self.filename, line, 0, None))
+
+    def visit_FunctionDef(self, node):
+        self.generic_visit(node)
+        directives = self.assigned.get(node)
+        if not directives:
+            return node
+
+        statements = iter(node.body)
+        statement = next(statements, None)
+
+        def take(line):
+            """Statements that end before line, a statement around line is an error"""
+            nonlocal statement
+            taken = []
+            while statement is not None and statement.end_lineno <= line:
+                taken.append(statement)
+                statement = next(statements, None)
+            if statement is not None and statement.lineno <= line:
+                raise self.error(_("TUTORIALMAKER directives have to be at the level of the test method body"), line)
+            return taken
+
+        body = []
+        index = 0
+        while index < len(directives):
+            beginLine, _column, kind, _value = directives[index]
+            index += 1
+            if kind == INFO:
+                continue
+            if kind != BEGIN:
+                raise self.error(_("TUTORIALMAKER {directive} outside of a BEGIN/END block").format(directive=kind), beginLine)
+            body.extend(take(beginLine))
+
+            info = dict.fromkeys(INFO_FIELDS, "")
+            steps = []
+            step = []
+            while index < len(directives) and directives[index][2] != END:
+                line, _column, kind, value = directives[index]
+                step.extend(take(line))
+                if kind == SCREENSHOT:
+                    steps.append((step, line))
+                    step = []
+                elif kind == INFO:
+                    field, _space, text = value.partition(" ")
+                    if field in info:
+                        info[field] = text.strip()
+                elif kind == BEGIN:
+                    raise self.error(_("TUTORIALMAKER BEGIN inside another BEGIN/END block"), line)
+                index += 1
+            if index == len(directives):
+                raise self.error(_("TUTORIALMAKER BEGIN without END"), beginLine)
+            take(directives[index][0])
+            index += 1
+            body.extend(self.tutorialFunctions(info, steps, beginLine))
+
+        while statement is not None:
+            body.append(statement)
+            statement = next(statements, None)
+        node.body = body
+        return node
+
+    visit_AsyncFunctionDef = visit_FunctionDef
+
+    def tutorialFunctions(self, info, steps, line):
+        generated = ast.parse(
+            f"def TUTORIAL_GETINFO():\n    return {[info[field] for field in INFO_FIELDS]!r}\n"
+            "def TUTORIAL_STEPS():\n    return\n    yield\n"
+            f"return {{'TUTORIAL_GETINFO': TUTORIAL_GETINFO, 'TUTORIAL_STEPS': TUTORIAL_STEPS, 'TUTORIAL_STEP_COUNT': {len(steps)}}}\n").body
+        # The generated code is reported on the BEGIN line, the steps keep their own lines
+        for node in generated:
+            for child in ast.walk(node):
+                if "lineno" in child._attributes:
+                    child.lineno = child.end_lineno = line
+                    child.col_offset = child.end_col_offset = 0
+        body = []
+        for step, markerLine in steps:
+            body.extend(step)
+            body.append(ast.Expr(value=ast.Yield(value=None, lineno=markerLine, col_offset=0, end_lineno=markerLine, end_col_offset=0),
+                                 lineno=markerLine, col_offset=0, end_lineno=markerLine, end_col_offset=0))
+        if body:
+            generated[1].body = body
+        return generated
+
+    def transform(self, tree):
+        return self.visit(tree)
+
+def compileTutorial(source:str, filename="<tutorial>"):
+    """Code object of the tutorial source with its TUTORIALMAKER blocks turned into step functions"""
+    tree = ast.parse(source, filename)
+    directives = findDirectives(source)
+    if directives:
+        assigned = assignDirectives(directives, functionExtents(tree))
+        tree = TutorialTransformer(assigned, filename).transform(tree)
+    return compile(tree, filename, "exec")
+
+class CompiledTutorialCache:
+    """Transformed tutorials marshalled on disk, one entry per tutorial file.
+
+    Entries are named <hash of the path>-<hash of the source, TRANSFORMER_VERSION and the
+    bytecode magic number>, an edited tutorial or a new Slicer Python gets a new entry and
+    replaces the old one of that path. Loaded code objects are also kept in memory.
+    """
+    SUFFIX = ".tutorialc"
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.codes = {}
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def entryName(self, path, source:bytes):
+        pathHash = hashlib.sha256(os.path.abspath(path).encode("utf-8")).hexdigest()[:16]
+        sourceHash = hashlib.sha256()
+        sourceHash.update(source)
+        sourceHash.update(f"\0{TRANSFORMER_VERSION}\0".encode("ascii"))
+        sourceHash.update(importlib.util.MAGIC_NUMBER)
+        return pathHash, f"{pathHash}-{sourceHash.hexdigest()}{self.SUFFIX}"
+
+    def load(self, path):
+        with open(path, "rb") as fd:
+            source = fd.read()
+        pathHash, name = self.entryName(path, source)
+        with self.lock:
+            code = self.codes.get(name)
+        if code is None:
+            try:
+                with open(os.path.join(self.directory, name), "rb") as fd:
+                    code = marshal.load(fd)
+            except (OSError, EOFError, ValueError, TypeError):
+                code = None
+        hit = code is not None
+        if not hit:
+            code = compileTutorial(source.decode("utf-8"), path)
+            self.store(pathHash, name, code)
+        with self.lock:
+            self.codes[name] = code
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+        return code
+
+    def store(self, pathHash, name, code):
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            temporaryPath = os.path.join(self.directory, f"{name}.{os.getpid()}.{threading.get_ident()}.tmp")
+            with open(temporaryPath, "wb") as fd:
+                marshal.dump(code, fd)
+            os.replace(temporaryPath, os.path.join(self.directory, name))
+            # Older versions of the same tutorial
+            for entry in os.listdir(self.directory):
+                if entry.startswith(pathHash) and entry.endswith(self.SUFFIX) and entry != name:
+                    os.remove(os.path.join(self.directory, entry))
+        except OSError:
+            # The cache only saves time, the tutorial still runs without it
+            pass
+
+_cache = None
+
+def getCache() -> CompiledTutorialCache:
+    global _cache
+    if _cache is None or _cache.directory != CACHE_DIR:
+        _cache = CompiledTutorialCache(CACHE_DIR)
+    return _cache
+
+def compileTutorialFile(path:str, useCache=True):
+    if useCache:
+        return getCache().load(path)
+    with open(path, encoding="utf-8") as fd:
+        return compileTutorial(fd.read(), path)
+
+def tutorialModuleName(path:str) -> str:
+    """Module name of a tutorial file, each tutorial gets its own so several can be loaded at once"""
+    return "TutorialMakerTutorial_" + re.sub(r"\W", "_", os.path.splitext(os.path.basename(path))[0])
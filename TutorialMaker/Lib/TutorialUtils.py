@@ -2,7 +2,19 @@ import slicer
 import qt
 import os
 import re
+import sys
+import types
+import time
+import logging
+import json
+import functools
+import collections
 from slicer.i18n import tr as _
+from Lib.RunContext import RunContext, OUTPUTS_DIR
+from Lib.ObjectStore import ObjectStore
+from Lib.ScreenshotWriter import ScreenshotWriter, arrayToQImage, loadImageArray
+from Lib.TileDelta import DELTA_SUFFIX, FrameCache, FrameSequence
+from Lib.TutorialTransformer import compileTutorialFile, tutorialModuleName
 
 def get_module_basepath(moduleName):
     try:
@@ -92,17 +104,22 @@ class Widget():
         #slicer.app.processEvents(qt.QEventLoop.AllEvents, 70)
         return result
 
-    def getGlobalPos(self):
-        mw = slicer.util.mainWindow()
-        windowPos = mw.mapToGlobal(mw.rect.topLeft())
+    def getGlobalPos(self, windowPos=None, devicePixelRatio=None):
+        if windowPos is None:
+            mw = slicer.util.mainWindow()
+            windowPos = mw.mapToGlobal(mw.rect.topLeft())
+        if devicePixelRatio is None:
+            devicePixelRatio = slicer.app.desktop().devicePixelRatioF()
 
         globalPosTopLeft = self.__widgetData.mapToGlobal(self.__widgetData.rect.topLeft())
-        return [(globalPosTopLeft.x() - windowPos.x())*slicer.app.desktop().devicePixelRatioF(), (globalPosTopLeft.y() - windowPos.y())*slicer.app.desktop().devicePixelRatioF()]
+        return [(globalPosTopLeft.x() - windowPos.x())*devicePixelRatio, (globalPosTopLeft.y() - windowPos.y())*devicePixelRatio]
 
-    def getSize(self):
+    def getSize(self, devicePixelRatio=None):
+        if devicePixelRatio is None:
+            devicePixelRatio = slicer.app.desktop().devicePixelRatioF()
         posTopLeft = self.__widgetData.rect.topLeft()
         posBotRight = self.__widgetData.rect.bottomRight()
-        return [(posBotRight.x() - posTopLeft.x())*slicer.app.desktop().devicePixelRatioF(), (posBotRight.y() - posTopLeft.y())*slicer.app.desktop().devicePixelRatioF()]
+        return [(posBotRight.x() - posTopLeft.x())*devicePixelRatio, (posBotRight.y() - posTopLeft.y())*devicePixelRatio]
 
     def __listWidgetAsChildren(self):
         from types import SimpleNamespace
@@ -365,6 +382,30 @@ class Util():
         if not os.path.exists(testingFolder):
             os.mkdir(testingFolder)
 
+    @staticmethod
+    def installTranslators(language, languagesDir=None):
+        """Installs the .qm files of language from the Languages folder, returns the translators to
+        pass to removeTranslators. English is the source language and needs none"""
+        translators = []
+        if language == "en":
+            return translators
+        languagesDir = languagesDir or get_module_basepath("TutorialMaker") + "/Languages"
+        if not os.path.isdir(languagesDir):
+            return translators
+        for file in os.listdir(languagesDir):
+            if not (file.endswith(f"_{language}.qm") or file.endswith(f"-{language.replace('_', '-')}.qm")):
+                continue
+            translator = qt.QTranslator()
+            if translator.load(os.path.join(languagesDir, file)):
+                slicer.app.installTranslator(translator)
+                translators.append(translator)
+        return translators
+
+    @staticmethod
+    def removeTranslators(translators):
+        for translator in translators:
+            slicer.app.removeTranslator(translator)
+
     @staticmethod
     def mapFromTo(value : float, inputMin : float, inputMax : float, outputMin : float, outputMax : float) -> float:
         if Util.mw is None:
@@ -372,6 +413,66 @@ class Util():
         result=(value-inputMin)/(inputMax-inputMin)*(outputMax-outputMin)+outputMin
         return result
 
+class WidgetSnapshot():
+    """Collects the metadata of every widget of a window in a single depth-first walk.
+
+    Util.uniqueWidgetPath walks up to the root and lists the children of every parent
+    again for each widget. Here the path of each child is built from the path of its
+    parent while the children are listed, so every widget is visited once and the
+    paths are the same as the ones Util.uniqueWidgetPath produces.
+    """
+    def __init__(self, window):
+        if Util.mw is None:
+            Util.loadMainWindow()
+        self.window = Widget(window)
+        mw = slicer.util.mainWindow()
+        self.windowPos = mw.mapToGlobal(mw.rect.topLeft())
+        self.devicePixelRatio = slicer.app.desktop().devicePixelRatioF()
+
+    def walk(self, skipHidden=False):
+        """Yields (widget, path) in the same order as Util.getOnScreenWidgets.
+
+        With skipHidden the subtree of a hidden widget is not visited, isVisible()
+        is False for all of its descendants so none of them would be saved anyway.
+        """
+        stack = [(self.window, Util.uniqueWidgetPath(self.window))]
+        while stack:
+            parent, parentPath = stack.pop()
+            classCount = {}
+            children = []
+            for child in parent.getChildren():
+                # Same index Util.__classtoname would find among the siblings
+                index = classCount.get(child.className, 0)
+                classCount[child.className] = index + 1
+                #If the widget is a window, do not add it outside of its own window
+                if hasattr(child.inner(), "isWindow") and child.inner().isWindow():
+                    continue
+                name = child.name if child.name != "" else f"{child.className}:{index}"
+                children.append((child, parentPath + "/" + name))
+            for child, path in reversed(children):
+                if skipHidden and hasattr(child.inner(), "isVisible") and not child.inner().isVisible():
+                    continue
+                stack.append((child, path))
+            if parent is not self.window:
+                yield parent, parentPath
+
+    def capture(self):
+        data = {}
+        data["_devicePixelRatio"] = self.devicePixelRatio
+        for index, (widget, path) in enumerate(self.walk(skipHidden=True)):
+            try:
+                data[index] = {"name": widget.name,
+                               "path": path,
+                               "text": widget.text,
+                               "position": widget.getGlobalPos(self.windowPos, self.devicePixelRatio),
+                               "size": widget.getSize(self.devicePixelRatio)}
+            except AttributeError:
+                #Working as expected, so to not save QObjects that are not QWidgets
+                pass
+            except Exception as e:
+                print(e)
+        return data
+
 class WidgetFinder(qt.QWidget):
     def __init__(self, parent=None):
         super().__init__(None)
@@ -513,117 +614,47 @@ class SelfTestTutorialLayer():
 
     @staticmethod
     def ParseTutorial(path):
+        """Code object of the tutorial at path with its TUTORIALMAKER blocks turned into step functions,
+        see Lib.TutorialTransformer. Unchanged tutorials come from the compiled tutorial cache."""
         if path == "" or path == None:
             raise Exception()
+        return compileTutorialFile(path)
 
-        counter = NextCounter()
-
-        code_contents = ""
-        with open(path, encoding='utf-8') as fd:
-            code_contents = fd.read()
-
-        # GENERATE FUNCTIONS FOR EACH TUTORIAL DIRECTIVE
-        _tutorialBeginString = f"# {SelfTestTutorialLayer.directives['id']} {SelfTestTutorialLayer.directives['begin']}"
-        _tutorialEndString = f"# {SelfTestTutorialLayer.directives['id']} {SelfTestTutorialLayer.directives['end']}"
-        _tutorialTakeScreenshot = f"# {SelfTestTutorialLayer.directives['id']} {SelfTestTutorialLayer.directives['takeScreenshot']}"
-
-        tutorialMatcher = rf"(?s)(?<={_tutorialBeginString}).*?(?={_tutorialEndString})"
-        functionMatcher = rf"(?s).+?(?={_tutorialTakeScreenshot})"
-        infoMatcher = rf"(?m)(?<=# {SelfTestTutorialLayer.directives['id']} {SelfTestTutorialLayer.directives['metadata']} )([A-z]+)( )(.*)\n"
-
-        tutorial_tests = []
-        for test_module in re.findall(tutorialMatcher, code_contents):
-            tutorial_title = ""
-            tutorial_author = ""
-            tutorial_date = ""
-            tutorial_desc = ""
-            tutorial_dependencies = ""
-
-            for info in re.findall(infoMatcher, test_module):
-                if info[0] == SelfTestTutorialLayer.directives['metadata_title']:
-                    tutorial_title = info[2]
-                    pass
-                elif info[0] == SelfTestTutorialLayer.directives['metadata_author']:
-                    tutorial_author = info[2]
-                    pass
-                elif info[0] == SelfTestTutorialLayer.directives['metadata_date']:
-                    tutorial_date = info[2]
-                    pass
-                elif info[0] == SelfTestTutorialLayer.directives['metadata_desc']:
-                    tutorial_desc = info[2]
-                    pass
-                elif info[0] == SelfTestTutorialLayer.directives['metadata_dependencies']:
-                    tutorial_dependencies = info[2]
-                    pass
-
-            info_func = (
-                "\n"
-                f"{' '*8}def TUTORIAL_GETINFO():\n"
-                f"{' '*12}return ['{tutorial_title}','{tutorial_author}', '{tutorial_date}', '{tutorial_desc}', '{tutorial_dependencies}']\n"
-            )
-            
-            tutorial_functions = []
-            for idx, test_function in enumerate(re.findall(functionMatcher, test_module)):
-                _functionSignature = f"def TUTORIAL_SCREENSHOT_{idx}(_locals):\n"
-                lines = test_function.split("\n")
-                _indentation = lines[0].count(" ") # THIS DOESN'T WORK
-                _indentation = 8 #TODO: NEED TO FIND A FAST WAY TO GET THIS DINAMICALLY
-                lines[0] = ""
-                _newFunction = "\n" + " "*_indentation + _functionSignature
-                _newFunction += " "*(_indentation + 4) + "globals().update(_locals)\n"
-
-                for line in lines:
-                    _newFunction += " "*4 + line + "\n"
-                
-                _newFunction += " "*(_indentation + 4) + "_locals.update(locals())\n"
-
-                tutorial_functions.append(_newFunction)
-                pass
-            tutorial_functions[0] = info_func + tutorial_functions[0]
-            tutorial_functions[len(tutorial_functions) - 1] = tutorial_functions[len(tutorial_functions) - 1] + f"{' '*8}return locals()\n"
-            counter.count = 0
-            tutorial_tests.append(re.sub(functionMatcher, lambda match : tutorial_functions[counter.next()], test_module))
-        counter.count = 0
-        finalFile = re.sub(tutorialMatcher, lambda match : tutorial_tests[counter.next()], code_contents)
-
-        path = get_module_basepath("TutorialMaker") + "/Outputs/"
+    @staticmethod
+    def LoadTutorial(path):
+        """Runs the parsed tutorial in a new module named after the file and returns it"""
+        module = types.ModuleType(tutorialModuleName(path))
+        module.__file__ = path
+        sys.modules[module.__name__] = module
+        exec(SelfTestTutorialLayer.ParseTutorial(path), module.__dict__)
+        return module
 
-        with open(path + "CurrentParsedTutorial.py", "w", encoding='utf-8') as fd:
-            fd.write(finalFile)
-        pass
+    @staticmethod
+    def RunTutorialFile(path, callback = None, minimumStepWait = None, maximumStepWait = None, interactive = True, context = None):
+        """Loads the tutorial at path and runs its first test class, returns the TutorialStepScheduler.
+        The capture goes to context, by default a new run of Outputs/runs named after the file"""
+        if context is None:
+            context = RunContext.create(os.path.splitext(os.path.basename(path))[0])
+        tutorialModule = SelfTestTutorialLayer.LoadTutorial(path)
+        for className in tutorialModule.__dict__:
+            if("Test" not in className or className == "ScriptedLoadableModuleTest"):
+                continue
+            testClass = getattr(tutorialModule, className)
+            return SelfTestTutorialLayer.RunTutorial(testClass(), callback, minimumStepWait, maximumStepWait, interactive, context)
+        logging.error(_("No tests found in {path}").format(path=path))
+        raise Exception(_("No Tests Found"))
 
     @staticmethod
-    def RunTutorial(tutorialClass, callback = None):
+    def RunTutorial(tutorialClass, callback = None, minimumStepWait = None, maximumStepWait = None, interactive = True, context = None):
         import inspect
-        import functools
-        TUTORIAL_STEP_INTERVAL = 3000
-        TUTORIAL_STEP_DICT = {
-            -1: True,
-            "FINISHED": False
-        }
 
-        def ScreenshotCallable(tutorial, callback, _locals, _stepdict, _index=0):
-            if not _stepdict[_index - 1]:
-                timerCallback = functools.partial(ScreenshotCallable, tutorial, callback, _locals, _stepdict, _index=_index)
-                qt.QTimer.singleShot(TUTORIAL_STEP_INTERVAL, timerCallback)
-                return
-            if _index > 0:
-                tutorial.nextScreenshot()
-            callback(_locals)
-            _stepdict[_index] = True
-
-        def ScreenshotCallableLast(tutorial, _index=0):
-            if not TUTORIAL_STEP_DICT[_index - 1]:
-                endCallback = functools.partial(ScreenshotCallableLast, tutorial, _index)
-                qt.QTimer.singleShot(TUTORIAL_STEP_INTERVAL, endCallback)
-                return
-            tutorial.nextScreenshot()
-            tutorial.endTutorial()
-            TUTORIAL_STEP_DICT["FINISHED"] = True
+        if context is None:
+            context = RunContext.create(type(tutorialClass).__name__)
 
+        steps = []
+        tutorials = []
         tutorialSource = inspect.getsource(tutorialClass.runTest)
         funcMatcher = rf"(?m)(?<=self\.).+(?=\()"
-        functionIndex = 0
         for funcName in re.findall(funcMatcher, tutorialSource):
             func = getattr(tutorialClass, funcName)
             _locals = func()
@@ -633,41 +664,127 @@ class SelfTestTutorialLayer():
                 continue
             if _locals["TUTORIAL_GETINFO"] is not None:
                 info = _locals["TUTORIAL_GETINFO"]()
-                tutorial = Tutorial(*info)
+                tutorial = Tutorial(*info, context=context)
                 tutorial.verifyDependencies()
                 tutorial.clearTutorial()
-                tutorial.beginTutorial()
-                _stepIndex = 0
-                while True:
-                    TUTORIAL_STEP_DICT[functionIndex] = False
-                    try:
-                        timerCallback = functools.partial(ScreenshotCallable, tutorial, _locals[f"TUTORIAL_SCREENSHOT_{functionIndex}"], _locals, TUTORIAL_STEP_DICT, _index=_stepIndex)
-                        qt.QTimer.singleShot(TUTORIAL_STEP_INTERVAL*functionIndex, timerCallback)
-                        functionIndex += 1
-                        _stepIndex += 1
-                    except Exception as e:
-                        print(e)
-                        break
-                endCallback = functools.partial(ScreenshotCallableLast, tutorial, _stepIndex)
-                qt.QTimer.singleShot(TUTORIAL_STEP_INTERVAL*functionIndex, endCallback)
-        # This needs to happen only after every possible tutorial is ran
-        if callback is not None:
-            def FinishCallback(callback):
-                if not TUTORIAL_STEP_DICT["FINISHED"]:
-                    finishCallback = functools.partial(FinishCallback, callback)
-                    qt.QTimer.singleShot(TUTORIAL_STEP_INTERVAL, finishCallback)
-                    return
+                tutorial.beginTutorial(interactive)
+                tutorials.append(tutorial)
+                steps.extend(SelfTestTutorialLayer.TutorialSteps(tutorial, _locals))
+
+        def Finished():
+            # Also when a step failed and the tutorials never reached endTutorial()
+            for tutorial in tutorials:
+                tutorial.closeTutorial()
+            if callback is not None:
                 callback()
 
-            finishCallback = functools.partial(FinishCallback, callback)
-            qt.QTimer.singleShot(TUTORIAL_STEP_INTERVAL*(functionIndex + 1), finishCallback)
+        scheduler = TutorialStepScheduler(steps, Finished)
+        if minimumStepWait is not None:
+            scheduler.minimumWait = minimumStepWait
+        if maximumStepWait is not None:
+            scheduler.maximumWait = maximumStepWait
+        scheduler.start()
+        return scheduler
+
+    @staticmethod
+    def TutorialSteps(tutorial, _locals):
+        """Steps of one parsed tutorial, each one resumes the tutorial generator up to its next
+        SCREENSHOT marker. The screenshot of a step is taken right before the next one starts"""
+        body = _locals["TUTORIAL_STEPS"]()
+
+        def RunStep(takeScreenshot):
+            if takeScreenshot:
+                tutorial.nextScreenshot()
+            try:
+                next(body)
+            except StopIteration:
+                raise Exception(_("The tutorial returned before its last TUTORIALMAKER SCREENSHOT")) from None
+
+        def EndTutorial():
+            body.close()
+            tutorial.nextScreenshot()
+            tutorial.endTutorial()
 
-class NextCounter():
-    def __init__(self, count=0):
-        self.count = count
-    def next(self):
-        self.count += 1
-        return self.count - 1
+        steps = [functools.partial(RunStep, index > 0) for index in range(_locals["TUTORIAL_STEP_COUNT"])]
+        steps.append(EndTutorial)
+        return steps
+
+class TutorialStepScheduler():
+    """Runs tutorial steps one after the other from the Qt event loop.
+
+    The next step starts as soon as the previous one returned, the views were rendered
+    and the event loop went idle, instead of after a fixed interval. The event loop is
+    considered idle once a short poll timer fires on time SETTLE_TICKS times in a row.
+    minimumWait and maximumWait (ms) bound the time spent waiting after each step.
+    """
+    SETTLE_POLL_INTERVAL = 10 # ms
+    SETTLE_LATENCY = 5 # ms, a poll timer firing later than this means there is still work queued
+    SETTLE_TICKS = 2
+
+    def __init__(self, steps, callback=None, minimumWait=100, maximumWait=3000):
+        self.steps = iter(steps)
+        self.callback = callback
+        self.minimumWait = minimumWait
+        self.maximumWait = maximumWait
+
+        # Wall time spent on each step in seconds, running it and waiting for it to settle
+        self.stepTimes = []
+        self.error = None
+        self.finished = False
+
+        self.__stepStart = 0
+        self.__quietTicks = 0
+
+    def start(self):
+        qt.QTimer.singleShot(0, self.__runNextStep)
+
+    def __runNextStep(self):
+        step = next(self.steps, None)
+        if step is None:
+            self.__finish()
+            return
+
+        self.__stepStart = time.perf_counter()
+        try:
+            step()
+        except Exception as e:
+            logging.error(_("Tutorial step {index} failed: {error}").format(index=len(self.stepTimes), error=e))
+            self.error = e
+            self.__finish()
+            return
+
+        if slicer.app.layoutManager() is not None:
+            slicer.util.forceRenderAllViews()
+        self.__quietTicks = 0
+        self.__schedulePoll(0)
+
+    def __schedulePoll(self, interval):
+        interval = max(0, int(interval))
+        expectedTime = time.perf_counter() + interval/1000
+        qt.QTimer.singleShot(interval, functools.partial(self.__poll, expectedTime))
+
+    def __poll(self, expectedTime):
+        now = time.perf_counter()
+        if (now - expectedTime)*1000 <= self.SETTLE_LATENCY:
+            self.__quietTicks += 1
+        else:
+            self.__quietTicks = 0
+
+        elapsed = (now - self.__stepStart)*1000
+        settled = self.__quietTicks >= self.SETTLE_TICKS
+        if (settled and elapsed >= self.minimumWait) or elapsed >= self.maximumWait:
+            self.stepTimes.append(elapsed/1000)
+            qt.QTimer.singleShot(0, self.__runNextStep)
+        elif settled:
+            self.__schedulePoll(self.minimumWait - elapsed)
+        else:
+            self.__schedulePoll(self.SETTLE_POLL_INTERVAL)
+
+    def __finish(self):
+        self.finished = True
+        logging.info(_("Tutorial ran {count} steps in {seconds:.2f}s").format(count=len(self.stepTimes), seconds=sum(self.stepTimes)))
+        if self.callback is not None:
+            self.callback()
 
 class SignalManager(qt.QObject):
     received = qt.Signal(object)
@@ -681,12 +798,18 @@ class SignalManager(qt.QObject):
         self.received.emit(msg)
 
 class ScreenshotTools():
-    def __init__(self) -> None:
-        self.handler = JSONHandler()
+    def __init__(self, context=None, store=None) -> None:
+        self.context = context or RunContext(OUTPUTS_DIR)
+        # With a store the screenshots and metadata go to the ObjectStore instead of Raw/<step>
+        self.store = store
+        # Previous screenshot of every window when the store gets tile deltas
+        self.sequences = {} if store is not None and self.context.tileDeltas else None
+        self.handler = JSONHandler(self.context.rawPath)
+        self.writer = ScreenshotWriter()
         pass
 
     def saveScreenshotMetadata(self, index):
-        path = get_module_basepath("TutorialMaker") + "/Outputs/Raw/"
+        path = self.context.rawPath + "/"
 
         openWindows = []
         for w in slicer.app.topLevelWidgets():
@@ -700,6 +823,9 @@ class ScreenshotTools():
 
         windows = []
         for wIndex in range(len(openWindows)):
+            if self.store is not None:
+                windows.append(self.saveToStore(openWindows[wIndex], wIndex))
+                continue
             if not os.path.exists(path + str(index)):
                 os.mkdir(path + str(index))
                 pass
@@ -716,31 +842,38 @@ class ScreenshotTools():
         pass
         return windows
 
+    def saveToStore(self, window, wIndex=0):
+        screenshotData = TutorialScreenshot()
+        if self.sequences is None:
+            screenshotData.windowHash = self.writer.submitObject(self.getPixmap(window), self.store)
+        else:
+            sequence = self.sequences.setdefault((wIndex, window.objectName), FrameSequence())
+            screenshotData.windowHash = self.writer.submitFrame(self.getPixmap(window), self.store, sequence)
+        data = WidgetSnapshot(window).capture()
+        # Same bytes as JSONHandler.saveScreenshotMetadata writes
+        screenshotData.metadataHash = self.store.put(json.dumps(data, ensure_ascii=False, indent=4).encode("utf-8"), ".json")
+        screenshotData.screenshot = self.store.path(screenshotData.windowHash)
+        screenshotData.metadata = self.store.path(screenshotData.metadataHash)
+        return screenshotData
+
     def getPixmap(self, window):
         #slicer.app.processEvents(qt.QEventLoop.AllEvents, 70)
         pixmap = window.grab()
         return pixmap
 
     def saveScreenshot(self, filename, window):
-        self.getPixmap(window).save(filename, "PNG")
+        # Encoded and written in the background, call flush() before reading the files back
+        self.writer.submit(self.getPixmap(window), filename)
         pass
 
+    def flush(self):
+        self.writer.flush()
+
+    def close(self):
+        self.writer.close()
+
     def saveAllWidgetsData(self, filename, window):
-        data = {}
-        data["_devicePixelRatio"] = slicer.app.desktop().devicePixelRatioF()
-        widgets = Util.getOnScreenWidgets(window)
-        for index in range(len(widgets)):
-            try:
-                if hasattr(widgets[index].inner(), "isVisible") and not widgets[index].inner().isVisible():
-                    continue
-                data[index] = {"name": widgets[index].name, "path": Util.uniqueWidgetPath(widgets[index]), "text": widgets[index].text, "position": widgets[index].getGlobalPos(), "size": widgets[index].getSize()}
-                pass
-            except AttributeError:
-                #Working as expected, so to not save QObjects that are not QWidgets
-                pass
-            except Exception as e:
-                print(e)
-                pass
+        data = WidgetSnapshot(window).capture()
         self.handler.saveScreenshotMetadata(data, filename)
 
 class Tutorial():
@@ -749,8 +882,11 @@ class Tutorial():
             author,
             date,
             description,
-            dependencies=""
+            dependencies="",
+            context=None
     ):
+        # Where the capture is written, Outputs/Raw unless the tutorial runs in its own RunContext
+        self.context = context or RunContext(OUTPUTS_DIR)
         self.metadata = {}
         self.metadata["title"] = title
         self.metadata["author"] = author
@@ -767,9 +903,13 @@ class Tutorial():
             except Exception:
                 raise Exception(_("Modules: {dependencies} not found. Please install the required modules before running the tutorial.").format(dependencies=self.metadata["dependencies"]))
 
-    def beginTutorial(self):
-        screenshotTools = ScreenshotTools()
-        answer = slicer.util.confirmOkCancelDisplay(
+    def beginTutorial(self, interactive=True):
+        self.context.ensureFolders()
+        store = ObjectStore(self.context.objectsPath)
+        store.registerRoot(self.context.root)
+        screenshotTools = ScreenshotTools(self.context, store)
+        # Unattended runs always close them, there is nobody to answer
+        answer = not interactive or slicer.util.confirmOkCancelDisplay(
             _("Close Python Console and Error Log?"),
             _("Do you want to close the Python Console and Error Log windows for a better tutorial experience?"),
             okButtonText=_("Yes"),
@@ -784,7 +924,7 @@ class Tutorial():
 
     #TODO:Unsafe, there should be a better method to do this, at least add some conditions
     def clearTutorial(self):
-        outputPath = get_module_basepath("TutorialMaker") + "/Outputs/Raw/"
+        outputPath = self.context.rawPath + "/"
         if not os.path.exists(outputPath):
             return
         dirs = os.listdir(outputPath)
@@ -807,17 +947,40 @@ class Tutorial():
     pass
 
     def endTutorial(self):
-        handler = JSONHandler()
+        # Tutorial.json must only reference screenshots that are already on disk
+        self.screenshottools.flush()
+        handler = JSONHandler(self.context.rawPath)
         handler.saveTutorial(self.metadata, self.steps)
+        self.context.markLatest()
+        if self.screenshottools.store is not None:
+            stats = self.screenshottools.store.stats()
+            logging.info(_("{added} new screenshot objects ({size} bytes), {reused} reused, dedup ratio {ratio:.2f}").format(
+                added=stats["added"], size=stats["addedBytes"], reused=stats["reused"], ratio=stats["dedupRatio"]))
+        self.closeTutorial()
+
+    def closeTutorial(self):
+        """Stops the screenshot writer threads of beginTutorial()"""
+        if getattr(self, "screenshottools", None) is not None:
+            self.screenshottools.close()
 
 class TutorialScreenshot():
     def __init__(self, screenshot="", metadata=""):
         self.screenshot = screenshot
         self.metadata = metadata
+        # Object names when the files are in an ObjectStore
+        self.windowHash = None
+        self.metadataHash = None
         pass
 
+    @staticmethod
+    def readImage(path):
+        """QImage of a captured screenshot, a tile delta is rebuilt from the frames it is based on"""
+        if path.endswith(DELTA_SUFFIX):
+            return arrayToQImage(screenshotCache.load(path))
+        return qt.QImage(path)
+
     def getImage(self):
-        image = qt.QImage(self.screenshot)
+        image = TutorialScreenshot.readImage(self.screenshot)
         pixmap = qt.QPixmap.fromImage(image)
         
         dpr = self.getDevicePixelRatio()
@@ -830,14 +993,17 @@ class TutorialScreenshot():
         return pixmap
     def getWidgets(self):
         widgets = []
-        nWidgets = JSONHandler.parseJSON(self.metadata)
-        dpr = self.getDevicePixelRatio()
+        nWidgets = metadataCache.load(self.metadata)
+        dpr = nWidgets.get("_devicePixelRatio", 1.0)
         
         for keys in nWidgets:
             if isinstance(keys, str) and keys.startswith("_"):
                 continue
             
-            widget = nWidgets[keys].copy() if hasattr(nWidgets[keys], 'copy') else dict(nWidgets[keys])
+            # The parsed file is shared through the cache, hand out copies
+            widget = dict(nWidgets[keys])
+            widget["position"] = list(widget["position"])
+            widget["size"] = list(widget["size"])
             
             if dpr > 1.0:
                 widget["position"] = [widget["position"][0] / dpr, widget["position"][1] / dpr]
@@ -848,17 +1014,70 @@ class TutorialScreenshot():
     
     def getDevicePixelRatio(self):
         """Get the device pixel ratio saved with this screenshot, defaults to 1.0"""
-        nWidgets = JSONHandler.parseJSON(self.metadata)
+        nWidgets = metadataCache.load(self.metadata)
         return nWidgets.get("_devicePixelRatio", 1.0)
 
+class MetadataCache():
+    """Least recently used cache of parsed screenshot metadata files.
+
+    Entries are keyed on the file path and revalidated against the file modification
+    time and size, so a metadata file rewritten by a new capture is parsed again.
+    maxBytes caps the total size of the cached files on disk. The parsed data is shared,
+    callers must not modify it.
+    """
+    def __init__(self, maxBytes=64*1024*1024):
+        self.maxBytes = maxBytes
+        self.entries = collections.OrderedDict()
+        self.totalBytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def load(self, path):
+        if path == "":
+            return {}
+        fileStat = os.stat(path)
+        key = (path, fileStat.st_mtime_ns, fileStat.st_size)
+
+        entry = self.entries.get(path)
+        if entry is not None and entry[0] == key:
+            self.hits += 1
+            self.entries.move_to_end(path)
+            return entry[1]
+
+        self.misses += 1
+        data = JSONHandler.parseJSON(path)
+        self.__remove(path)
+        self.entries[path] = (key, data)
+        self.totalBytes += fileStat.st_size
+        while self.totalBytes > self.maxBytes and len(self.entries) > 1:
+            self.__remove(next(iter(self.entries)))
+        return data
+
+    def __remove(self, path):
+        entry = self.entries.pop(path, None)
+        if entry is not None:
+            self.totalBytes -= entry[0][2]
+
+    def clear(self):
+        self.entries.clear()
+        self.totalBytes = 0
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "entries": len(self.entries), "bytes": self.totalBytes}
+
+metadataCache = MetadataCache()
+# Frames rebuilt from tile deltas, with the keyframes decoded by Qt
+screenshotCache = FrameCache(loadKeyframe=loadImageArray)
+
 # TODO: REMOVE THIS, DEPRECATED
 class JSONHandler:
-    def __init__(self):
-        self.path = get_module_basepath("TutorialMaker") + "/Outputs/Raw/"
+    def __init__(self, path=None):
+        self.path = os.path.join(path or RunContext(OUTPUTS_DIR).rawPath, "")
         if not os.path.exists(self.path):
-            os.mkdir(self.path)
+            os.makedirs(self.path)
         import json
         self.json = json
+        self.steps = None
         pass
 
     def parseTutorial(self, inline=False):
@@ -876,8 +1095,8 @@ class JSONHandler:
             for step in tutorialData["steps"]:
                 for window in step:
                     wScreenshot = TutorialScreenshot(
-                        self.path + window["window"],
-                        self.path + window["metadata"]
+                        self.resolvePath(window["window"]),
+                        self.resolvePath(window["metadata"])
                     )
                     tutorial.steps.append(wScreenshot)
             return tutorial
@@ -899,8 +1118,11 @@ class JSONHandler:
             windows = []
             for screenshot in step:
                 datapair = {}
-                datapair["window"] = screenshot.screenshot.replace(self.path, "")
-                datapair["metadata"] = screenshot.metadata.replace(self.path, "")
+                datapair["window"] = self.relativePath(screenshot.screenshot)
+                datapair["metadata"] = self.relativePath(screenshot.metadata)
+                if screenshot.windowHash is not None:
+                    datapair["windowHash"] = screenshot.windowHash
+                    datapair["metadataHash"] = screenshot.metadataHash
                 windows.append(datapair)
             pass
             metadata["steps"].append(windows)
@@ -908,6 +1130,46 @@ class JSONHandler:
             self.json.dump(metadata, f, ensure_ascii=False, indent=4)
         pass
 
+    def relativePath(self, path):
+        """Path as written in Tutorial.json, relative to the Raw folder when it can be"""
+        if path.startswith(self.path):
+            return path.replace(self.path, "")
+        try:
+            return os.path.relpath(path, self.path).replace(os.sep, "/")
+        except ValueError:
+            # Another drive
+            return path
+
+    def resolvePath(self, path):
+        return os.path.normpath(os.path.join(self.path, path))
+
+    def screenshotFiles(self, step, window):
+        """(screenshot, metadata) of a window of a step, looked up in Tutorial.json since
+        screenshots in an ObjectStore are not in Raw/<step>"""
+        try:
+            entry = self.readSteps()[int(step)][int(window)]
+            return self.resolvePath(entry["window"]), self.resolvePath(entry["metadata"])
+        except (IndexError, KeyError, ValueError):
+            stepPath = os.path.join(self.path, str(step), str(window))
+            return stepPath + ".png", stepPath + ".json"
+
+    def stepMetadataFiles(self, step):
+        """Metadata of every window of a step"""
+        try:
+            return [self.resolvePath(entry["metadata"]) for entry in self.readSteps()[int(step)]]
+        except (IndexError, KeyError, ValueError):
+            stepPath = os.path.join(self.path, str(step))
+            return [os.path.join(stepPath, content) for content in os.listdir(stepPath) if ".json" in content]
+
+    def readSteps(self):
+        if self.steps is None:
+            try:
+                with open(self.path + "Tutorial.json", encoding='utf-8') as f:
+                    self.steps = self.json.load(f)["steps"]
+            except (OSError, ValueError, KeyError):
+                self.steps = []
+        return self.steps
+
     def saveScreenshotMetadata(self, data, path):
         with open(path, 'w', encoding='utf-8') as f:
             self.json.dump(data, f, ensure_ascii=False, indent=4)
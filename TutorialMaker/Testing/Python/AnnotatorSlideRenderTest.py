@@ -0,0 +1,105 @@
+import time
+import unittest
+
+import qt
+
+from Lib.Annotations import Annotation, AnnotationType, AnnotatorSlide
+from Lib.ScreenshotWriter import qImageToArray
+
+
+class AnnotatorSlideRenderTest(unittest.TestCase):
+    """Checks the layered ReDraw against the single pass Draw used for export"""
+
+    def createSlide(self, annotationCount):
+        background = qt.QPixmap(800, 600)
+        background.fill(qt.QColor(40, 40, 40))
+        metadata = []
+        annotations = []
+        types = [AnnotationType.Rectangle, AnnotationType.Arrow, AnnotationType.Click, AnnotationType.TextBox]
+        for index in range(annotationCount):
+            widget = {"name": f"w{index}", "path": f"w{index}", "text": "",
+                      "position": [20 + (index*37) % 700, 20 + (index*53) % 500], "size": [60, 30]}
+            metadata.append(widget)
+            annotation = Annotation(TargetWidget=widget, Type=types[index % len(types)], OptX=widget["position"][0] + 80, OptY=widget["position"][1] + 60)
+            annotation.penConfig(qt.QColor(255, 128, 0), 14, 4, brush=True)
+            annotation.PERSISTENT = True
+            annotations.append(annotation)
+        return AnnotatorSlide(background, metadata, annotations)
+
+    def exportPixels(self, slide):
+        exported = AnnotatorSlide(slide.image, slide.metadata, slide.annotations)
+        exported.Draw()
+        return qImageToArray(exported.outputImage.toImage())
+
+    def test_SamePixelsAsExport(self):
+        slide = self.createSlide(12)
+        slide.ReDraw()
+        self.assertTrue((qImageToArray(slide.outputImage.toImage()) == self.exportPixels(slide)).all())
+
+        # Editing the last annotation and finishing the edit ends with the export pixels again
+        edited = slide.annotations[-1]
+        edited.drawBoundingBox = True
+        slide.ReDraw()
+        edited.setValuesOffset(15, 10)
+        slide.ReDraw()
+        edited.drawBoundingBox = False
+        slide.ReDraw()
+        self.assertTrue((qImageToArray(slide.outputImage.toImage()) == self.exportPixels(slide)).all())
+
+    def test_ExportDoesNotTouchTheCachedLayer(self):
+        slide = self.createSlide(4)
+        slide.ReDraw()
+        before = qImageToArray(slide.outputImage.toImage())
+        slide.Draw()
+        slide.ReDraw()
+        self.assertTrue((qImageToArray(slide.outputImage.toImage()) == before).all())
+
+    def test_EditingCostDoesNotGrowWithAnnotations(self):
+        print("annotations | ReDraw while editing (ms)")
+        for annotationCount in [10, 100, 400]:
+            slide = self.createSlide(annotationCount)
+            edited = slide.annotations[-1]
+            edited.drawBoundingBox = True
+            slide.ReDraw()
+            startTime = time.perf_counter()
+            for offset in range(20):
+                edited.setValuesOffset(offset, offset)
+                slide.ReDraw()
+            elapsed = (time.perf_counter() - startTime) / 20 * 1000
+            print(f"{annotationCount:11d} | {elapsed:25.2f}")
+
+    def test_PreviewAtDisplaySize(self):
+        slide = self.createSlide(8)
+        slide.ReDraw()
+        boundingBoxes = [(list(a.boundingBoxTopLeft), list(a.boundingBoxBottomRight)) for a in slide.annotations]
+
+        # Annotations are drawn in image coordinates through the painter scale
+        fresh = self.createSlide(8)
+        preview = fresh.GetPreview(400, 300)
+        self.assertEqual((preview.width(), preview.height()), (400, 300))
+        self.assertEqual(boundingBoxes, [(list(a.boundingBoxTopLeft), list(a.boundingBoxBottomRight)) for a in fresh.annotations])
+
+        # Unchanged slides reuse the cached layer, the preview only changes once something is edited
+        self.assertTrue((qImageToArray(fresh.GetPreview(400, 300).toImage()) == qImageToArray(preview.toImage())).all())
+        fresh.annotations[0].setValuesOffset(40, 40)
+        self.assertFalse((qImageToArray(fresh.GetPreview(400, 300).toImage()) == qImageToArray(preview.toImage())).all())
+
+    def test_TextLayoutCache(self):
+        widget = {"name": "w", "path": "w", "text": "", "position": [10, 10], "size": [50, 20]}
+        annotation = Annotation(TargetWidget=widget, Type=AnnotationType.TextBox, Text="lorem ipsum dolor sit amet " * 20)
+        annotation.penConfig(qt.QColor("red"), 14, 2)
+        font, metrics = annotation.getFont()
+
+        layout = annotation.getTextLayout(annotation.text, 200)
+        self.assertIs(annotation.getTextLayout(annotation.text, 200), layout)
+        lines, widestLine = layout
+        self.assertGreater(len(lines), 1)
+        self.assertEqual(widestLine, max(metrics.width(line) for line in lines))
+        for line in lines:
+            self.assertLessEqual(metrics.width(line.rstrip()), 200)
+
+        # Text, width and font size changes all give a new layout
+        self.assertIsNot(annotation.getTextLayout(annotation.text + "x", 200), layout)
+        self.assertIsNot(annotation.getTextLayout(annotation.text, 300), layout)
+        annotation.fontSize = 20
+        self.assertIsNot(annotation.getTextLayout(annotation.text, 200), layout)
@@ -0,0 +1,53 @@
+import argparse
+import json
+import os
+import tempfile
+import unittest
+
+from Lib.BatchCapture import BatchCapture, measureRun, parseWindowSize
+
+
+class BatchCaptureTest(unittest.TestCase):
+    def setUp(self):
+        self.tempDir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tempDir.cleanup()
+
+    def writeCapture(self, rawPath, stepCount):
+        """Raw output laid out the way Tutorial.endTutorial leaves it"""
+        steps = []
+        for index in range(stepCount):
+            os.makedirs(os.path.join(rawPath, str(index)))
+            with open(os.path.join(rawPath, str(index), "0.png"), "wb") as fd:
+                fd.write(b"\0" * 100)
+            with open(os.path.join(rawPath, str(index), "0.json"), "w") as fd:
+                fd.write("{}")
+            steps.append([{"window": f"{index}/0.png", "metadata": f"{index}/0.json"}])
+        with open(os.path.join(rawPath, "Tutorial.json"), "w") as fd:
+            json.dump({"title": "Four minute tutorial", "steps": steps}, fd)
+
+    def test_EachTutorialGetsItsFolder(self):
+        batch = BatchCapture(["FourMinuteTutorial", "/Testing/WelcomeTutorial.py"], os.path.join(self.tempDir.name, "Batch"))
+        contexts = [batch.contextFor("FourMinuteTutorial"), batch.contextFor("WelcomeTutorial")]
+        self.assertNotEqual(contexts[0].rawPath, contexts[1].rawPath)
+
+        self.writeCapture(contexts[0].rawPath, 3)
+        self.writeCapture(contexts[1].rawPath, 2)
+        self.assertEqual(measureRun(contexts[0].rawPath), (3, 300))
+        self.assertEqual(measureRun(contexts[1].rawPath), (2, 200))
+        self.assertEqual(batch.tutorialPath("/Testing/WelcomeTutorial.py"), os.path.abspath("/Testing/WelcomeTutorial.py"))
+
+    def test_FailedCaptureWithoutTutorialJson(self):
+        rawPath = os.path.join(self.tempDir.name, "Raw")
+        self.writeCapture(rawPath, 2)
+        os.remove(os.path.join(rawPath, "Tutorial.json"))
+        self.assertEqual(measureRun(rawPath), (0, 200))
+        # A tutorial that failed before its first screenshot
+        self.assertEqual(measureRun(os.path.join(self.tempDir.name, "Missing")), (0, 0))
+
+    def test_WindowSizeArgument(self):
+        self.assertEqual(parseWindowSize("1920x1080"), (1920, 1080))
+        self.assertEqual(parseWindowSize("1280X720"), (1280, 720))
+        with self.assertRaises(argparse.ArgumentTypeError):
+            parseWindowSize("maximized")
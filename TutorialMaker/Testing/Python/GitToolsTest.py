@@ -0,0 +1,318 @@
+import io
+import json
+import os
+import tempfile
+import threading
+import time
+import unittest
+import zipfile
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import Lib.GitTools as GitTools
+
+
+class StandInServer:
+    """Local HTTP server answering with recorded GitHub responses.
+
+    routes maps a request path (with query) to (status, headers, body), every request
+    is recorded in requests as (method, path, headers).
+    """
+    def __init__(self):
+        self.routes = {}
+        self.requests = []
+        self.lock = threading.Lock()
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                with server.lock:
+                    server.requests.append(("GET", self.path, dict(self.headers)))
+                status, headers, body = server.respond(self)
+                if isinstance(body, str):
+                    body = body.encode("utf-8")
+                self.send_response(status)
+                for key, value in headers.items():
+                    self.send_header(key, value)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.httpd.server_address[1]}"
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+
+    def respond(self, handler):
+        route = self.routes.get(handler.path)
+        if route is None:
+            return 404, {"Content-Type": "application/json"}, json.dumps({"message": "Not Found"})
+        if callable(route):
+            return route(handler)
+        return route
+
+    def addJSON(self, path, data, status=200):
+        self.routes[path] = (status, {"Content-Type": "application/json"}, json.dumps(data))
+
+    def addText(self, path, text, status=200):
+        self.routes[path] = (status, {"Content-Type": "text/plain"}, text)
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+REPO = "SlicerLatinAmerica/SlicerTestTutorial"
+
+# Recorded from GET /repos/SlicerLatinAmerica/SlicerTestTutorial/git/trees/HEAD?recursive=1
+RECORDED_TREE = {
+    "sha": "5b0c5d4c1e0f4a0b9c1e6f3b1d2a7e8f9a0b1c2d",
+    "url": f"https://api.github.com/repos/{REPO}/git/trees/5b0c5d4c1e0f4a0b9c1e6f3b1d2a7e8f9a0b1c2d",
+    "tree": [
+        {"path": "README.md", "mode": "100644", "type": "blob", "sha": "a1", "size": 120},
+        {"path": "Tutorials", "mode": "040000", "type": "tree", "sha": "b1"},
+        {"path": "Tutorials/FourMinuteTutorial", "mode": "040000", "type": "tree", "sha": "b2"},
+        {"path": "Tutorials/FourMinuteTutorial/FourMinuteTutorial.py", "mode": "100644", "type": "blob", "sha": "c1", "size": 2048},
+        {"path": "Tutorials/FourMinuteTutorial/Resources", "mode": "040000", "type": "tree", "sha": "b3"},
+        {"path": "Tutorials/FourMinuteTutorial/Resources/logo.png", "mode": "100644", "type": "blob", "sha": "c2", "size": 4096},
+        {"path": "Tutorials/Welcome Tutorial", "mode": "040000", "type": "tree", "sha": "b4"},
+        {"path": "Tutorials/Welcome Tutorial/WelcomeTutorial.py", "mode": "100644", "type": "blob", "sha": "c3", "size": 1024},
+    ],
+    "truncated": False,
+}
+
+# Recorded from GET /repos/SlicerLatinAmerica/SlicerTestTutorial/contents/<path>
+RECORDED_CONTENTS = {
+    "Tutorials": [
+        {"name": "FourMinuteTutorial", "path": "Tutorials/FourMinuteTutorial", "type": "dir", "download_url": None},
+        {"name": "Welcome Tutorial", "path": "Tutorials/Welcome Tutorial", "type": "dir", "download_url": None},
+    ],
+    "Tutorials/FourMinuteTutorial": [
+        {"name": "FourMinuteTutorial.py", "path": "Tutorials/FourMinuteTutorial/FourMinuteTutorial.py", "type": "file",
+         "download_url": f"https://raw.githubusercontent.com/{REPO}/main/Tutorials/FourMinuteTutorial/FourMinuteTutorial.py"},
+    ],
+    "Tutorials/Welcome Tutorial": [
+        {"name": "WelcomeTutorial.py", "path": "Tutorials/Welcome Tutorial/WelcomeTutorial.py", "type": "file",
+         "download_url": f"https://raw.githubusercontent.com/{REPO}/main/Tutorials/Welcome%20Tutorial/WelcomeTutorial.py"},
+    ],
+}
+
+
+def createArchive(files, commit="5b0c5d4"):
+    """Zip laid out like a GitHub branch archive, everything inside a "<repository>-<commit>" folder"""
+    data = io.BytesIO()
+    with zipfile.ZipFile(data, "w", zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr(f"SlicerTestTutorial-{commit}/", b"")
+        for path, content in files.items():
+            archive.writestr(f"SlicerTestTutorial-{commit}/{path}", content)
+    return data.getvalue()
+
+
+class GitToolsTest(unittest.TestCase):
+    def setUp(self):
+        self.server = StandInServer()
+        self.defaultURLs = (GitTools.GITHUB_API_URL, GitTools.GITHUB_RAW_URL, GitTools.GITHUB_ARCHIVE_URL)
+        GitTools.GITHUB_API_URL = self.server.url
+        GitTools.GITHUB_RAW_URL = self.server.url + "/raw"
+        GitTools.GITHUB_ARCHIVE_URL = self.server.url + "/github"
+        self.cacheDir = tempfile.TemporaryDirectory()
+        self.defaultCacheDir = GitTools.CACHE_DIR
+        GitTools.CACHE_DIR = self.cacheDir.name
+
+    def tearDown(self):
+        GitTools.GITHUB_API_URL, GitTools.GITHUB_RAW_URL, GitTools.GITHUB_ARCHIVE_URL = self.defaultURLs
+        GitTools.CACHE_DIR = self.defaultCacheDir
+        self.cacheDir.cleanup()
+        self.server.close()
+
+    def test_SingleTreesRequest(self):
+        self.server.addJSON(f"/repos/{REPO}/git/trees/HEAD?recursive=1", RECORDED_TREE)
+        self.server.addText(f"/raw/{REPO}/HEAD/Tutorials/Welcome%20Tutorial/WelcomeTutorial.py", "# welcome\n")
+
+        tutorials = GitTools.GitTools.ParseRepo(REPO, "Tutorials")
+        self.assertEqual(len(self.server.requests), 1)
+        self.assertEqual(sorted(tutorials.dir()), ["FourMinuteTutorial", "Welcome Tutorial"])
+        self.assertEqual(sorted(tutorials.dir("FourMinuteTutorial")), ["FourMinuteTutorial.py", "Resources"])
+        self.assertEqual(tutorials.dir("FourMinuteTutorial/Resources"), ["logo.png"])
+        self.assertEqual(tutorials.files["Welcome Tutorial"].path, "Tutorials/Welcome Tutorial")
+        self.assertNotIn("README.md", tutorials.files)
+
+        self.assertEqual(tutorials.getRaw("Welcome Tutorial/WelcomeTutorial.py"), "# welcome\n")
+        with self.assertRaises(OSError):
+            tutorials.getRaw("FourMinuteTutorial/Resources")
+
+        root = GitTools.GitTools.ParseRepo(REPO)
+        self.assertEqual(sorted(root.dir()), ["README.md", "Tutorials"])
+
+    def test_TruncatedTreeFallsBackToContents(self):
+        self.server.addJSON(f"/repos/{REPO}/git/trees/HEAD?recursive=1", {**RECORDED_TREE, "truncated": True})
+        for path, contents in RECORDED_CONTENTS.items():
+            self.server.addJSON(f"/repos/{REPO}/contents/{path.replace(' ', '%20')}", contents)
+
+        tutorials = GitTools.GitTools.ParseRepo(REPO, "Tutorials")
+        self.assertEqual(sorted(tutorials.dir()), ["FourMinuteTutorial", "Welcome Tutorial"])
+        self.assertEqual(tutorials.dir("Welcome Tutorial"), ["WelcomeTutorial.py"])
+
+    def test_ErrorMessage(self):
+        self.server.addJSON(f"/repos/{REPO}/git/trees/HEAD?recursive=1",
+                            {"message": "API rate limit exceeded"}, status=403)
+        with self.assertRaisesRegex(Exception, "rate limit"):
+            GitTools.GitTools.ParseRepo(REPO, "Tutorials")
+
+    def test_PooledDownloads(self):
+        # Every raw file takes a while to answer, like a real round trip
+        def slowFile(handler):
+            time.sleep(0.03)
+            return 200, {"Content-Type": "text/plain"}, f"# {handler.path}\n"
+
+        fileCount = 60
+        for index in range(fileCount):
+            self.server.routes[f"/raw/{REPO}/HEAD/Tutorials/T{index}/T{index}.py"] = slowFile
+
+        with tempfile.TemporaryDirectory() as tempDir:
+            downloads = [(f"{self.server.url}/raw/{REPO}/HEAD/Tutorials/T{index}/T{index}.py", os.path.join(tempDir, f"T{index}.py"))
+                         for index in range(fileCount)]
+            downloads.append((f"{self.server.url}/raw/{REPO}/HEAD/Tutorials/Missing.py", os.path.join(tempDir, "Missing.py")))
+
+            startTime = time.perf_counter()
+            sequentialErrors = GitTools.GitTools.DownloadFiles(downloads, maxWorkers=1)
+            sequentialTime = time.perf_counter() - startTime
+            sequentialFiles = {name: open(os.path.join(tempDir, name), encoding="utf-8").read() for name in os.listdir(tempDir)}
+
+            startTime = time.perf_counter()
+            pooledErrors = GitTools.GitTools.DownloadFiles(downloads)
+            pooledTime = time.perf_counter() - startTime
+            pooledFiles = {name: open(os.path.join(tempDir, name), encoding="utf-8").read() for name in os.listdir(tempDir)}
+
+        print(f"{fileCount} files: sequential {sequentialTime:.2f}s, pooled {pooledTime:.2f}s ({sequentialTime/pooledTime:.1f}x)")
+        self.assertEqual(pooledFiles, sequentialFiles)
+        self.assertEqual(len(pooledFiles), fileCount)
+        # The missing file is reported once among the results instead of stopping the others
+        self.assertEqual([url for url, error in pooledErrors], [downloads[-1][0]])
+        self.assertEqual(len(sequentialErrors), 1)
+        self.assertLess(pooledTime, sequentialTime / 2)
+
+    def test_CachedCatalog(self):
+        etag = '"c1"'
+
+        # Answers like GitHub, a matching If-None-Match gets a 304 without a body
+        def tutorialFile(handler):
+            if handler.headers.get("If-None-Match") == etag:
+                return 304, {"ETag": etag}, b""
+            return 200, {"Content-Type": "text/plain", "ETag": etag}, "# four minutes\n"
+
+        self.server.addJSON(f"/repos/{REPO}/git/trees/HEAD?recursive=1", RECORDED_TREE)
+        fileURL = f"/raw/{REPO}/HEAD/Tutorials/FourMinuteTutorial/FourMinuteTutorial.py"
+        self.server.routes[fileURL] = tutorialFile
+
+        with tempfile.TemporaryDirectory() as tempDir:
+            destination = os.path.join(tempDir, "FourMinuteTutorial.py")
+            downloads = [(self.server.url + fileURL, destination)]
+
+            tutorials = GitTools.GitTools.ParseRepo(REPO, "Tutorials")
+            self.assertEqual(GitTools.GitTools.DownloadFiles(downloads), [])
+            self.assertEqual(len(self.server.requests), 2)
+            os.utime(destination, ns=(0, 0))
+
+            # Revalidating sends the ETag back, the 304 leaves the file untouched
+            self.assertEqual(GitTools.GitTools.DownloadFiles(downloads), [])
+            self.assertEqual(len(self.server.requests), 3)
+            self.assertEqual(self.server.requests[-1][2].get("If-None-Match"), etag)
+            self.assertEqual(os.stat(destination).st_mtime_ns, 0)
+            with open(destination, encoding="utf-8") as fd:
+                self.assertEqual(fd.read(), "# four minutes\n")
+
+            # A fresh enough cache does not touch the network at all
+            cached = GitTools.GitTools.ParseRepo(REPO, "Tutorials", maxAge=60)
+            self.assertEqual(GitTools.GitTools.DownloadFiles(downloads, maxAge=60), [])
+            self.assertEqual(len(self.server.requests), 3)
+            self.assertEqual(sorted(cached.dir()), sorted(tutorials.dir()))
+
+            # Files deleted locally are written again from the cache
+            os.remove(destination)
+            self.assertEqual(GitTools.GitTools.DownloadFiles(downloads, maxAge=60), [])
+            self.assertTrue(os.path.exists(destination))
+
+    def test_DownloadProgressAndCancel(self):
+        for index in range(4):
+            self.server.addText(f"/raw/{REPO}/HEAD/T{index}.py", "#" * 100)
+
+        with tempfile.TemporaryDirectory() as tempDir:
+            downloads = [(f"{self.server.url}/raw/{REPO}/HEAD/T{index}.py", os.path.join(tempDir, f"T{index}.py")) for index in range(4)]
+            reported = []
+            lock = threading.Lock()
+
+            def progress(url, destination, transferredBytes):
+                with lock:
+                    reported.append((destination, transferredBytes))
+
+            self.assertEqual(GitTools.GitTools.DownloadFiles(downloads, progress=progress), [])
+            self.assertEqual(sorted(reported), sorted((destination, 100) for url, destination in downloads))
+
+            # Cancelled before starting, nothing is requested or reported
+            reported.clear()
+            requestCount = len(self.server.requests)
+            cancelled = threading.Event()
+            cancelled.set()
+            self.assertEqual(GitTools.GitTools.DownloadFiles(downloads, progress=progress, cancelled=cancelled), [])
+            self.assertEqual(reported, [])
+            self.assertEqual(len(self.server.requests), requestCount)
+
+    def test_ArchiveSync(self):
+        archives = {'"v1"': createArchive({
+            "README.md": "readme",
+            "Tutorials/FourMinuteTutorial/FourMinuteTutorial.py": "# four minutes\n",
+            "Tutorials/FourMinuteTutorial/Resources/logo.png": b"\x89PNG logo",
+            "Tutorials/Welcome Tutorial/WelcomeTutorial.py": "# welcome\n",
+            "Tutorials/Notes.py": "# not inside a tutorial folder\n",
+        })}
+        currentETag = ['"v1"']
+
+        def archive(handler):
+            etag = currentETag[0]
+            if handler.headers.get("If-None-Match") == etag:
+                return 304, {"ETag": etag}, b""
+            return 200, {"Content-Type": "application/zip", "ETag": etag}, archives[etag]
+
+        self.server.routes[f"/github/{REPO}/archive/HEAD.zip"] = archive
+
+        with tempfile.TemporaryDirectory() as tempDir:
+            sync = GitTools.GitTools.SyncRepoArchive(REPO, tempDir)
+            self.assertTrue(sync.changed)
+            self.assertEqual(sync.transferredBytes, len(archives['"v1"']))
+            self.assertEqual(sorted(os.path.relpath(path, tempDir) for path in sync.files), ["FourMinuteTutorial.py", "WelcomeTutorial.py"])
+            self.assertEqual([os.path.relpath(path, tempDir) for path in sync.assets], [os.path.join("FourMinuteTutorial", "Resources", "logo.png")])
+            self.assertEqual(sorted(os.listdir(tempDir)), ["FourMinuteTutorial", "FourMinuteTutorial.py", "WelcomeTutorial.py"])
+            with open(os.path.join(tempDir, "FourMinuteTutorial", "Resources", "logo.png"), "rb") as fd:
+                self.assertEqual(fd.read(), b"\x89PNG logo")
+
+            # Unchanged repository, the recorded ETag gets a 304 and nothing is written
+            os.utime(os.path.join(tempDir, "WelcomeTutorial.py"), ns=(0, 0))
+            sync = GitTools.GitTools.SyncRepoArchive(REPO, tempDir)
+            self.assertFalse(sync.changed)
+            self.assertEqual(sync.transferredBytes, 0)
+            self.assertEqual(self.server.requests[-1][2].get("If-None-Match"), '"v1"')
+            self.assertEqual(len(sync.files), 2)
+            self.assertEqual(os.stat(os.path.join(tempDir, "WelcomeTutorial.py")).st_mtime_ns, 0)
+
+            # Within maxAge the archive is not requested
+            requestCount = len(self.server.requests)
+            self.assertFalse(GitTools.GitTools.SyncRepoArchive(REPO, tempDir, maxAge=60).changed)
+            self.assertEqual(len(self.server.requests), requestCount)
+
+            # A new commit only rewrites the files that changed
+            archives['"v2"'] = createArchive({
+                "Tutorials/FourMinuteTutorial/FourMinuteTutorial.py": "# four minutes, updated\n",
+                "Tutorials/FourMinuteTutorial/Resources/logo.png": b"\x89PNG logo",
+                "Tutorials/Welcome Tutorial/WelcomeTutorial.py": "# welcome\n",
+            }, commit="9a8b7c6")
+            currentETag[0] = '"v2"'
+            sync = GitTools.GitTools.SyncRepoArchive(REPO, tempDir)
+            self.assertTrue(sync.changed)
+            with open(os.path.join(tempDir, "FourMinuteTutorial.py"), encoding="utf-8") as fd:
+                self.assertEqual(fd.read(), "# four minutes, updated\n")
+            self.assertEqual(os.stat(os.path.join(tempDir, "WelcomeTutorial.py")).st_mtime_ns, 0)
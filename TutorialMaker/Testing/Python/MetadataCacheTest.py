@@ -0,0 +1,60 @@
+import json
+import os
+import tempfile
+import unittest
+
+from Lib.TutorialUtils import MetadataCache, TutorialScreenshot, metadataCache
+
+
+class MetadataCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.tempDir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tempDir.cleanup()
+
+    def writeMetadata(self, name, widgetCount, devicePixelRatio=1.0):
+        path = os.path.join(self.tempDir.name, name)
+        data = {"_devicePixelRatio": devicePixelRatio}
+        for index in range(widgetCount):
+            data[index] = {"name": f"w{index}", "path": f"w{index}", "text": "",
+                           "position": [index, index], "size": [10, 10]}
+        with open(path, "w", encoding="utf-8") as file:
+            json.dump(data, file)
+        return path
+
+    def test_HitsAndRevalidation(self):
+        cache = MetadataCache()
+        path = self.writeMetadata("0.json", 3)
+        first = cache.load(path)
+        self.assertIs(cache.load(path), first)
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+
+        # Same path rewritten with a different size is parsed again
+        self.writeMetadata("0.json", 4)
+        self.assertEqual(len(cache.load(path)), 5)
+        self.assertEqual((cache.hits, cache.misses), (1, 2))
+        self.assertEqual(len(cache.entries), 1)
+
+    def test_EvictsLeastRecentlyUsed(self):
+        paths = [self.writeMetadata(f"{index}.json", 20) for index in range(3)]
+        cache = MetadataCache(maxBytes=os.path.getsize(paths[0])*2)
+        cache.load(paths[0])
+        cache.load(paths[1])
+        cache.load(paths[0])
+        cache.load(paths[2])
+        self.assertEqual(list(cache.entries), [paths[0], paths[2]])
+        self.assertLessEqual(cache.totalBytes, cache.maxBytes)
+
+    def test_ScreenshotParsesMetadataOnce(self):
+        path = self.writeMetadata("1.json", 5, devicePixelRatio=2.0)
+        screenshot = TutorialScreenshot(metadata=path)
+        misses = metadataCache.misses
+        widgets = screenshot.getWidgets()
+        self.assertEqual(screenshot.getDevicePixelRatio(), 2.0)
+        screenshot.getWidgets()
+        self.assertEqual(metadataCache.misses, misses + 1)
+        self.assertEqual(widgets[2]["position"], [1.0, 1.0])
+
+        # Scaling the copies must not leak into the cached data
+        self.assertEqual(metadataCache.load(path)["2"]["position"], [2, 2])
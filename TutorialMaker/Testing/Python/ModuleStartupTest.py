@@ -0,0 +1,118 @@
+import importlib
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import unittest
+
+import slicer
+
+MODULE_PATH = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Run by a fresh Slicer: times importing the module and setting up its widget, optionally after
+# importing what TutorialMaker.py used to import at load time
+STARTUP = '''
+import json, os, sys, time
+import slicer
+sys.path.insert(0, {modulePath!r})
+startTime = time.perf_counter()
+for name in {preload!r}:
+    __import__(name)
+import TutorialMaker
+TutorialMaker.TutorialMakerLogic.isCatalogFresh = lambda self, maxAge: True
+widget = TutorialMaker.TutorialMakerWidget()
+widget.resourcePath = lambda name: os.path.join({modulePath!r}, "Resources", name)
+widget.setup()
+print("STARTUP " + json.dumps(time.perf_counter() - startTime))
+slicer.util.exit(0)
+'''
+
+
+class ModuleStartupTest(unittest.TestCase):
+    """Checks that loading the module does not import the editing, annotation and network code"""
+
+    # Imported by TutorialMaker.py at load time before they were deferred to first use
+    DEFERRED_MODULES = ["Lib.TutorialUtils", "Lib.TutorialPainter", "Lib.TutorialEditor", "Lib.TutorialGUI",
+                        "Lib.Annotations", "Lib.CreateTutorial", "Lib.GitTools", "Lib.TutorialFetcher", "requests"]
+
+    # What TutorialMaker.py imported at load time before it deferred them
+    EAGER_MODULES = ["requests", "Lib.GitTools", "Lib.Annotations", "Lib.TutorialGUI", "Lib.TutorialPainter", "Lib.CreateTutorial"]
+    # Share of the eager startup time the deferred imports have to save at least
+    MIN_SAVING = 0.2
+
+    def setUp(self):
+        self.loadedModules = dict(sys.modules)
+
+    def tearDown(self):
+        for name in list(sys.modules):
+            if name not in self.loadedModules:
+                del sys.modules[name]
+        sys.modules.update(self.loadedModules)
+
+    def forgetModules(self):
+        for name in list(sys.modules):
+            if name in ("TutorialMaker", "Lib", "requests") or name.startswith(("Lib.", "requests.")):
+                del sys.modules[name]
+
+    def test_DeferredImports(self):
+        self.forgetModules()
+        importlib.import_module("TutorialMaker")
+        for name in self.DEFERRED_MODULES:
+            self.assertNotIn(name, sys.modules)
+
+    def startupTime(self, preload, runs=3):
+        """Fastest of runs fresh Slicer processes importing the module and setting up its widget"""
+        times = []
+        for _run in range(runs):
+            script = STARTUP.format(modulePath=MODULE_PATH, preload=preload)
+            # The scripted modules are not loaded, TutorialMaker among them, the script imports it itself
+            result = subprocess.run([slicer.app.launcherExecutableFilePath, "--no-splash", "--no-main-window", "--ignore-slicerrc",
+                                     "--disable-scripted-loadable-modules", "--python-code", script],
+                                    capture_output=True, text=True, timeout=300)
+            lines = [line for line in result.stdout.splitlines() if line.startswith("STARTUP ")]
+            self.assertTrue(lines, f"Startup script failed: {result.stdout}{result.stderr}")
+            times.append(json.loads(lines[-1][len("STARTUP "):]))
+        return min(times)
+
+    def test_StartupTime(self):
+        deferredTime = self.startupTime([])
+        eagerTime = self.startupTime(self.EAGER_MODULES)
+        print(f"Import and widget setup: {deferredTime*1000:.0f}ms, with the eager imports {eagerTime*1000:.0f}ms")
+        self.assertLess(deferredTime, eagerTime * (1 - self.MIN_SAVING))
+
+    def test_FreshCatalogSkipsTheNetwork(self):
+        TutorialMaker = importlib.import_module("TutorialMaker")
+        logic = TutorialMaker.TutorialMakerLogic()
+        with tempfile.TemporaryDirectory() as tempDir:
+            modulePath = TutorialMaker.modulePath
+            TutorialMaker.modulePath = lambda *parts: os.path.join(tempDir, *parts)
+            try:
+                self.assertFalse(logic.isCatalogFresh(60))
+                os.makedirs(os.path.join(tempDir, "Outputs"))
+                os.makedirs(os.path.join(tempDir, "Testing"))
+                with open(os.path.join(tempDir, "Testing", "FourMinuteTutorial.py"), "w") as fd:
+                    fd.write("# four minutes\n")
+                with open(os.path.join(tempDir, "Outputs", "TutorialCatalog.json"), "w") as fd:
+                    json.dump({"fetched": time.time(), "repos": logic.TutorialRepos, "tutorials": ["FourMinuteTutorial"]}, fd)
+
+                self.assertTrue(logic.isCatalogFresh(60))
+                self.assertEqual(logic.loadTutorials(), ["FourMinuteTutorial"])
+                # The list comes from the catalog, tutorials created since then come after it
+                with open(os.path.join(tempDir, "Testing", "WelcomeTutorial.py"), "w") as fd:
+                    fd.write("# welcome\n")
+                with open(os.path.join(tempDir, "Testing", "LocalTutorial.py"), "w") as fd:
+                    fd.write("# not fetched\n")
+                with open(os.path.join(tempDir, "Outputs", "TutorialCatalog.json"), "w") as fd:
+                    json.dump({"fetched": time.time(), "repos": logic.TutorialRepos, "tutorials": ["WelcomeTutorial", "FourMinuteTutorial", "Removed"]}, fd)
+                self.assertEqual(logic.loadTutorials(), ["WelcomeTutorial", "FourMinuteTutorial", "LocalTutorial"])
+                # Old catalogs, other repositories and missing files all need a fetch
+                self.assertFalse(logic.isCatalogFresh(0))
+                logic.TutorialRepos = logic.TutorialRepos + ["SlicerLatinAmerica/Other"]
+                self.assertFalse(logic.isCatalogFresh(60))
+                logic.TutorialRepos = logic.TutorialRepos[:1]
+                os.remove(os.path.join(tempDir, "Testing", "FourMinuteTutorial.py"))
+                self.assertFalse(logic.isCatalogFresh(60))
+            finally:
+                TutorialMaker.modulePath = modulePath
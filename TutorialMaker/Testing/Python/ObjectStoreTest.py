@@ -0,0 +1,102 @@
+import collections
+import json
+import os
+import tempfile
+import unittest
+
+from Lib.ObjectStore import OUTPUTS_DIR, ObjectStore, findTutorialFiles, referencedObjects
+from Lib.TutorialUtils import JSONHandler, TutorialScreenshot
+
+
+class ObjectStoreTest(unittest.TestCase):
+    def setUp(self):
+        self.tempDir = tempfile.TemporaryDirectory()
+        self.store = ObjectStore(os.path.join(self.tempDir.name, "Outputs", "objects"))
+
+    def tearDown(self):
+        self.tempDir.cleanup()
+
+    def saveRun(self, name, stepWindows):
+        """Tutorial.json of a run whose steps use the given window contents"""
+        handler = JSONHandler(os.path.join(self.tempDir.name, "Outputs", "runs", name, "Raw"))
+        steps = []
+        for windows in stepWindows:
+            step = []
+            for content in windows:
+                screenshot = TutorialScreenshot()
+                screenshot.windowHash = self.store.put(content.encode("utf-8"), ".png")
+                screenshot.metadataHash = self.store.put(b"{}", ".json")
+                screenshot.screenshot = self.store.path(screenshot.windowHash)
+                screenshot.metadata = self.store.path(screenshot.metadataHash)
+                step.append(screenshot)
+            steps.append(step)
+        handler.saveTutorial({"title": name, "author": "", "date": "", "desc": ""}, steps)
+        return handler
+
+    def test_IdenticalFramesAreStoredOnce(self):
+        handler = self.saveRun("FourMinuteTutorial", [["main window"], ["main window", "dialog"], ["main window"]])
+        self.saveRun("FourMinuteTutorial-fr", [["main window"], ["fenêtre"]])
+        # Three different images and one metadata file for six windows
+        self.assertEqual(self.store.added, 4)
+        self.assertEqual(self.store.reused, 8)
+        self.assertEqual(len(list(self.store.objects())), 4)
+
+        # Tutorial.json names the objects and still leads to the files
+        imagePath, metadataPath = handler.screenshotFiles(1, 1)
+        self.assertEqual(imagePath, self.store.path(self.store.put(b"dialog", ".png")))
+        self.assertEqual(metadataPath, self.store.path(self.store.put(b"{}", ".json")))
+        self.assertEqual(len(handler.stepMetadataFiles(1)), 2)
+        parsed = JSONHandler(handler.path).parseTutorial(inline=True)
+        self.assertTrue(all(os.path.exists(step.screenshot) for step in parsed.steps))
+
+        references = referencedObjects(findTutorialFiles([os.path.join(self.tempDir.name, "Outputs")]))
+        stats = self.store.referenceStats(references)
+        self.assertEqual(stats["references"], 12)
+        self.assertGreater(stats["dedupRatio"], 2)
+
+    def test_GarbageCollection(self):
+        self.saveRun("FourMinuteTutorial", [["main window"], ["dialog"]])
+        orphan = self.store.put(b"left by a removed run", ".png")
+        references = referencedObjects(findTutorialFiles([os.path.join(self.tempDir.name, "Outputs")]))
+
+        # Too recent, a capture may still be writing its Tutorial.json
+        self.assertEqual(self.store.gc(references, minimumAge=3600), (0, 0))
+        self.assertEqual(self.store.gc(references), (1, len(b"left by a removed run")))
+        self.assertFalse(os.path.exists(self.store.path(orphan)))
+        self.assertEqual(len(list(self.store.objects())), 3)
+        self.assertEqual(self.store.gc(collections.Counter()), (3, sum(len(data) for data in [b"main window", b"dialog", b"{}"])))
+
+    def test_ReusedObjectsAreKept(self):
+        name = self.store.put(b"captured last week", ".png")
+        lastWeek = os.path.getmtime(self.store.path(name)) - 7*24*3600
+        os.utime(self.store.path(name), (lastWeek, lastWeek))
+        # A running capture uses it again, its Tutorial.json is not written yet
+        self.assertEqual(self.store.put(b"captured last week", ".png"), name)
+        self.assertEqual(self.store.gc(collections.Counter(), minimumAge=3600), (0, 0))
+
+    def test_CapturesOutsideOutputs(self):
+        elsewhere = os.path.join(self.tempDir.name, "Batch", "FourMinuteTutorial")
+        self.store.registerRoot(elsewhere)
+        self.store.registerRoot(elsewhere)
+        self.store.registerRoot(os.path.join(OUTPUTS_DIR, "runs", "FourMinuteTutorial", "1"))
+        self.assertEqual(self.store.registeredRoots(), [elsewhere])
+
+        handler = JSONHandler(os.path.join(elsewhere, "Raw"))
+        screenshot = TutorialScreenshot()
+        screenshot.windowHash = self.store.put(b"main window", ".png")
+        screenshot.metadataHash = self.store.put(b"{}", ".json")
+        screenshot.screenshot = self.store.path(screenshot.windowHash)
+        screenshot.metadata = self.store.path(screenshot.metadataHash)
+        handler.saveTutorial({"title": "", "author": "", "date": "", "desc": ""}, [[screenshot]])
+        references = referencedObjects(findTutorialFiles([os.path.join(self.tempDir.name, "Batch"), *self.store.registeredRoots()]))
+        self.assertEqual(references[screenshot.windowHash], 1)
+        self.assertEqual(self.store.gc(references), (0, 0))
+
+    def test_LegacyLayout(self):
+        rawPath = os.path.join(self.tempDir.name, "Outputs", "Raw")
+        os.makedirs(os.path.join(rawPath, "0"))
+        with open(os.path.join(rawPath, "Tutorial.json"), "w") as fd:
+            json.dump({"title": "Old", "steps": [[{"window": "0/0.png", "metadata": "0/0.json"}]]}, fd)
+        handler = JSONHandler(rawPath)
+        self.assertEqual(handler.screenshotFiles(0, 0), (os.path.join(rawPath, "0", "0.png"), os.path.join(rawPath, "0", "0.json")))
+        self.assertEqual(referencedObjects([os.path.join(rawPath, "Tutorial.json")]), collections.Counter())
@@ -0,0 +1,78 @@
+import json
+import os
+import sys
+import tempfile
+import time
+import unittest
+
+from Lib.ParallelCapture import ParallelCapture
+
+# Stands in for Slicer running Lib/BatchCapture.py: takes the same arguments and writes a summary
+WORKER = '''
+import json, os, sys, time
+arguments = sys.argv[sys.argv.index("--python-script") + 2:]
+options = {}
+tutorials = []
+while arguments:
+    argument = arguments.pop(0)
+    if argument.startswith("--"):
+        options[argument] = arguments.pop(0)
+    else:
+        tutorials.append(argument)
+time.sleep(float(os.environ.get("WORKER_SECONDS", "0")))
+if options["--language"] == "crash":
+    sys.exit(3)
+results = [{"tutorial": tutorial, "output": os.path.join(options["--output"], tutorial), "duration": 0.1,
+            "steps": 4, "imageBytes": 1000, "error": "broken" if tutorial == "Broken" else None} for tutorial in tutorials]
+os.makedirs(os.path.dirname(options["--summary"]), exist_ok=True)
+with open(options["--summary"], "w") as fd:
+    json.dump({"tutorials": results, "offscreen": os.environ.get("QT_QPA_PLATFORM"), "scale": os.environ.get("QT_SCALE_FACTOR"),
+               "windowSize": options.get("--window-size"), "devicePixelRatio": options.get("--device-pixel-ratio")}, fd)
+'''
+
+
+class ParallelCaptureTest(unittest.TestCase):
+    def setUp(self):
+        self.tempDir = tempfile.TemporaryDirectory()
+        self.worker = os.path.join(self.tempDir.name, "worker.py")
+        with open(self.worker, "w") as fd:
+            fd.write(WORKER)
+        self.outputRoot = os.path.join(self.tempDir.name, "Output")
+
+    def tearDown(self):
+        os.environ.pop("WORKER_SECONDS", None)
+        self.tempDir.cleanup()
+
+    def test_ManifestPerLanguage(self):
+        capture = ParallelCapture([sys.executable, self.worker], ["FourMinuteTutorial", "Broken"], self.outputRoot,
+                                  ["en", "fr", "crash"], workers=3, perTutorial=True, windowSize=(1280, 720), devicePixelRatio=2)
+        manifest = capture.run()
+
+        self.assertEqual(len(capture.jobs), 6)
+        with open(manifest["languages"]["fr"]) as fd:
+            french = json.load(fd)
+        self.assertEqual([result["tutorial"] for result in french["tutorials"]], ["FourMinuteTutorial", "Broken"])
+        self.assertEqual(french["tutorials"][0]["output"], os.path.join(self.outputRoot, "fr", "FourMinuteTutorial"))
+        self.assertEqual((french["failures"], french["imageBytes"]), (1, 2000))
+        # A worker that died still accounts for its tutorials
+        with open(manifest["languages"]["crash"]) as fd:
+            crashed = json.load(fd)
+        self.assertEqual(crashed["failures"], 2)
+        self.assertIn("code 3", crashed["tutorials"][0]["error"])
+        self.assertEqual(manifest["failures"], 1 + 1 + 2)
+        # Every worker gets the same headless geometry
+        with open(os.path.join(self.outputRoot, "jobs", "en-Broken.json")) as fd:
+            worker = json.load(fd)
+        self.assertEqual((worker["offscreen"], worker["scale"]), ("offscreen", "2"))
+        self.assertEqual((worker["windowSize"], worker["devicePixelRatio"]), ("1280x720", "2"))
+
+    def test_WorkersRunAtTheSameTime(self):
+        os.environ["WORKER_SECONDS"] = "1"
+        capture = ParallelCapture([sys.executable, self.worker], ["FourMinuteTutorial"], self.outputRoot,
+                                  ["en", "fr", "es", "pt_BR"], workers=4)
+        startTime = time.perf_counter()
+        manifest = capture.run()
+        duration = time.perf_counter() - startTime
+        print(f"4 workers of 1s in {duration:.2f}s")
+        self.assertEqual(manifest["failures"], 0)
+        self.assertLess(duration, 3)
@@ -0,0 +1,47 @@
+import gc
+import unittest
+
+import qt
+
+from Lib.Annotations import Annotation, AnnotationType
+from Lib.ResourceCache import ResourceCache, resourceCache
+
+
+class ResourceCacheTest(unittest.TestCase):
+    def test_ReferenceCounting(self):
+        class Owner:
+            pass
+
+        cache = ResourceCache()
+        created = []
+        def create():
+            created.append(qt.QFont("Arial", 12))
+            return created[-1]
+
+        first, second = Owner(), Owner()
+        self.assertIs(cache.acquire("font", create, owner=first), cache.acquire("font", create, owner=second))
+        self.assertEqual((len(created), cache.refCount("font")), (1, 2))
+
+        del first
+        gc.collect()
+        self.assertEqual(cache.refCount("font"), 1)
+        del second
+        gc.collect()
+        self.assertNotIn("font", cache.entries)
+
+    def test_AnnotationsShareResources(self):
+        widget = {"name": "w", "path": "w", "text": "", "position": [10, 10], "size": [50, 20]}
+        loads = resourceCache.loads
+        annotations = []
+        for index in range(200):
+            annotation = Annotation(TargetWidget=widget, Type=AnnotationType.TextBox, Text=f"text {index}")
+            annotation.penConfig(qt.QColor("red"), 14, 2)
+            annotation.getFont()
+            annotations.append(annotation)
+        # Click icon, font and metrics are created once at most for all the annotations
+        self.assertLessEqual(resourceCache.loads - loads, 3)
+
+        annotations[0].fontSize = 20
+        font, metrics = annotations[0].getFont()
+        self.assertEqual(font.pointSize(), 20)
+        self.assertIs(annotations[1].getFont()[0], annotations[2].getFont()[0])
@@ -0,0 +1,40 @@
+import os
+import tempfile
+import unittest
+
+from Lib.RunContext import RunContext
+
+
+class RunContextTest(unittest.TestCase):
+    def setUp(self):
+        self.tempDir = tempfile.TemporaryDirectory()
+        self.runsRoot = os.path.join(self.tempDir.name, "Outputs", "runs")
+
+    def tearDown(self):
+        self.tempDir.cleanup()
+
+    def test_ConcurrentRunsAreIsolated(self):
+        first = RunContext.create("FourMinuteTutorial", self.runsRoot)
+        # Same tutorial, same second, same process
+        second = RunContext.create("FourMinuteTutorial", self.runsRoot)
+        self.assertNotEqual(first.root, second.root)
+        for context in [first, second]:
+            self.assertEqual(os.path.dirname(context.root), os.path.join(self.runsRoot, "FourMinuteTutorial"))
+            self.assertTrue(os.path.isdir(context.rawPath))
+            self.assertTrue(os.path.isdir(context.annotationsPath))
+            self.assertTrue(os.path.isdir(context.translationPath))
+
+    def test_LatestPointer(self):
+        # Nothing captured into a run yet, the Outputs layout
+        self.assertEqual(RunContext.latest(runsRoot=self.runsRoot).rawPath, os.path.join(self.tempDir.name, "Outputs", "Raw"))
+
+        fourMinutes = RunContext.create("FourMinuteTutorial", self.runsRoot)
+        fourMinutes.markLatest(self.runsRoot)
+        welcome = RunContext.create("WelcomeTutorial", self.runsRoot)
+        welcome.markLatest(self.runsRoot)
+        self.assertEqual(RunContext.latest(runsRoot=self.runsRoot).root, welcome.root)
+        self.assertEqual(RunContext.latest("FourMinuteTutorial", self.runsRoot).root, fourMinutes.root)
+
+        # The files of a run lead back to it
+        self.assertEqual(RunContext.fromRaw(os.path.join(welcome.rawPath, "Tutorial.json")).root, welcome.root)
+        self.assertEqual(RunContext.fromAnnotations(os.path.join(welcome.annotationsPath, "annotations.json")).annotationsPath, welcome.annotationsPath)
@@ -0,0 +1,149 @@
+import os
+import tempfile
+import time
+import unittest
+
+import qt
+
+from Lib.ObjectStore import DELTA_SUFFIX, ObjectStore
+from Lib.ScreenshotWriter import ScreenshotWriter, arrayToQImage, qImageToArray
+from Lib.TileDelta import FrameCache, FrameSequence
+from Lib.TutorialUtils import TutorialScreenshot, screenshotCache
+
+
+class ScreenshotWriterTest(unittest.TestCase):
+    """Checks that the background PNG writer produces the same pixels as QImage.save"""
+
+    def setUp(self):
+        self.tempDir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tempDir.cleanup()
+
+    def createImage(self, width, height, imageFormat):
+        image = qt.QImage(width, height, imageFormat)
+        image.fill(qt.QColor(30, 60, 90, 200))
+        painter = qt.QPainter(image)
+        painter.setPen(qt.QColor(250, 10, 10))
+        for index in range(0, width, 7):
+            painter.drawLine(index, 0, width - index, height - 1)
+        painter.end()
+        return image
+
+    def assertSamePixels(self, image, filename):
+        loaded = qt.QImage(filename)
+        self.assertFalse(loaded.isNull())
+        self.assertEqual((loaded.width(), loaded.height()), (image.width(), image.height()))
+        self.assertTrue((qImageToArray(loaded) == qImageToArray(image)).all())
+
+    def test_RoundTrip(self):
+        writer = ScreenshotWriter()
+        images = {}
+        for index, imageFormat in enumerate([qt.QImage.Format_RGB32, qt.QImage.Format_ARGB32]):
+            filename = os.path.join(self.tempDir.name, f"{index}.png")
+            images[filename] = self.createImage(321, 123, imageFormat)
+            writer.submit(images[filename], filename)
+        writer.flush()
+        for filename, image in images.items():
+            self.assertSamePixels(image, filename)
+
+    def test_FlushWaitsForEveryImage(self):
+        # More images than pending slots, so submit() has to block on the full queue
+        writer = ScreenshotWriter(maxWorkers=2, maxPending=2)
+        image = self.createImage(1920, 1080, qt.QImage.Format_RGB32)
+        filenames = [os.path.join(self.tempDir.name, f"{index}.png") for index in range(8)]
+        for filename in filenames:
+            writer.submit(image, filename)
+        writer.flush()
+        self.assertEqual(writer.pending, [])
+        for filename in filenames:
+            self.assertTrue(os.path.exists(filename))
+        self.assertFalse(any(name.endswith(".tmp") for name in os.listdir(self.tempDir.name)))
+
+    def test_FlushReportsWriteErrors(self):
+        writer = ScreenshotWriter()
+        writer.submit(self.createImage(10, 10, qt.QImage.Format_RGB32), os.path.join(self.tempDir.name, "missing", "0.png"))
+        with self.assertRaises(OSError):
+            writer.flush()
+        # Reported once, right when flush() returns
+        self.assertEqual(writer.pending, [])
+        writer.flush()
+        # Closed writers have no threads left to write with
+        writer.close()
+        with self.assertRaises(RuntimeError):
+            writer.submit(self.createImage(10, 10, qt.QImage.Format_RGB32), os.path.join(self.tempDir.name, "0.png"))
+
+    def test_ObjectStoreDeduplicates(self):
+        store = ObjectStore(os.path.join(self.tempDir.name, "objects"))
+        writer = ScreenshotWriter()
+        first = writer.submitObject(self.createImage(321, 123, qt.QImage.Format_RGB32), store)
+        # Same pixels from another grab, and an image that differs in one pixel
+        again = writer.submitObject(self.createImage(321, 123, qt.QImage.Format_RGB32), store)
+        changed = self.createImage(321, 123, qt.QImage.Format_RGB32)
+        changed.setPixel(0, 0, 0)
+        other = writer.submitObject(changed, store)
+        writer.flush()
+
+        self.assertEqual(first, again)
+        self.assertNotEqual(first, other)
+        self.assertEqual((store.added, store.reused), (2, 1))
+        self.assertSamePixels(changed, store.path(other))
+
+    def test_TileDeltas(self):
+        store = ObjectStore(os.path.join(self.tempDir.name, "objects"))
+        writer = ScreenshotWriter()
+        sequence = FrameSequence()
+        first = self.createImage(1000, 700, qt.QImage.Format_RGB32)
+        second = self.createImage(1000, 700, qt.QImage.Format_RGB32)
+        painter = qt.QPainter(second)
+        painter.fillRect(100, 100, 50, 50, qt.QColor(0, 200, 0))
+        painter.end()
+        names = [writer.submitFrame(image, store, sequence) for image in [first, second]]
+        writer.flush()
+
+        self.assertTrue(names[1].endswith(DELTA_SUFFIX))
+        self.assertLess(os.path.getsize(store.path(names[1])), os.path.getsize(store.path(names[0])) / 10)
+        rebuilt = arrayToQImage(FrameCache().load(store.path(names[1])))
+        self.assertTrue((qImageToArray(rebuilt) == qImageToArray(second)).all())
+
+    def createSteps(self, count):
+        """1920x1080 screenshots of a tutorial, the module panel and one of the views change at each step"""
+        image = self.createImage(1920, 1080, qt.QImage.Format_RGB32)
+        steps = []
+        for step in range(count):
+            painter = qt.QPainter(image)
+            painter.fillRect(20, 100 + 27*step, 340, 24, qt.QColor(30*step % 255, 90, 200))
+            painter.fillRect(700 + 500*(step % 2), 300 + 400*(step // 2 % 2), 40, 40, qt.QColor(250, 200 - 5*step, 0))
+            painter.end()
+            steps.append(image.copy())
+        return steps
+
+    def test_TileDeltaReadTime(self):
+        store = ObjectStore(os.path.join(self.tempDir.name, "objects"))
+        writer = ScreenshotWriter()
+        sequence = FrameSequence()
+        frames = self.createSteps(12)
+        names = [writer.submitFrame(image, store, sequence) for image in frames]
+        filenames = [os.path.join(self.tempDir.name, f"{index}.png") for index in range(len(frames))]
+        for image, filename in zip(frames, filenames):
+            writer.submit(image, filename)
+        writer.shutdown()
+
+        pngBytes = sum(os.path.getsize(filename) for filename in filenames)
+        deltaBytes = sum(os.path.getsize(store.path(name)) for name in names)
+        print(f"{len(frames)} steps: {pngBytes} bytes as PNG, {deltaBytes} bytes as tile deltas, {pngBytes/deltaBytes:.1f}x")
+        self.assertGreater(pngBytes / deltaBytes, 5)
+
+        # Every step as the annotator reads it, against Qt decoding one PNG per step
+        startTime = time.perf_counter()
+        for filename in filenames:
+            qt.QImage(filename)
+        decodeTime = time.perf_counter() - startTime
+        screenshotCache.clear()
+        startTime = time.perf_counter()
+        images = [TutorialScreenshot.readImage(store.path(name)) for name in names]
+        readTime = time.perf_counter() - startTime
+        print(f"QImage decode {1000*decodeTime/len(frames):.1f}ms, readImage {1000*readTime/len(frames):.1f}ms per step")
+        self.assertLess(readTime, decodeTime)
+        for image, frame in zip(images, frames):
+            self.assertTrue((qImageToArray(image) == qImageToArray(frame)).all())
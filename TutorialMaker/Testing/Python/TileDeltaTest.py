@@ -0,0 +1,105 @@
+import collections
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from Lib.ObjectStore import DELTA_SUFFIX, ObjectStore
+from Lib.ScreenshotWriter import encodePNG, pixelDigest
+from Lib.TileDelta import FrameCache, FrameSequence, changedTiles, encodeDelta
+
+
+class TileDeltaTest(unittest.TestCase):
+    def setUp(self):
+        self.tempDir = tempfile.TemporaryDirectory()
+        self.store = ObjectStore(os.path.join(self.tempDir.name, "objects"))
+
+    def tearDown(self):
+        self.tempDir.cleanup()
+
+    def createSteps(self, count, width=1920, height=1080):
+        """Main window screenshots of a tutorial: the module panel and one slice view change from step to step"""
+        random = np.random.default_rng(4)
+        frame = np.zeros((height, width, 3), dtype=np.uint8)
+        frame[:, :] = (40, 40, 48)
+        frame[:height//20] = (70, 70, 80)
+        frame[height//20:, :width//5] = (220, 220, 220)
+        # Four slice views of a volume
+        viewHeight, viewWidth = (height - height//20)//2, (width - width//5)//2
+        views = [(height//20 + row*viewHeight, width//5 + column*viewWidth) for row in range(2) for column in range(2)]
+        rows, columns = np.mgrid[0:viewHeight, 0:viewWidth]
+        for top, left in views:
+            slice = (100 + 60*np.sin(rows/40.0)*np.cos(columns/55.0)).astype(np.uint8)
+            frame[top:top + viewHeight, left:left + viewWidth] = slice[:, :, np.newaxis] + random.integers(0, 8, (viewHeight, viewWidth, 1), dtype=np.uint8)
+        steps = [frame.copy()]
+        for step in range(1, count):
+            # A line of the module panel and a marker in one of the views
+            top = height//10 + (step % 20)*height//40
+            frame[top:top + height//40, width//50:width//5 - width//50] = (30*step % 255, 90, 200)
+            top, left = views[step % 4]
+            frame[top + viewHeight//3:top + viewHeight//3 + 40, left + viewWidth//3:left + viewWidth//3 + 40] = (250, 200 - 5*step, 0)
+            steps.append(frame.copy())
+        return steps
+
+    def capture(self, frames, sequence=None):
+        """What ScreenshotWriter.submitFrame() stores, without the worker threads"""
+        sequence = sequence or FrameSequence()
+        names = []
+        for pixels in frames:
+            name, base, changed = sequence.add(pixels, pixelDigest(pixels))
+            if self.store.reserve(name):
+                self.store.write(name, encodePNG(pixels) if changed is None else encodeDelta(base, pixels, changed))
+            names.append(name)
+        return names
+
+    def test_ChangedTiles(self):
+        previous = np.zeros((100, 150, 4), dtype=np.uint8)
+        current = previous.copy()
+        current[70, 149, 3] = 1
+        current[0, 64] = 5
+        changed = changedTiles(previous, current)
+        self.assertEqual(changed.shape, (2, 3))
+        self.assertEqual(list(zip(*np.nonzero(changed))), [(0, 1), (1, 2)])
+
+    def test_FramesAreRebuiltExactly(self):
+        # Not made of whole tiles, and a window that changes size
+        frames = self.createSteps(20, width=1000, height=700)
+        frames.insert(5, np.full((300, 200, 3), 9, dtype=np.uint8))
+        names = self.capture(frames)
+        self.assertTrue(names[0].endswith(".png"))
+        self.assertTrue(names[5].endswith(".png"))
+        self.assertTrue(names[6].endswith(".png"))
+        self.assertTrue(names[7].endswith(DELTA_SUFFIX))
+        # Every KEYFRAME_INTERVAL frames the chain starts over
+        self.assertEqual(sum(name.endswith(".png") for name in names), 4)
+
+        cache = FrameCache()
+        for pixels, name in zip(frames, names):
+            self.assertTrue((cache.load(self.store.path(name)) == pixels).all())
+        # Out of order, without the previous frames in the cache
+        self.assertTrue((FrameCache().load(self.store.path(names[15])) == frames[15]).all())
+
+        # The same window again is the same object
+        self.assertEqual(self.capture([frames[3]], FrameSequence()), [names[3].replace(DELTA_SUFFIX, ".png")])
+        sequence = FrameSequence()
+        self.assertEqual(self.capture([frames[0], frames[0]], sequence), [names[0], names[0]])
+
+    def test_GarbageCollectionKeepsBases(self):
+        names = self.capture(self.createSteps(3, width=640, height=480))
+        self.assertEqual(self.store.links(names[2]), [names[1]])
+        self.assertEqual(self.store.gc(collections.Counter({names[2]: 1})), (0, 0))
+        self.assertEqual(self.store.referenceStats(collections.Counter({names[2]: 1}))["objects"], 3)
+        # Without the last step only its delta goes, the keyframe is still needed by the second one
+        deltaBytes = os.path.getsize(self.store.path(names[2]))
+        self.assertEqual(self.store.gc(collections.Counter({names[1]: 1})), (1, deltaBytes))
+        self.assertEqual(sorted(self.store.objects()), sorted(names[:2]))
+
+    def test_SmallerThanPNG(self):
+        # The rebuild time is compared with Qt decoding the PNG in ScreenshotWriterTest
+        frames = self.createSteps(12)
+        names = self.capture(frames)
+        deltaBytes = sum(os.path.getsize(self.store.path(name)) for name in names)
+        pngBytes = sum(len(encodePNG(pixels)) for pixels in frames)
+        print(f"{len(frames)} steps: {pngBytes} bytes as PNG, {deltaBytes} bytes as tile deltas, {pngBytes/deltaBytes:.1f}x")
+        self.assertGreater(pngBytes / deltaBytes, 5)
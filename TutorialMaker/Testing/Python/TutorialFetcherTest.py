@@ -0,0 +1,91 @@
+import os
+import tempfile
+import threading
+import unittest
+
+import Lib.GitTools as GitTools
+from Lib.TutorialFetcher import TutorialFetcher
+
+from GitToolsTest import REPO, RECORDED_TREE, StandInServer, createArchive
+
+
+class TutorialFetcherTest(unittest.TestCase):
+    def setUp(self):
+        self.server = StandInServer()
+        self.defaultURLs = (GitTools.GITHUB_API_URL, GitTools.GITHUB_RAW_URL, GitTools.GITHUB_ARCHIVE_URL, GitTools.CACHE_DIR)
+        self.tempDir = tempfile.TemporaryDirectory()
+        GitTools.GITHUB_API_URL = self.server.url
+        GitTools.GITHUB_RAW_URL = self.server.url + "/raw"
+        GitTools.GITHUB_ARCHIVE_URL = self.server.url + "/github"
+        GitTools.CACHE_DIR = os.path.join(self.tempDir.name, "Cache")
+        self.destination = os.path.join(self.tempDir.name, "Testing")
+
+        self.server.addJSON(f"/repos/{REPO}/git/trees/HEAD?recursive=1", RECORDED_TREE)
+        self.server.addText(f"/raw/{REPO}/HEAD/Tutorials/FourMinuteTutorial/FourMinuteTutorial.py", "# four minutes\n")
+        self.server.addText(f"/raw/{REPO}/HEAD/Tutorials/Welcome%20Tutorial/WelcomeTutorial.py", "# welcome\n")
+
+    def tearDown(self):
+        GitTools.GITHUB_API_URL, GitTools.GITHUB_RAW_URL, GitTools.GITHUB_ARCHIVE_URL, GitTools.CACHE_DIR = self.defaultURLs
+        self.tempDir.cleanup()
+        self.server.close()
+
+    def connect(self, fetcher):
+        signals = {"repoListed": [], "fileFetched": [], "progress": [], "finished": []}
+        for name, calls in signals.items():
+            getattr(fetcher, name).connect(lambda *args, calls=calls: calls.append(args))
+        return signals
+
+    def test_SignalsInOrder(self):
+        fetcher = TutorialFetcher([REPO, "SlicerLatinAmerica/Missing"], self.destination)
+        signals = self.connect(fetcher)
+        fetcher.run()
+
+        self.assertEqual(signals["repoListed"], [(REPO, 2)])
+        self.assertEqual(sorted(os.path.basename(path) for path, in signals["fileFetched"]), ["FourMinuteTutorial.py", "WelcomeTutorial.py"])
+        self.assertEqual(signals["progress"][-1], (2, 2, len("# four minutes\n") + len("# welcome\n")))
+        self.assertEqual(signals["finished"], [(False,)])
+        self.assertEqual(len(fetcher.errors), 1)
+        self.assertIn("Missing", fetcher.errors[0])
+        self.assertEqual(sorted(os.listdir(self.destination)), ["FourMinuteTutorial.py", "WelcomeTutorial.py"])
+
+    def test_ArchiveSync(self):
+        archive = createArchive({
+            "Tutorials/FourMinuteTutorial/FourMinuteTutorial.py": "# four minutes\n",
+            "Tutorials/Welcome Tutorial/WelcomeTutorial.py": "# welcome\n",
+        })
+        self.server.routes[f"/github/{REPO}/archive/HEAD.zip"] = (200, {"Content-Type": "application/zip"}, archive)
+
+        fetcher = TutorialFetcher([REPO], self.destination, useArchive=True)
+        signals = self.connect(fetcher)
+        fetcher.run()
+
+        # One request for the whole repository
+        self.assertEqual(len(self.server.requests), 1)
+        self.assertEqual(signals["repoListed"], [(REPO, 2)])
+        self.assertEqual(len(signals["fileFetched"]), 2)
+        self.assertEqual(signals["progress"][-1], (2, 2, len(archive)))
+        self.assertEqual(fetcher.errors, [])
+
+    def test_CancelInBackground(self):
+        # The listing waits until the test cancels, so the fetch is still running on its thread
+        release = threading.Event()
+
+        def slowTree(handler):
+            release.wait(5)
+            return self.server.routes["tree"]
+
+        self.server.routes["tree"] = self.server.routes[f"/repos/{REPO}/git/trees/HEAD?recursive=1"]
+        self.server.routes[f"/repos/{REPO}/git/trees/HEAD?recursive=1"] = slowTree
+
+        fetcher = TutorialFetcher([REPO], self.destination)
+        signals = self.connect(fetcher)
+        fetcher.start()
+        self.assertTrue(fetcher.running)
+        fetcher.cancel()
+        release.set()
+        fetcher.wait(5)
+
+        self.assertFalse(fetcher.running)
+        self.assertEqual(signals["finished"], [(True,)])
+        self.assertEqual(signals["fileFetched"], [])
+        self.assertFalse(os.path.exists(os.path.join(self.destination, "WelcomeTutorial.py")))
@@ -0,0 +1,149 @@
+import gc
+import os
+import tempfile
+import time
+import unittest
+
+import Lib.TutorialTransformer as TutorialTransformer
+from Lib.TutorialTransformer import CompiledTutorialCache, compileTutorial, tutorialModuleName
+
+TUTORIAL = '''
+import os
+
+class FourMinuteTutorialTest:
+{i}def runTest(self):
+{i}{i}self.test_FourMinuteTutorial()
+
+{i}def test_FourMinuteTutorial(self):
+{i}{i}folder = os.path.basename("/data/sample")
+{i}{i}# TUTORIALMAKER BEGIN
+{i}{i}# TUTORIALMAKER INFO TITLE Four "minute" tutorial
+{i}{i}# TUTORIALMAKER INFO AUTHOR Slicer Latin America
+{i}{i}# TUTORIALMAKER INFO DEPENDENCIES SampleData
+{i}{i}steps = [folder]
+{i}{i}if folder:
+{i}{i}{i}steps.append("loaded")
+{i}{i}# TUTORIALMAKER SCREENSHOT
+{i}{i}def describe(items):
+{i}{i}{i}return ", ".join(items)
+{i}{i}self.log.append(describe(steps))
+{i}{i}# TUTORIALMAKER SCREENSHOT
+{i}{i}self.log.append("never run")
+{i}{i}# TUTORIALMAKER END
+'''
+
+
+class TutorialTransformerTest(unittest.TestCase):
+    def runTutorial(self, source):
+        namespace = {}
+        exec(compileTutorial(source, "FourMinuteTutorial.py"), namespace)
+        test = namespace["FourMinuteTutorialTest"]()
+        test.log = []
+        steps = test.test_FourMinuteTutorial()
+        return test, steps
+
+    def test_AnyIndentation(self):
+        for indentation in ["    ", "  ", "\t"]:
+            test, steps = self.runTutorial(TUTORIAL.format(i=indentation))
+            self.assertEqual(steps["TUTORIAL_GETINFO"](), ['Four "minute" tutorial', "Slicer Latin America", "", "", "SampleData"])
+            self.assertEqual(steps["TUTORIAL_STEP_COUNT"], 2)
+            # Steps only run when resumed, and see the variables of the method and of the previous steps
+            body = steps["TUTORIAL_STEPS"]()
+            self.assertEqual(test.log, [])
+            next(body)
+            self.assertEqual(test.log, [])
+            next(body)
+            self.assertEqual(test.log, ["sample, loaded"])
+            # The code after the last marker is not run
+            self.assertEqual(next(body, "done"), "done")
+            self.assertEqual(test.log, ["sample, loaded"])
+
+    def test_TracebackPointsIntoTheTutorial(self):
+        source = TUTORIAL.format(i="    ").replace('steps.append("loaded")', 'steps.append(missingName)')
+        test, steps = self.runTutorial(source)
+        try:
+            next(steps["TUTORIAL_STEPS"]())
+            self.fail("NameError not raised")
+        except NameError as error:
+            frame = error.__traceback__
+        while frame.tb_next is not None:
+            frame = frame.tb_next
+        self.assertEqual(frame.tb_frame.f_code.co_filename, "FourMinuteTutorial.py")
+        self.assertEqual(source.splitlines()[frame.tb_lineno - 1].strip(), "steps.append(missingName)")
+
+    def test_StateStaysInOneFrame(self):
+        source = TUTORIAL.format(i="    ").replace('self.log.append(describe(steps))', 'steps = steps + ["again"]\n        self.log.append(describe(steps))')
+        namespace = {}
+        exec(compileTutorial(source, "FourMinuteTutorial.py"), namespace)
+        test = namespace["FourMinuteTutorialTest"]()
+        test.log = []
+        body = test.test_FourMinuteTutorial()["TUTORIAL_STEPS"]()
+        next(body)
+        # Reassigning a variable of an earlier step works, and nothing is copied to the module globals
+        next(body)
+        self.assertEqual(test.log, ["sample, loaded, again"])
+        self.assertNotIn("steps", namespace)
+        self.assertNotIn("describe", namespace)
+
+    def test_MarkerInsideABlock(self):
+        source = TUTORIAL.format(i="    ").replace('steps.append("loaded")', 'steps.append("loaded")\n            # TUTORIALMAKER SCREENSHOT\n            steps.append("twice")')
+        with self.assertRaises(SyntaxError):
+            compileTutorial(source, "FourMinuteTutorial.py")
+
+    def test_LinearTime(self):
+        def largeTutorial(stepCount):
+            body = "".join(f"        value{index} = {index}\n        # TUTORIALMAKER SCREENSHOT\n" for index in range(stepCount))
+            return f"class LargeTest:\n    def test_Large(self):\n        # TUTORIALMAKER BEGIN\n{body}        # TUTORIALMAKER END\n"
+
+        times = {}
+        gc.disable()
+        try:
+            for stepCount in [500, 4000]:
+                source = largeTutorial(stepCount)
+                startTime = time.perf_counter()
+                compileTutorial(source)
+                times[stepCount] = time.perf_counter() - startTime
+        finally:
+            gc.enable()
+        print(f"500 steps {times[500]*1000:.0f}ms, 4000 steps {times[4000]*1000:.0f}ms")
+        self.assertLess(times[4000], times[500] * 8 * 2)
+
+    def test_CompiledTutorialCache(self):
+        with tempfile.TemporaryDirectory() as tempDir:
+            path = os.path.join(tempDir, "FourMinuteTutorial.py")
+            with open(path, "w", encoding="utf-8") as fd:
+                fd.write(TUTORIAL.format(i="    "))
+            cacheDir = os.path.join(tempDir, "Cache")
+
+            cache = CompiledTutorialCache(cacheDir)
+            code = cache.load(path)
+            self.assertIs(cache.load(path), code)
+            self.assertEqual((cache.hits, cache.misses), (1, 1))
+            entries = os.listdir(cacheDir)
+            self.assertEqual(len(entries), 1)
+
+            # A new session loads the marshalled code without transforming the source again
+            transform = TutorialTransformer.compileTutorial
+            TutorialTransformer.compileTutorial = None
+            try:
+                warmCache = CompiledTutorialCache(cacheDir)
+                warmCode = warmCache.load(path)
+            finally:
+                TutorialTransformer.compileTutorial = transform
+            self.assertEqual((warmCache.hits, warmCache.misses), (1, 0))
+            self.assertEqual(warmCode.co_filename, path)
+            namespace = {}
+            exec(warmCode, namespace)
+            self.assertIn("FourMinuteTutorialTest", namespace)
+
+            # Editing the tutorial replaces its entry
+            with open(path, "a", encoding="utf-8") as fd:
+                fd.write("# edited\n")
+            self.assertIsNot(warmCache.load(path), warmCode)
+            self.assertEqual(warmCache.misses, 1)
+            self.assertEqual(len(os.listdir(cacheDir)), 1)
+            self.assertNotEqual(os.listdir(cacheDir), entries)
+
+    def test_ModuleNamePerTutorial(self):
+        self.assertNotEqual(tutorialModuleName("/Testing/FourMinuteTutorial.py"), tutorialModuleName("/Testing/WelcomeTutorial.py"))
+        self.assertTrue(tutorialModuleName("/Testing/Welcome tutorial-2.py").isidentifier())
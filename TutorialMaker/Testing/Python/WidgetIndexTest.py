@@ -0,0 +1,51 @@
+import random
+import time
+import unittest
+
+import qt
+
+from Lib.Annotations import AnnotatorSlide, WidgetIndex
+
+
+class WidgetIndexTest(unittest.TestCase):
+    def createMetadata(self, widgetCount):
+        random.seed(widgetCount)
+        metadata = [{"name": "window", "path": "window", "position": [0, 0], "size": [1920, 1080]}]
+        for index in range(widgetCount):
+            metadata.append({"name": f"w{index}", "path": f"w{index}",
+                             "position": [random.uniform(0, 1900), random.uniform(0, 1060)],
+                             "size": [random.choice([0, 8, 40, 300]), random.choice([0, 8, 25, 200])]})
+        return metadata
+
+    def linearScan(self, metadata, posX, posY):
+        return [widget for widget in metadata
+                if widget["position"][0] <= posX <= widget["position"][0] + widget["size"][0]
+                and widget["position"][1] <= posY <= widget["position"][1] + widget["size"][1]]
+
+    def test_MatchesLinearScan(self):
+        metadata = self.createMetadata(3000)
+        index = WidgetIndex(metadata)
+        points = [(random.uniform(-20, 1940), random.uniform(-20, 1100)) for _ in range(500)]
+        # Rectangle edges are inclusive
+        points += [(widget["position"][0] + widget["size"][0], widget["position"][1] + widget["size"][1]) for widget in metadata[:200]]
+        for posX, posY in points:
+            self.assertEqual([id(widget) for widget in index.query(posX, posY)],
+                             [id(widget) for widget in self.linearScan(metadata, posX, posY)])
+
+    def test_SlideUsesWindowOffset(self):
+        metadata = self.createMetadata(100)
+        slide = AnnotatorSlide(qt.QPixmap(100, 100), metadata, WindowOffset=[100, 50])
+        self.assertEqual(slide.FindWidgetsAtPos(10, 10), self.linearScan(metadata, 110, 60))
+        self.assertEqual(AnnotatorSlide(qt.QPixmap(10, 10), {}).FindWidgetsAtPos(5, 5), [])
+
+    def test_HoverIsSubMillisecond(self):
+        metadata = self.createMetadata(5000)
+        slide = AnnotatorSlide(qt.QPixmap(1920, 1080), metadata)
+        slide.FindWidgetsAtPos(0, 0)
+        points = [(random.uniform(0, 1920), random.uniform(0, 1080)) for _ in range(1000)]
+        startTime = time.perf_counter()
+        for point in points:
+            slide.FindWidgetsAtPos(*point)
+        elapsed = (time.perf_counter() - startTime) / len(points)
+        print(f"FindWidgetsAtPos over {len(metadata)} widgets: {elapsed*1e6:.1f} us")
+        self.assertLess(elapsed, 1e-3)
@@ -0,0 +1,88 @@
+import time
+import unittest
+
+import qt
+import slicer
+
+from Lib.TutorialUtils import Util, Widget, WidgetSnapshot
+
+
+class WidgetSnapshotTest(unittest.TestCase):
+    """Compares the single pass WidgetSnapshot with the per widget Util.uniqueWidgetPath
+    lookup and prints how the capture time of both scales with the widget count.
+    """
+
+    def setUp(self):
+        self.windows = []
+
+    def tearDown(self):
+        for window in self.windows:
+            window.close()
+            window.setParent(None)
+        self.windows = []
+
+    def createWindow(self, widgetCount):
+        # Mix of named and unnamed widgets of the same classes nested a few levels deep,
+        # so the class index part of the paths is exercised
+        window = qt.QWidget()
+        window.objectName = f"SnapshotTestWindow{widgetCount}"
+        window.resize(800, 600)
+        self.windows.append(window)
+        parents = [window]
+        for index in range(widgetCount):
+            parent = parents[index % len(parents)]
+            if index % 3 == 0:
+                widget = qt.QFrame(parent)
+                parents.append(widget)
+            elif index % 3 == 1:
+                widget = qt.QLabel(f"label {index}", parent)
+            else:
+                widget = qt.QPushButton(f"button {index}", parent)
+            if index % 4 == 0:
+                widget.objectName = f"widget{index}"
+            widget.setVisible(index % 17 != 0)
+        window.show()
+        slicer.app.processEvents()
+        return window
+
+    def legacyPaths(self, window):
+        paths = []
+        for widget in Util.getOnScreenWidgets(window):
+            if hasattr(widget.inner(), "isVisible") and not widget.inner().isVisible():
+                continue
+            if not hasattr(widget.inner(), "mapToGlobal"):
+                continue
+            paths.append(Util.uniqueWidgetPath(widget))
+        return paths
+
+    def test_PathsMatchUniqueWidgetPath(self):
+        window = self.createWindow(300)
+        snapshot = WidgetSnapshot(window).capture()
+        paths = [entry["path"] for key, entry in snapshot.items() if key != "_devicePixelRatio"]
+        self.assertEqual(paths, self.legacyPaths(window))
+
+    def test_WalkOrderMatchesGetOnScreenWidgets(self):
+        window = self.createWindow(100)
+        walked = [widget.inner() for widget, path in WidgetSnapshot(window).walk()]
+        expected = [widget.inner() for widget in Util.getOnScreenWidgets(window)]
+        self.assertEqual(walked, expected)
+        for widget, path in WidgetSnapshot(window).walk():
+            self.assertEqual(path, Util.uniqueWidgetPath(Widget(widget.inner())))
+
+    def test_CaptureTimeScaling(self):
+        print("widgets | uniqueWidgetPath (s) | WidgetSnapshot (s)")
+        for widgetCount in [100, 400, 1600]:
+            window = self.createWindow(widgetCount)
+
+            startTime = time.perf_counter()
+            legacyPaths = self.legacyPaths(window)
+            legacyTime = time.perf_counter() - startTime
+
+            startTime = time.perf_counter()
+            snapshot = WidgetSnapshot(window).capture()
+            snapshotTime = time.perf_counter() - startTime
+
+            print(f"{widgetCount:7d} | {legacyTime:20.4f} | {snapshotTime:18.4f}")
+            self.assertEqual(len(snapshot) - 1, len(legacyPaths))
+            if widgetCount >= 1600:
+                self.assertLess(snapshotTime, legacyTime)
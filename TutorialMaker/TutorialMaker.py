@@ -1,22 +1,25 @@
+import json
 import logging
 import os
 import platform
 import subprocess
+import sys
+import time
 import slicer
 import importlib
 import qt
-import Lib.TutorialUtils
-import Lib.TutorialPainter as AnnotationPainter
-import Lib.GitTools as GitTools
 
 from slicer.ScriptedLoadableModule import * # noqa: F403
 from slicer.util import VTKObservationMixin
 from slicer.i18n import tr as _
 from slicer.i18n import translate
-from Lib.TutorialEditor import TutorialEditor
-import Lib.TutorialGUI
-from Lib.CreateTutorial import CreateTutorial
-from Lib.TutorialUtils import SelfTestTutorialLayer
+
+# The Lib modules (and requests, through GitTools) are imported where they are first used,
+# so loading Slicer and opening the module only pay for what is actually shown.
+
+def modulePath(*parts):
+    """Path inside the module folder, same as Lib.TutorialUtils.get_module_basepath("TutorialMaker")"""
+    return os.path.join(os.path.dirname(os.path.abspath(__file__)), *parts)
 
 #
 # TutorialMaker
@@ -68,6 +71,7 @@ class TutorialMakerWidget(ScriptedLoadableModuleWidget, VTKObservationMixin): #
         self._updatingGUIFromParameterNode = False
         self.__tableSize = 0
         self.__selectedTutorial = None
+        self.fetcher = None
         self.isDebug = slicer.app.settings().value("Developer/DeveloperMode")
 
         print(_("Version Date: {}").format("2025/11/11-08:00AM"))
@@ -80,9 +84,11 @@ class TutorialMakerWidget(ScriptedLoadableModuleWidget, VTKObservationMixin): #
         """
         Called when the user opens the module the first time and the widget is initialized.
         """
-        import importlib
-        importlib.reload(Lib.TutorialGUI)
-        importlib.reload(Lib.TutorialUtils)
+        if self.isDebug == True: # noqa: E712
+            # Pick up edits of the Lib modules already loaded, the others are imported fresh when used
+            for moduleName in ["Lib.TutorialUtils", "Lib.TutorialGUI"]:
+                if moduleName in sys.modules:
+                    importlib.reload(sys.modules[moduleName])
 
         ScriptedLoadableModuleWidget.setup(self) # noqa: F405
 
@@ -92,8 +98,6 @@ class TutorialMakerWidget(ScriptedLoadableModuleWidget, VTKObservationMixin): #
         self.layout.addWidget(uiWidget)
         self.ui = slicer.util.childWidgetVariables(uiWidget)
 
-        #Verify if the folders to manipulate the tutorials are created
-        Lib.TutorialUtils.Util.verifyOutputFolders()
         # Create logic class. Logic implements all computations that should be possible to run
         # in batch mode, without a graphical user interface.
         self.logic = TutorialMakerLogic()
@@ -119,7 +123,9 @@ class TutorialMakerWidget(ScriptedLoadableModuleWidget, VTKObservationMixin): #
         if self.isDebug != True: # noqa: E712
             self.ui.CollapsibleButtonTutorialMaking.setVisible(0)
             self.ui.pushButtonNewTutorial.setVisible(0)
-            self.logic.loadTutorialsFromRepos()
+            # Show the tutorials already on disk and only refresh them in the background when the catalog is old
+            if not self.logic.isCatalogFresh(self.logic.catalogMaxAge):
+                self.startFetch(self.logic.catalogMaxAge)
 
         # Make sure parameter node is initialized (needed for module reload)
         self.initializeParameterNode()
@@ -133,6 +139,8 @@ class TutorialMakerWidget(ScriptedLoadableModuleWidget, VTKObservationMixin): #
         """
         Called when the application closes and the module widget is destroyed.
         """
+        if self.fetcher is not None:
+            self.fetcher.cancel()
         return
 
     def enter(self):
@@ -185,13 +193,43 @@ class TutorialMakerWidget(ScriptedLoadableModuleWidget, VTKObservationMixin): #
         self.ui.pushButtonGenerate.setEnabled(self.__selectedTutorial is not None)
 
     def getFromGithub(self):
-        slicer.util.infoDisplay(_("Fetching tutorials from GitHub.\n" 
-        "The window may appear unresponsive but the process is running in the background.\n" 
-        "This process will take some minutes.\n" 
-        "Click on \"OK\" to continue."), _("Please wait"))
-        self.logic.loadTutorialsFromRepos()
-        self.populateTutorialList()
-        pass
+        # The same button cancels a fetch that is still running
+        if self.fetcher is not None and self.fetcher.running:
+            self.fetcher.cancel()
+            self.ui.pushButtonFetchFromGithub.setEnabled(False)
+            return
+        self.startFetch()
+
+    def startFetch(self, maxAge=0):
+        self.fetcher = self.logic.fetchTutorialsFromRepos(maxAge)
+        self.fetcher.fileFetched.connect(self.onTutorialFetched)
+        self.fetcher.progress.connect(self.onFetchProgress)
+        self.fetcher.finished.connect(self.onFetchFinished)
+        self.__fetchButtonText = self.ui.pushButtonFetchFromGithub.text
+        self.ui.pushButtonFetchFromGithub.text = _("Cancel fetching")
+        slicer.util.showStatusMessage(_("Fetching tutorials from GitHub..."))
+        self.fetcher.start()
+
+    def onTutorialFetched(self, path):
+        tutorialName = os.path.splitext(os.path.basename(path))[0]
+        listWidget = self.ui.listWidgetTutorials
+        if not listWidget.findItems(tutorialName, qt.Qt.MatchExactly):
+            listWidget.addItem(tutorialName)
+
+    def onFetchProgress(self, filesDone, filesFound, transferredBytes):
+        slicer.util.showStatusMessage(_("Fetching tutorials from GitHub: {done}/{found} files, {size} KB downloaded").format(
+            done=filesDone, found=filesFound, size=transferredBytes // 1024))
+
+    def onFetchFinished(self, cancelled):
+        self.ui.pushButtonFetchFromGithub.text = self.__fetchButtonText
+        self.ui.pushButtonFetchFromGithub.setEnabled(True)
+        if cancelled:
+            slicer.util.showStatusMessage(_("Fetching tutorials cancelled"), 3000)
+        else:
+            self.logic.saveCatalog(self.fetcher)
+            slicer.util.showStatusMessage(_("Fetched {count} tutorials from GitHub").format(count=self.fetcher.filesDone), 3000)
+        if self.fetcher.errors:
+            slicer.util.errorDisplay(_("Some tutorials could not be fetched."), detailedText="\n".join(self.fetcher.errors))
 
     def populateTutorialList(self):
         loadedTutorials = self.logic.loadTutorials()
@@ -217,10 +255,14 @@ class TutorialMakerLogic(ScriptedLoadableModuleLogic): # noqa: F405
         Called when the logic class is instantiated. Can be used for initializing member variables.
         """
         ScriptedLoadableModuleLogic.__init__(self) # noqa: F405
-        self.tutorialEditor = TutorialEditor()
+        self.tutorialEditor = None
         self.TutorialRepos = [
             "SlicerLatinAmerica/SlicerTestTutorial"
         ]
+        # Listings and tutorials fetched less than this many seconds ago are reused when the module opens
+        self.catalogMaxAge = 6*60*60
+        # Sync each repository from its archive, one request instead of one per tutorial file
+        self.useArchiveSync = True
 
     def setDefaultParameters(self, parameterNode):
         """
@@ -229,9 +271,13 @@ class TutorialMakerLogic(ScriptedLoadableModuleLogic): # noqa: F405
         pass
 
     def exitTutorialEditor(self):
-        self.tutorialEditor.exit()
+        if self.tutorialEditor is not None:
+            self.tutorialEditor.exit()
 
     def Edit(self):
+        if self.tutorialEditor is None:
+            from Lib.TutorialEditor import TutorialEditor
+            self.tutorialEditor = TutorialEditor()
         self.tutorialEditor.Show()
         pass
 
@@ -242,12 +288,20 @@ class TutorialMakerLogic(ScriptedLoadableModuleLogic): # noqa: F405
         pass
 
     def ExportScreenshots(self):
+        import Lib.TutorialUtils
+        Lib.TutorialUtils.Util.verifyOutputFolders()
         screenshot = Lib.TutorialUtils.ScreenshotTools()
-        screenshot.saveScreenshotMetadata(0)
+        try:
+            screenshot.saveScreenshotMetadata(0)
+            screenshot.flush()
+        finally:
+            screenshot.close()
         pass
 
-    def Capture(self, tutorialName):
-        if not slicer.util.confirmOkCancelDisplay(
+    def Capture(self, tutorialName, interactive=True):
+        """Captures tutorialName into a new run. Without interactive nothing asks for confirmation
+        and the outcome is only logged, Lib/BatchCapture.py is the command line entry point"""
+        if interactive and not slicer.util.confirmOkCancelDisplay(
             _("Please do not interact with Slicer until the process is finished.\n"
               "Ensure your slicer application is maximized.\n"
               "Save and clear the scene before starting.\n"
@@ -258,79 +312,127 @@ class TutorialMakerLogic(ScriptedLoadableModuleLogic): # noqa: F405
         ):
             return  # Usuário cancelou
 
+        scheduler = None
         def FinishTutorial():
+            if not interactive:
+                if scheduler is not None and scheduler.error is not None:
+                    logging.error(_("Failed to capture tutorial {tutorialName}: {err}").format(tutorialName=tutorialName, err=str(scheduler.error)))
+                return
             slicer.util.mainWindow().moduleSelector().selectModule('TutorialMaker')
+            if scheduler is not None and scheduler.error is not None:
+                slicer.util.errorDisplay(_("Failed to capture tutorial, please send this error on our GitHub Issue page:\n{err}").format(err=str(scheduler.error)))
+                return
             slicer.util.infoDisplay(_("Tutorial Captured"), _("Captured Tutorial: {tutorialName}").format(tutorialName=tutorialName))
 
         try:
-            TutorialMakerLogic.runTutorialTestCases(tutorialName, FinishTutorial)
+            scheduler = TutorialMakerLogic.runTutorialTestCases(tutorialName, FinishTutorial, interactive)
+            return scheduler
         except Exception as e:
+            if not interactive:
+                raise
             slicer.util.errorDisplay(_("Failed to capture tutorial, please send this error on our GitHub Issue page:\n{err}").format(err=str(e)))
             slicer.util.reloadScriptedModule("TutorialMaker")
             slicer.util.selectModule("TutorialMaker")
 
     def Generate(self, tutorialName):
+        import Lib.TutorialPainter as AnnotationPainter
+        from Lib.RunContext import RunContext
         with slicer.util.tryWithErrorDisplay(_("Failed to generate tutorial")):
-            AnnotationPainter.TutorialPainter().GenerateHTMLfromAnnotatedTutorial(Lib.TutorialUtils.get_module_basepath("TutorialMaker") + "/Outputs/Annotations/annotations.json")
-            outputPath = Lib.TutorialUtils.get_module_basepath("TutorialMaker") + "/Outputs/"
+            context = RunContext.latest()
+            AnnotationPainter.TutorialPainter(context).GenerateHTMLfromAnnotatedTutorial(context.annotationsPath + "/annotations.json")
+            outputPath = context.root
             if platform.system() == "Windows":
                 os.startfile(outputPath)
             else:
-                import subprocess, sys
                 opener = "open" if sys.platform == "darwin" else "xdg-open"
                 subprocess.call([opener, outputPath])
             qt.QMessageBox.information(slicer.util.mainWindow(), _("Tutorial Generated"), _("Generated Tutorial: {tutorialName}").format(tutorialName=tutorialName))
         pass
 
     def CreateNewTutorial(self):
+        import Lib.TutorialUtils
+        from Lib.CreateTutorial import CreateTutorial
         folderName = Lib.TutorialUtils.get_module_basepath("TutorialMaker") + "/Testing/"
         Tutorial_Win = CreateTutorial(folderName)
         Tutorial_Win.show()
         pass
 
     def OpenAnnotator(Self):
+        import Lib.TutorialUtils
+        import Lib.TutorialGUI
+        Lib.TutorialUtils.Util.verifyOutputFolders()
+        from Lib.RunContext import RunContext
         Annotator = Lib.TutorialGUI.TutorialGUI()
-        Annotator.open_json_file(Lib.TutorialUtils.get_module_basepath("TutorialMaker") + "/Outputs/Raw/Tutorial.json")
+        # The last captured tutorial, Outputs/Raw when nothing was captured into a run yet
+        Annotator.open_json_file(RunContext.latest().rawPath + "/Tutorial.json")
         Annotator.show()
         pass
 
-    def loadTutorialsFromRepos(self):
-        modulePath = Lib.TutorialUtils.get_module_basepath("TutorialMaker")
-        
-        os.makedirs(os.path.join(modulePath, "Testing"), exist_ok=True)
+    def loadTutorialsFromRepos(self, maxAge=0):
+        """Downloads the tutorials of every repository into Testing, through the GitTools cache.
+        With maxAge=0 everything is revalidated with GitHub, unchanged files cost no transfer.
+        """
+        fetcher = self.fetchTutorialsFromRepos(maxAge)
+        fetcher.run()
+        self.saveCatalog(fetcher)
+        if fetcher.errors:
+            slicer.util.errorDisplay(_("Some tutorials could not be fetched."), detailedText="\n".join(fetcher.errors))
+
+    def fetchTutorialsFromRepos(self, maxAge=0):
+        """TutorialFetcher for every repository into Testing, start() it to fetch without blocking
+        and follow the progress through its signals"""
         #os.makedirs(os.path.join(modulePath, "Languages"), exist_ok=True)
-        
-        # Tutorials
-        for repo in self.TutorialRepos:
-            files = GitTools.GitFile("", "")
-            try:
-                with slicer.util.tryWithErrorDisplay(_("Failed to fetch tutorials from {repo}").format(repo=repo)):
-                    files = GitTools.GitTools.ParseRepo(repo)
-            except:
-                continue
-            for TutorialRoot in files.dir("Tutorials"):
-                for TutorialFile in files.dir(f"Tutorials/{TutorialRoot}"):
-                    if TutorialFile.endswith(".py"):
-                        try:
-                            with slicer.util.tryWithErrorDisplay(_("Failed to fetch {TutorialFile} from {repo}".format(TutorialFile=TutorialFile, repo=repo))):
-                                pyRaw = files.getRaw(f"Tutorials/{TutorialRoot}/{TutorialFile}")
-                                fd = open(f"{modulePath}/Testing/{TutorialFile}", "w", encoding='utf-8')
-                                fd.write(pyRaw)
-                                fd.close()
-                        except:
-                            continue
+        from Lib.TutorialFetcher import TutorialFetcher
+        return TutorialFetcher(self.TutorialRepos, modulePath("Testing"), maxAge, self.useArchiveSync)
+
+    def readCatalog(self):
+        """Catalog of the last complete fetch: when it ran, from which repositories and the tutorials it brought"""
+        try:
+            with open(modulePath("Outputs", "TutorialCatalog.json"), encoding="utf-8") as fd:
+                return json.load(fd)
+        except (OSError, ValueError):
+            return None
+
+    def isCatalogFresh(self, maxAge):
+        catalog = self.readCatalog()
+        if catalog is None or catalog["repos"] != self.TutorialRepos or time.time() - catalog["fetched"] >= maxAge:
+            return False
+        return all(os.path.exists(modulePath("Testing", f"{tutorial}.py")) for tutorial in catalog["tutorials"])
+
+    def saveCatalog(self, fetcher):
+        """Records a fetch that went through without errors, a failed one is retried next time the module opens"""
+        if fetcher.errors or fetcher.isCancelled():
+            return
+        os.makedirs(modulePath("Outputs"), exist_ok=True)
+        catalog = {
+            "fetched": time.time(),
+            "repos": self.TutorialRepos,
+            "tutorials": sorted(os.path.splitext(os.path.basename(path))[0] for path in fetcher.fetchedFiles),
+        }
+        path = modulePath("Outputs", "TutorialCatalog.json")
+        with open(path + ".tmp", "w", encoding="utf-8") as fd:
+            json.dump(catalog, fd, indent=2)
+        os.replace(path + ".tmp", path)
 
     def loadTutorials(self):
+        """Tutorials of the catalog of the last fetch, then the ones created locally in Testing.
+        Without a catalog, everything in Testing"""
         test_tutorials = []
-        test_contents = os.listdir(Lib.TutorialUtils.get_module_basepath("TutorialMaker") + "/Testing/")
+        os.makedirs(modulePath("Testing"), exist_ok=True)
+        test_contents = os.listdir(modulePath("Testing"))
+        catalog = self.readCatalog()
+        if catalog is not None:
+            test_tutorials = [tutorial for tutorial in catalog.get("tutorials", []) if f"{tutorial}.py" in test_contents]
         for content in test_contents:
             if(".py" not in content):
                 continue
-            test_tutorials.append(content.replace(".py", ""))
+            tutorial = content.replace(".py", "")
+            if tutorial not in test_tutorials:
+                test_tutorials.append(tutorial)
         return test_tutorials
 
     @staticmethod
-    def runTutorialTestCases(tutorial_name, callback=None):
+    def runTutorialTestCases(tutorial_name, callback=None, interactive=True):
         """ Ideally you should have several levels of tests.  At the lowest level
         tests should exercise the functionality of the logic with different inputs
         (both valid and invalid).  At higher levels your tests should emulate the
@@ -341,21 +443,11 @@ class TutorialMakerLogic(ScriptedLoadableModuleLogic): # noqa: F405
         module.  For example, if a developer removes a feature that you depend on,
         your test should break so they know that the feature is needed.
         """
+        import Lib.TutorialUtils
+        from Lib.TutorialUtils import SelfTestTutorialLayer
+        Lib.TutorialUtils.Util.verifyOutputFolders()
         tPath = Lib.TutorialUtils.get_module_basepath("TutorialMaker") + f"/Testing/{tutorial_name}.py"
-        SelfTestTutorialLayer.ParseTutorial(tPath)
-        import sys
-        if "Outputs.CurrentParsedTutorial" in sys.modules:
-            del sys.modules["Outputs.CurrentParsedTutorial"]
-        TutorialModule = importlib.import_module("Outputs.CurrentParsedTutorial")
-        for className in TutorialModule.__dict__:
-            if("Test" not in className or className == "ScriptedLoadableModuleTest"):
-                continue
-            testClass = getattr(TutorialModule, className)
-            tutorial = testClass()
-            SelfTestTutorialLayer.RunTutorial(tutorial, callback)
-            return
-        logging.error(_(f"No tests found in {tutorial_name}"))
-        raise Exception(_("No Tests Found"))
+        return SelfTestTutorialLayer.RunTutorialFile(tPath, callback, interactive=interactive)
 
 #
 # TutorialMakerTest
@@ -370,6 +462,7 @@ class TutorialMakerTest(ScriptedLoadableModuleTest): # noqa: F405
     def setUp(self):
         """ Do whatever is needed to reset the state - typically a scene clear will be enough.
         """
+        import Lib.TutorialUtils
         slicer.mrmlScene.Clear()
         TutorialMakerLogic().loadTutorialsFromRepos()
 
@@ -383,7 +476,9 @@ class TutorialMakerTest(ScriptedLoadableModuleTest): # noqa: F405
 
     def runTest(self):
         """Run as few or as many tests as needed here.
+        Lib/ParallelCapture.py captures the languages in separate Slicer processes instead.
         """
+        from Lib.TutorialUtils import Util
         languages = ["en", "fr", "es", "pt_BR"]
         
         self.setUp()
@@ -391,23 +486,12 @@ class TutorialMakerTest(ScriptedLoadableModuleTest): # noqa: F405
         tutorials_failed = 0
         error_message = ""
         
-        testingFolder = Lib.TutorialUtils.get_module_basepath("TutorialMaker") + "/Testing/"
-        languages_dir = Lib.TutorialUtils.get_module_basepath("TutorialMaker") + "/Languages/"
+        testingFolder = modulePath("Testing")
         
         test_tutorials = [f for f in os.listdir(testingFolder) if f.endswith(".py")]
     
         for lang in languages:
-            translators = []
-            
-            if lang != "en":
-                lang_files = [f for f in os.listdir(languages_dir) if (f.endswith(f"_{lang}.qm") or f.endswith(f"-{lang.replace('_', '-')}.qm"))]
-                
-                for file in lang_files:
-                    qm_path = os.path.join(languages_dir, file)
-                    translator = qt.QTranslator()
-                    if os.path.exists(qm_path) and translator.load(qm_path):
-                        slicer.app.installTranslator(translator)
-                        translators.append(translator)
+            translators = Util.installTranslators(lang, modulePath("Languages"))
                         
             slicer.app.processEvents()
             slicer.util.mainWindow().update()
@@ -425,8 +509,7 @@ class TutorialMakerTest(ScriptedLoadableModuleTest): # noqa: F405
                 finally:
                     self.delayDisplay(_("Tutorial Tested in {lang}").format(lang=lang))
             
-            for translator in translators:
-                slicer.app.removeTranslator(translator)
+            Util.removeTranslators(translators)
             
             slicer.app.processEvents()
             slicer.util.mainWindow().update()